@@ -0,0 +1,87 @@
+"""
+Benchmark runner: ``python -m benchmarks [--orders 16 32 ...] [--output results.json] [--baseline baseline.json]``.
+
+Exits with status 1 if any measurement regressed by more than ``--threshold`` compared to the baseline. Baselines
+depend on the machine, so none is committed: ``--update-baseline`` records one for the machine the benchmarks run on.
+"""
+import argparse
+import json
+import os
+import sys
+
+from .suite import DEFAULT_ORDERS, ENGINES, DEFAULT_MAX_DICT_ORDER, DEFAULT_MAX_VECTOR_PAINT_ORDER
+from .suite import run_suite, compare_results
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description='Benchmark board operations.')
+    parser.add_argument('--orders', type=int, nargs='+', default=DEFAULT_ORDERS, help='orders to benchmark')
+    parser.add_argument(
+        '--engines', nargs='+', choices=ENGINES, default=['array', 'packed', 'dict'], help='board engines to benchmark'
+    )
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement; the best time is kept')
+    parser.add_argument('--no-paint', action='store_true', help="don't benchmark rendering (which requires PySide2)")
+    parser.add_argument('--max-dict-order', type=int, default=DEFAULT_MAX_DICT_ORDER)
+    parser.add_argument('--max-vector-paint-order', type=int, default=DEFAULT_MAX_VECTOR_PAINT_ORDER)
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument(
+        '--baseline', default=DEFAULT_BASELINE, help=f'baseline to compare against (default: {DEFAULT_BASELINE})'
+    )
+    parser.add_argument(
+        '--threshold', type=float, default=0.25,
+        help='fraction by which a measurement may exceed the baseline before it counts as a regression (default: 0.25)'
+    )
+    parser.add_argument('--update-baseline', action='store_true', help='store the results as the new baseline')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paint = not args.no_paint
+    if paint:
+        try:
+            import PySide2
+        except ImportError:
+            print('PySide2 is not installed, skipping rendering benchmarks', file=sys.stderr)
+            paint = False
+
+    def progress(result):
+        print(
+            f'{result["engine"]:>7} {result["operation"]:<14} order {result["order"]:>5}: '
+            f'{result["seconds"] * 1000:12.3f} ms {result["peak_bytes"] / 2 ** 20:10.2f} MiB peak',
+            file=sys.stderr
+        )
+
+    results = run_suite(
+        args.orders, args.engines, args.repeat, paint, args.max_dict_order, args.max_vector_paint_order, progress
+    )
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'No baseline at {args.baseline}; run with --update-baseline to create one', file=sys.stderr)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    for key in 'machine', 'platform', 'python', 'numpy':
+        if baseline['meta'].get(key) != results['meta'][key]:
+            print(
+                f'Warning: the baseline was recorded with {key} {baseline["meta"].get(key)}, '
+                f'not {results["meta"][key]}; timings may not be comparable', file=sys.stderr
+            )
+    regressions = compare_results(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f'REGRESSION: {regression}', file=sys.stderr)
+    if not regressions:
+        print(f'No regressions beyond {args.threshold:.0%} compared to {args.baseline}', file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Benchmarks of board operations and rendering over a ladder of orders.
+
+Every measurement records the best wall time out of several runs and the peak memory allocated during one extra run
+traced with ``tracemalloc``. Results can be compared against a stored baseline to catch regressions.
+"""
+import os
+import platform
+import sys
+import tracemalloc
+from time import perf_counter, sleep
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+import board
+
+__all__ = ['DEFAULT_ORDERS', 'ENGINES', 'run_suite', 'compare_results']
+
+DEFAULT_ORDERS = (16, 32, 64, 128, 256, 512, 1024, 2048)
+ENGINES = {'dict': board.DICT_ENGINE, 'array': board.ARRAY_ENGINE, 'packed': board.PACKED_ENGINE}
+# The dict engine and per-primitive painting take minutes beyond these orders
+DEFAULT_MAX_DICT_ORDER = 256
+DEFAULT_MAX_VECTOR_PAINT_ORDER = 128
+PAINT_SIZE = 1000
+SEED = 0
+
+
+def measure(setup: Callable[[], tuple], run: Callable, repeat) -> Dict[str, float]:
+    """Calls ``run(*setup())`` ``repeat`` times and once more with memory tracing. Only ``run`` is measured."""
+    best = float('inf')
+    for _ in range(repeat):
+        args = setup()
+        start = perf_counter()
+        run(*args)
+        best = min(best, perf_counter() - start)
+    args = setup()
+    tracemalloc.start()
+    try:
+        baseline = tracemalloc.get_traced_memory()[0]
+        run(*args)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def copy_board(original: board.Board) -> board.Board:
+    return original.convert(original.engine)
+
+
+def board_benchmarks(engine_name, order, repeat) -> Iterable[Dict]:
+    engine = ENGINES[engine_name]
+    height = order * 2
+    engine_class = type(board.Board(2, engine=engine))
+    yield 'generate_data', measure(lambda: (), lambda: engine_class.generate_data(height), repeat)
+    yield 'skip_ahead', measure(lambda: (), lambda: board.sample_tiling(order, seed=SEED, engine=engine), repeat)
+    tiling = board.sample_tiling(order, seed=SEED, engine=engine)
+    yield 'advance_magic', measure(lambda: (copy_board(tiling),), lambda b: b.advance_magic(), repeat)
+    advanced = copy_board(tiling)
+    advanced.advance_magic()
+    yield 'get_holes', measure(lambda: (), lambda: advanced.get_holes(as_array=True), repeat)
+    holes = advanced.get_holes(as_array=True)
+    yield 'fill_holes', measure(lambda: (copy_board(advanced),), lambda b: b.fill_holes(holes), repeat)
+
+
+def paint_benchmarks(order, repeat, max_vector_order) -> Iterable[Dict]:
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide2.QtCore import QSize
+    from PySide2.QtGui import QImage, QPainter
+    from PySide2.QtWidgets import QApplication
+    from gui import AztecDiamondRenderer
+    app = QApplication.instance() or QApplication([])
+    renderer = AztecDiamondRenderer()
+    try:
+        # The raster path is measured on its own; tiles are built in the background and measured separately below
+        renderer.tiles_enabled = False
+        renderer.set_board(board.sample_tiling(order, seed=SEED))
+        renderer.recalculate_holes()
+        size = QSize(PAINT_SIZE, PAINT_SIZE)
+        image = QImage(size, QImage.Format_RGB32)
+
+        def paint():
+            painter = QPainter(image)
+            renderer.paint_board(painter, size)
+            painter.end()
+
+        # The first paint builds the derived squares and the raster image, so it's measured separately
+        yield 'paint_first', measure(lambda: (renderer.board.invalidate_derived(),), lambda _: paint(), repeat)
+        yield 'paint', measure(lambda: (), paint, repeat)
+        if order * 2 >= renderer.TILED_MIN_HEIGHT:
+            renderer.tiles_enabled = True
+            pyramid = renderer.sync_pyramid()
+            # Painting before the tile worker built the overview would draw nothing
+            while pyramid.overview is None:
+                sleep(0.001)
+            yield 'paint_tiled', measure(lambda: (), paint, repeat)
+            renderer.tiles_enabled = False
+        if order <= max_vector_order:
+            renderer.raster_enabled = False
+            yield 'paint_vector', measure(lambda: (), paint, repeat)
+    finally:
+        renderer.stop_tile_worker()
+    del app
+
+
+def run_suite(
+    orders=DEFAULT_ORDERS, engines=('array', 'packed', 'dict'), repeat=3, paint=True,
+    max_dict_order=DEFAULT_MAX_DICT_ORDER, max_vector_paint_order=DEFAULT_MAX_VECTOR_PAINT_ORDER,
+    progress: Optional[Callable[[Dict], None]] = None
+) -> Dict:
+    """Runs the benchmarks and returns a JSON-compatible dict. ``progress`` is called with every result."""
+    results: List[Dict] = []
+
+    def record(engine_name, order, measurements):
+        for operation, measurement in measurements:
+            result = {'engine': engine_name, 'order': order, 'operation': operation, **measurement}
+            results.append(result)
+            if progress is not None:
+                progress(result)
+
+    for order in orders:
+        for engine_name in engines:
+            if engine_name == 'dict' and order > max_dict_order:
+                continue
+            record(engine_name, order, board_benchmarks(engine_name, order, repeat))
+        if paint:
+            record('gui', order, paint_benchmarks(order, repeat, max_vector_paint_order))
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'repeat': repeat
+        },
+        'results': results
+    }
+
+
+def compare_results(results: Dict, baseline: Dict, threshold) -> List[str]:
+    """Returns a description of every measurement that is more than ``threshold`` (a fraction, e.g. 0.25 for 25%)
+    slower or larger than the same measurement in the baseline. Measurements missing from either side are ignored."""
+    def key(result):
+        return result['engine'], result['order'], result['operation']
+
+    baseline_results = {key(result): result for result in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        old = baseline_results.get(key(result))
+        if old is None:
+            continue
+        for metric in 'seconds', 'peak_bytes':
+            if old[metric] > 0 and result[metric] > old[metric] * (1 + threshold):
+                regressions.append(
+                    f'{result["engine"]} {result["operation"]} at order {result["order"]}: '
+                    f'{metric} went from {old[metric]:.6g} to {result[metric]:.6g} '
+                    f'(+{(result[metric] / old[metric] - 1) * 100:.0f}%)'
+                )
+    return regressions
@@ -1 +1,11 @@
 from .board import *
+from .profiling import *
+from .array_board import *
+from .packed_board import *
+from .sampling import *
+from .stats import *
+from .batch import *
+from .parallel import *
+from .fileformat import *
+from .jobs import *
+from .history import *
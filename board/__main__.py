@@ -0,0 +1,188 @@
+"""
+Headless sampler: ``python -m board ORDER [--seed SEED] [--count COUNT] [--output-dir DIR] [--stats FILE]``.
+
+Only the ``board`` package is imported, so this runs without Qt. Tilings are written to stdout unless an output
+directory or a statistics file is given, and the wall time of each phase is reported on stderr.
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+import numpy as np
+
+from .batch import sample_tiling_batch
+from .board import DICT_ENGINE, ARRAY_ENGINE, PACKED_ENGINE
+from .fileformat import write_board
+from .parallel import sample_tiling_parallel
+from .pool import generate_tilings, accumulate_statistics
+from .profiling import Profile
+from .rng import sample_seed
+from .sampling import sample_tiling, format_tiling
+from .stats import TilingStatistics
+
+ENGINES = {'dict': DICT_ENGINE, 'array': ARRAY_ENGINE, 'packed': PACKED_ENGINE}
+FORMATS = ('text', 'npy', 'msd')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m board', description='Sample random tilings of Aztec Diamonds.')
+    parser.add_argument('order', type=int, help='order of the diamond (half of its height)')
+    parser.add_argument('--seed', type=int, help='seed of the run; sample i uses a seed derived from (seed, i)')
+    parser.add_argument('--count', type=int, default=1, help='number of tilings to generate (default: 1)')
+    parser.add_argument('--engine', choices=ENGINES, default='array', help='board engine (default: array)')
+    parser.add_argument(
+        '--format', choices=FORMATS, default='text',
+        help='output format; msd is the compact binary format of board.fileformat (default: text)'
+    )
+    parser.add_argument(
+        '--output-dir', help='write one file per tiling into this directory instead of streaming to stdout'
+    )
+    parser.add_argument(
+        '--processes', type=int, default=1,
+        help='number of worker processes; 0 means one per CPU (default: 1, which runs in this process)'
+    )
+    parser.add_argument(
+        '--stats', metavar='FILE',
+        help='accumulate per-square color counts of all tilings into this .npz file (see board.TilingStatistics); '
+             'tilings are then only written if --output-dir is given'
+    )
+    parser.add_argument(
+        '--batch-size', type=int, default=1,
+        help='number of tilings simulated together as one board.BoardBatch when running in this process, which is '
+             'much faster for small orders (default: 1)'
+    )
+    parser.add_argument(
+        '--bands', type=int,
+        help='split every tiling into this many bands of rows that are shuffled in parallel by --processes workers, '
+             'for single tilings of very large orders (board.ParallelShuffle)'
+    )
+    parser.add_argument(
+        '--profile', metavar='FILE',
+        help='write the time spent in each phase and counts of annihilated dominoes and filled holes of every tiling '
+             'to this file as JSON lines (- for stderr; see board.Profile)'
+    )
+    parser.add_argument('--quiet', action='store_true', help="don't report timings on stderr")
+    args = parser.parse_args(argv)
+    if args.order < 1:
+        parser.error('the order must be at least 1')
+    if args.count < 0:
+        parser.error('the count must not be negative')
+    if args.bands is not None and args.bands < 1:
+        parser.error('the number of bands must be at least 1')
+    if args.batch_size < 1:
+        parser.error('the batch size must be at least 1')
+    if args.processes < 0:
+        parser.error('the number of processes must not be negative')
+    if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+        parser.error('the seed must be in [0, 2 ** 64)')
+    if args.format == 'npy' and args.output_dir is None:
+        parser.error('the npy format requires --output-dir')
+    if args.profile is not None and (args.bands is not None or args.processes == 1 and args.batch_size > 1):
+        parser.error('--profile can only be used with tilings that are shuffled one by one')
+    if args.profile is not None and args.stats is not None and args.output_dir is None and args.processes != 1:
+        parser.error('--profile requires --output-dir when --stats is used with several processes')
+    return args
+
+
+def write_tiling(board, args, index):
+    if args.output_dir is None and args.format == 'msd':
+        write_board(board, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+        return
+    if args.output_dir is None:
+        sys.stdout.write(
+            f'# order={args.order} index={index} seed={board.seed} polarity={board.polarity} step={board.step}\n'
+        )
+        sys.stdout.write(format_tiling(board))
+        sys.stdout.flush()
+        return
+    path = os.path.join(args.output_dir, f'tiling-{args.order}-{args.seed}-{index}.{args.format}')
+    if args.format == 'npy':
+        np.save(path, board.to_array())
+    elif args.format == 'msd':
+        board.save(path)
+    else:
+        with open(path, 'w') as f:
+            f.write(format_tiling(board))
+
+
+def batched_tilings(args, timings):
+    for start in range(0, args.count, args.batch_size):
+        indices = range(start, min(start + args.batch_size, args.count))
+        batch = sample_tiling_batch(args.order, [sample_seed(args.seed, i) for i in indices], timings)
+        for k, i in enumerate(indices):
+            yield i, batch.board(k, ENGINES[args.engine])
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.seed is None:
+        args.seed = random.getrandbits(64)
+    if args.output_dir is not None:
+        os.makedirs(args.output_dir, exist_ok=True)
+    timings = {}
+    start = perf_counter()
+    statistics = None
+    if args.bands is not None:
+        tilings = (
+            (i, sample_tiling_parallel(
+                args.order, sample_seed(args.seed, i), args.processes or None, args.bands, timings
+            ).convert(ENGINES[args.engine]))
+            for i in range(args.count)
+        )
+    elif args.stats is not None and args.output_dir is None and args.processes != 1:
+        # Workers reduce their own samples, so no tilings need to be sent back
+        statistics = accumulate_statistics(
+            args.order, args.count, args.seed, processes=args.processes or None, engine=ENGINES[args.engine],
+            timings=timings
+        )
+        tilings = ()
+    elif args.processes == 1 and args.batch_size > 1:
+        tilings = batched_tilings(args, timings)
+    elif args.processes == 1:
+        tilings = (
+            (i, sample_tiling(
+                args.order, seed=sample_seed(args.seed, i), engine=ENGINES[args.engine], timings=timings,
+                profile=Profile(enabled=True) if args.profile is not None else None
+            ))
+            for i in range(args.count)
+        )
+    else:
+        tilings = generate_tilings(
+            args.order, args.count, args.seed, processes=args.processes or None, engine=ENGINES[args.engine],
+            timings=timings, profile=args.profile is not None
+        )
+    if args.stats is not None and statistics is None:
+        statistics = TilingStatistics(args.order)
+    profile_file = None
+    if args.profile is not None:
+        profile_file = sys.stderr if args.profile == '-' else open(args.profile, 'w')
+    try:
+        for i, board in tilings:
+            output_start = perf_counter()
+            if statistics is not None:
+                statistics.add(board)
+            if args.stats is None or args.output_dir is not None:
+                write_tiling(board, args, i)
+            if profile_file is not None:
+                profile_file.write(board.profile.to_json(order=args.order, index=i, seed=board.seed) + '\n')
+            timings['output'] = timings.get('output', 0.0) + perf_counter() - output_start
+    finally:
+        if profile_file is not None and profile_file is not sys.stderr:
+            profile_file.close()
+    if statistics is not None:
+        statistics.save(args.stats)
+    if not args.quiet:
+        total = perf_counter() - start
+        print(f'order {args.order}, seed {args.seed}, {args.count} tilings in {total:.3f} s', file=sys.stderr)
+        if statistics is not None:
+            print(f'  arctic circle radius estimate: {statistics.arctic_radius():.4f} * order', file=sys.stderr)
+        for phase, seconds in timings.items():  # Phases run in worker processes add up across all of them
+            per_tiling = seconds / max(args.count, 1) * 1000
+            print(f'  {phase:<14}{seconds:10.3f} s{per_tiling:12.2f} ms/tiling', file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
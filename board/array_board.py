@@ -0,0 +1,383 @@
+from functools import lru_cache
+from typing import Callable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .board import (
+    Board, SquareColor, ARRAY_ENGINE, ALL_GRAY, HORIZONTAL, VERTICAL, NO_COLOR, GRAY, RED, YELLOW, GREEN, BLUE,
+    COLOR_PAIRS
+)
+
+__all__ = [
+    'ArrayBoard', 'diamond_mask', 'black_mask', 'diamond_ring', 'holes_from_gray_squares', 'hole_tops',
+    'holes_from_gray_mask', 'fill_squares', 'advance_band', 'annihilated_pairs'
+]
+
+
+@lru_cache(maxsize=2)
+def diamond_mask(height) -> np.ndarray:
+    """Returns a ``height`` x ``height`` boolean array which is True for squares inside the Aztec Diamond.
+    Indexing is the same as in ``Board.to_array()``. The result is cached, so it's read-only."""
+    # A square (x, y) is inside the diamond if |2x + 1| + |2y + 1| <= height; rows and columns have the same values
+    extents = np.abs(np.arange(1 - height, height, 2))
+    mask = np.less_equal.outer(extents, height - extents)
+    mask.setflags(write=False)
+    return mask
+
+
+@lru_cache(maxsize=2)
+def black_mask(height) -> np.ndarray:
+    """Same as ``diamond_mask()``, but only True for black squares."""
+    mask = diamond_mask(height).copy()
+    # The bounding square has an even height, so black squares are at indices with an even sum, like coordinates
+    mask[::2, 1::2] = False
+    mask[1::2, ::2] = False
+    mask.setflags(write=False)
+    return mask
+
+
+def diamond_ring(inner_height, outer_height) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the coordinates (xs, ys) of black squares inside the diamond of height ``outer_height``, but not inside
+    the one of height ``inner_height``. Only the squares of the ring are computed, so a thin ring is cheap."""
+    radius = outer_height // 2
+    ys = np.arange(-radius, radius)
+    row_widths = np.abs(2 * ys + 1)
+    # On each row, the ring holds the squares with odd |2x + 1| in (inner_height - width, outer_height - width]
+    lowest = np.maximum(inner_height - row_widths + 2, 1)
+    highest = outer_height - row_widths
+    counts = np.maximum((highest - lowest) // 2 + 1, 0)
+    ys = np.repeat(ys, counts)
+    starts = np.repeat(np.cumsum(counts) - counts, counts)
+    widths = np.repeat(lowest, counts) + 2 * (np.arange(len(ys)) - starts)
+    xs = np.concatenate(((widths - 1) // 2, -(widths + 1) // 2))
+    ys = np.concatenate((ys, ys))
+    is_black = (xs + ys) % 2 == 0
+    return xs[is_black], ys[is_black]
+
+
+def centered(array: np.ndarray, height) -> np.ndarray:
+    """Returns a view of the central ``height`` x ``height`` square of the last two axes of ``array``."""
+    start = (array.shape[-1] - height) // 2
+    return array[..., start:start + height, start:start + height]
+
+
+def holes_from_gray_squares(xs: np.ndarray, ys: np.ndarray, height, boards: Optional[np.ndarray] = None) -> np.ndarray:
+    """Returns the top left corners of the holes formed by gray black squares at the given coordinates, sorted by Y
+    and then X, as an N x 2 array. Like ``Board.get_holes()``, this assumes a valid board.
+    If ``boards`` is given, the squares belong to several boards of the same height: ``boards`` holds the index of
+    each square's board, and the result is an N x 3 array of (board, x, y) sorted by board, then Y, then X."""
+    # In a valid board, the top left corner (x, y) of every hole satisfies x + y = radius + 1 (mod 2), so both black
+    # squares of a hole lie on one diagonal: (x, y) and (x + 1, y + 1) if radius is odd, (x + 1, y) and (x, y + 1)
+    # otherwise. Gray squares on such a diagonal are paired up starting from the top, so a gray square is the top
+    # of its hole if an even number of gray squares are directly above it on the diagonal.
+    direction = 1 if height // 2 % 2 else -1
+    diagonals = xs - direction * ys
+    if boards is None:
+        order = np.lexsort((ys, diagonals))
+    else:
+        order = np.lexsort((ys, diagonals, boards))
+    run_breaks = np.ones(len(order), dtype=bool)
+    run_breaks[1:] = (np.diff(diagonals[order]) != 0) | (np.diff(ys[order]) != 1)
+    if boards is not None:
+        run_breaks[1:] |= np.diff(boards[order]) != 0
+    positions = np.arange(len(order))
+    run_starts = np.maximum.accumulate(np.where(run_breaks, positions, 0))
+    is_top = np.empty(len(order), dtype=bool)
+    is_top[order] = (positions - run_starts) % 2 == 0
+    xs = xs[is_top] - (direction == -1)
+    ys = ys[is_top]
+    if boards is None:
+        order = np.lexsort((xs, ys))
+        return np.stack((xs[order], ys[order]), axis=1)
+    boards = boards[is_top]
+    order = np.lexsort((xs, ys, boards))
+    return np.stack((boards[order], xs[order], ys[order]), axis=1)
+
+
+def hole_tops(gray_above: Callable[[np.ndarray, int], np.ndarray], count) -> np.ndarray:
+    """Returns which of ``count`` gray squares that are followed by another gray square on their diagonal are the top
+    squares of holes. ``gray_above(indices, k)`` returns whether the k-th squares above the given ones on their
+    diagonals are gray. Gray squares on a diagonal are paired up starting from the top, so a square is the top of its
+    hole if an even number of gray squares are directly above it. Runs of more than two gray squares are rare, so
+    after the first step only the squares that still have gray squares above them are followed."""
+    is_top = np.ones(count, dtype=bool)
+    indices = np.arange(count)
+    k = 1
+    while len(indices):
+        indices = indices[gray_above(indices, k)]
+        is_top[indices] ^= True
+        k += 1
+    return is_top
+
+
+def holes_from_gray_mask(is_gray: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """Same as ``holes_from_gray_squares()``, but the gray squares are given as a boolean array over the cells of a
+    board in the format of ``Board.to_array()``, or over a stack of such boards, for which the result holds
+    (board, x, y). Holes are found with a few whole-array operations on pairs of gray squares, without sorting.
+    ``out`` is an optional boolean array of the shape of ``is_gray`` minus one row and column, used for the pairs."""
+    height = is_gray.shape[-1]
+    radius = height // 2
+    # The top square of a hole at (x, y) is followed by the other one at (x + 1, y + 1) if radius is odd and at
+    # (x - 1, y + 1) otherwise (see holes_from_gray_squares()), and the top left corner is (x, y) or (x - 1, y).
+    # Cells of pairs are indexed by the corner the hole would have.
+    direction = 1 if radius % 2 else -1
+    longer = np.zeros(is_gray.shape[:-2] + (height - 1, height - 1), dtype=bool)
+    if direction == 1:
+        pairs = np.logical_and(is_gray[..., :-1, :-1], is_gray[..., 1:, 1:], out=out)
+        np.logical_and(pairs[..., 1:, 1:], is_gray[..., :-2, :-2], out=longer[..., 1:, 1:])
+    else:
+        pairs = np.logical_and(is_gray[..., :-1, 1:], is_gray[..., 1:, :-1], out=out)
+        np.logical_and(pairs[..., 1:, :-1], is_gray[..., :-2, 2:], out=longer[..., 1:, :-1])
+    # A pair whose top square has no gray square above it on the diagonal is a hole. The others are in runs of more
+    # than two gray squares, which are rare, so only those are followed upwards.
+    np.greater(pairs, longer, out=pairs)
+    # flatnonzero() is several times faster than nonzero() on more than one dimension
+    *boards, ys, xs = np.unravel_index(np.flatnonzero(longer), longer.shape)
+    top_xs = xs + (direction == -1)
+
+    def gray_above(indices, k):
+        above_ys = ys[indices] - k
+        above_xs = top_xs[indices] - k * direction
+        inside = (above_ys >= 0) & (above_xs >= 0) & (above_xs < height)
+        is_gray_above = np.zeros(len(indices), dtype=bool)
+        is_gray_above[inside] = is_gray[(*(b[indices[inside]] for b in boards), above_ys[inside], above_xs[inside])]
+        return is_gray_above
+
+    pairs[(*boards, ys, xs)] = hole_tops(gray_above, len(ys))
+    # Cells come out in the order of get_holes()
+    *boards, ys, xs = np.unravel_index(np.flatnonzero(pairs), pairs.shape)
+    return np.stack((*boards, xs - radius, ys - radius), axis=1)
+
+
+def fill_squares(data: np.ndarray, holes: np.ndarray, horizontal: np.ndarray):
+    """Fills the holes (an N x 2 array of corners) of an array in the format of ``Board.to_array()``, with horizontal
+    dominoes where ``horizontal`` is True and vertical ones elsewhere."""
+    radius = len(data) // 2
+    x = holes[:, 0] + radius
+    y = holes[:, 1] + radius
+    black = (x + y) % 2 == 0
+    top = np.where(horizontal, BLUE, np.where(black, YELLOW, RED)).astype(np.int8)
+    bottom = np.where(horizontal, GREEN, np.where(black, RED, YELLOW)).astype(np.int8)
+    data[y, x + ~black] = top
+    data[y + 1, x + black] = bottom
+
+
+def advance_band(
+    padded: np.ndarray, new: np.ndarray, color_delta, previous_height, start, stop, scratch: Optional[np.ndarray] = None
+):
+    """Writes rows ``start`` to ``stop - 1`` of the board that follows a board of height h into ``new``.
+    ``padded`` is the old board with a border of one NO_COLOR cell on every side, and ``new`` is an (h + 2) x (h + 2)
+    array that holds a valid board of ``previous_height`` (or nothing but NO_COLOR if that's 0), centered.
+    Only the given rows of ``new`` are written, so separate bands can be built at the same time. If ``scratch`` is
+    given, it's a (2, >= h + 2, >= h + 2) boolean array used instead of allocating temporary arrays.
+    Both arrays may also be stacks of boards (as in ``BoardBatch``), with the scratch space stacked the same way
+    after its first axis."""
+    height = padded.shape[-1] - 2
+    band = new[..., start:stop, :]
+    # The older board's squares are turned gray, and so are the squares between it and the new diamond, which gives
+    # the same result as generate_data(). NO_COLOR is below GRAY and every other color above it.
+    np.minimum(band, GRAY, out=band)
+    xs, ys = diamond_ring(previous_height, height + 2)
+    in_band = (start <= ys + height // 2 + 1) & (ys + height // 2 + 1 < stop)
+    new[..., ys[in_band] + height // 2 + 1, xs[in_band] + height // 2 + 1] = GRAY
+    for color, (dx, dy) in color_delta.items():
+        # Rows of the old board whose dominoes of this color move into the band
+        first = max(start - 1 - dy, 0)
+        last = min(stop - 1 - dy, height)
+        if first >= last:
+            continue
+        old = padded[..., 1 + first:1 + last, 1:1 + height]
+        # The square each domino moves onto, as seen from the domino's own position
+        target = padded[..., 1 + first + dy:1 + last + dy, 1 + dx:1 + dx + height]
+        if scratch is None:
+            moving = (old == color) & (target != COLOR_PAIRS[color])
+            colors = moving.view(np.int8) * color
+        else:
+            moving = np.equal(old, color, out=scratch[0][..., :last - first, :height])
+            not_annihilated = np.not_equal(target, COLOR_PAIRS[color], out=scratch[1][..., :last - first, :height])
+            np.logical_and(moving, not_annihilated, out=moving)
+            colors = np.multiply(moving.view(np.int8), color, out=not_annihilated.view(np.int8))
+        # Every square a domino moves onto is still GRAY, which is 0, so adding the color sets it. This doesn't branch
+        # on every square like copyto(where=) does, which makes it several times faster.
+        destination = new[..., 1 + first + dy:1 + last + dy, 1 + dx:1 + dx + height]
+        np.add(destination, colors, out=destination)
+
+
+def annihilated_pairs(data: np.ndarray, polarity) -> int:
+    """Returns the number of pairs of dominoes that the next ``advance_magic()`` of a board in the format of
+    ``Board.to_array()`` annihilates."""
+    height = len(data)
+    padded = np.full((height + 2, height + 2), NO_COLOR, dtype=np.int8)
+    padded[1:-1, 1:-1] = data
+    count = 0
+    # Every pair has one RED or BLUE domino, which moves onto the other domino of the pair
+    for color, (dx, dy) in ((RED, (1, -polarity)), (BLUE, (polarity, -1))):
+        target = padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + height]
+        count += int(np.count_nonzero((data == color) & (target == COLOR_PAIRS[color])))
+    return count
+
+
+class ArrayBoard(Board):
+    """
+    Aztec Diamond board backed by a dense NumPy array.
+
+    ``data`` is the array returned by ``Board.to_array()``: an int8 grid over the bounding square of the diamond,
+    where black squares inside the diamond hold their color and every other cell holds NO_COLOR.
+    Moving and annihilating dominoes is done with a few whole-array operations per color instead of per square.
+    After ``reserve()``, ``data`` is a view into two preallocated buffers that take turns holding the board, and
+    ``advance_magic()`` grows it in place without allocating anything proportional to the size of the board.
+    """
+    engine = ARRAY_ENGINE
+    # Set by reserve(): the (2, height, height) buffers, boolean scratch space of the same shape (unless the buffers
+    # were given), the height of the board each buffer last held, and the index of the buffer ``data`` is a view of
+    _buffers = None
+    _scratch = None
+    _buffer_heights = None
+    _current_buffer = 0
+
+    @staticmethod
+    def empty_data(height):
+        return np.full((height, height), NO_COLOR, dtype=np.int8)
+
+    @staticmethod
+    def generate_data(height, fill_strategy=ALL_GRAY) -> np.ndarray:
+        colors = {
+            ALL_GRAY: (GRAY, GRAY),
+            HORIZONTAL: (GREEN, BLUE) if height % 4 == 0 else (BLUE, GREEN),
+            VERTICAL: NotImplemented
+        }[fill_strategy]
+        data = np.full((height, height), NO_COLOR, dtype=np.int8)
+        mask = black_mask(height)
+        data[:height // 2][mask[:height // 2]] = colors[0]
+        data[height // 2:][mask[height // 2:]] = colors[1]
+        return data
+
+    @staticmethod
+    def data_from_array(array: np.ndarray):
+        return np.array(array, dtype=np.int8)
+
+    def to_array(self) -> np.ndarray:
+        return self.data.copy()
+
+    def get_black_square_color(self, x, y) -> SquareColor:
+        radius = len(self.data) // 2
+        if -radius <= x < radius and -radius <= y < radius:
+            return SquareColor(int(self.data[y + radius, x + radius]))
+        return NO_COLOR
+
+    def reserve(self, order, buffers: Optional[np.ndarray] = None):
+        """Same as ``Board.reserve()``. If ``buffers`` is given, it's a (2, 2 * order, 2 * order) int8 array to use as
+        the buffers, for example in shared memory; no scratch space is allocated then."""
+        height = order * 2
+        if buffers is None:
+            if height <= len(self.data) or self._buffers is not None and height <= self._buffers.shape[-1]:
+                return
+            buffers = np.empty((2, height, height), dtype=np.int8)
+            self._scratch = np.empty((2, height, height), dtype=bool)
+        else:
+            self._scratch = None
+        buffers.fill(NO_COLOR)
+        centered(buffers[0], len(self.data))[...] = self.data
+        self._buffers = buffers
+        self._buffer_heights = [len(self.data), 0]
+        self._use_buffer(0, len(self.data))
+
+    @property
+    def buffer_index(self) -> Optional[int]:
+        """Index of the reserved buffer that ``data`` is a view of, or None if no buffers are reserved."""
+        return self._current_buffer if self._is_reserved(len(self.data)) else None
+
+    def buffer_height(self, index) -> int:
+        """Returns the height of the board that a reserved buffer last held, or 0 if it hasn't held one."""
+        return self._buffer_heights[index]
+
+    def swap_buffers(self, height):
+        """Makes ``data`` the centered board of the given height in the other reserved buffer, once the next board has
+        been built there, for example by ``advance_band()``."""
+        self._use_buffer(1 - self._current_buffer, height)
+
+    def release_buffers(self):
+        """Copies the board out of the reserved buffers and stops using them, for example before they're freed."""
+        if self._buffers is not None:
+            self.data = self.data.copy()
+            self._buffers = self._scratch = self._buffer_heights = None
+
+    def _use_buffer(self, index, height):
+        self._buffer_heights[index] = height
+        self._current_buffer = index
+        self.data = centered(self._buffers[index], height)
+
+    def _is_reserved(self, height) -> bool:
+        """Returns whether a board of the given height fits in the reserved buffers and ``data`` is still the view
+        into them (rather than an array assigned from the outside)."""
+        if self._buffers is None:
+            return False
+        if self.data.base is not self._buffers or height > self._buffers.shape[-1]:
+            self._buffers = self._scratch = self._buffer_heights = None
+            return False
+        return True
+
+    def get_holes(self, as_array=False) -> Union[List[Tuple[int, int]], np.ndarray]:
+        height = len(self.data)
+        with self.profile.timed('get_holes'):
+            if self._is_reserved(height) and self._scratch is not None:
+                # Contiguous parts of the scratch space, which whole-array operations go through faster than views
+                is_gray = self._scratch[0].reshape(-1)[:height ** 2].reshape(height, height)
+                pairs = self._scratch[1].reshape(-1)[:(height - 1) ** 2].reshape(height - 1, height - 1)
+                corners = holes_from_gray_mask(np.equal(self.data, GRAY, out=is_gray), pairs)
+            else:
+                corners = holes_from_gray_mask(self.data == GRAY)
+        if as_array:
+            return corners
+        return list(map(tuple, corners.tolist()))
+
+    def fill_holes(self, holes: Union[List[Tuple[int, int]], np.ndarray], first_hole_index=0):
+        holes = np.asarray(holes, dtype=np.intp).reshape(-1, 2)
+        if not len(holes):
+            return
+        with self.profile.timed('fill_holes'):
+            fill_squares(self.data, holes, self.draw_orientations(len(holes), first_hole_index))
+            self.invalidate_derived()
+        self.profile.count('holes_filled', len(holes))
+
+    def advance_magic(self):
+        old = self.data
+        height = len(old)
+        color_delta = {
+            RED: (1, -self.polarity),
+            YELLOW: (-1, self.polarity),
+            BLUE: (self.polarity, -1),
+            GREEN: (-self.polarity, 1)
+        }
+        if self.profile.enabled:
+            self.profile.count('steps')
+            self.profile.count('annihilated_pairs', annihilated_pairs(old, self.polarity))
+        if self._is_reserved(height + 2):
+            with self.profile.timed('advance_magic'):
+                self._advance_in_place(color_delta)
+        else:
+            with self.profile.timed('generate_data'):
+                new = self.generate_data(height + 2)
+            with self.profile.timed('advance_magic'):
+                padded = np.full_like(new, NO_COLOR)
+                padded[1:-1, 1:-1] = old
+                for color, (dx, dy) in color_delta.items():
+                    # The square each domino moves onto, as seen from the domino's own position
+                    target = padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + height]
+                    moving = (old == color) & (target != COLOR_PAIRS[color])
+                    new[1 + dy:1 + dy + height, 1 + dx:1 + dx + height][moving] = color
+            self.data = new
+        self.polarity *= -1
+        self.step += 1
+        self.invalidate_derived()
+
+    def _advance_in_place(self, color_delta):
+        """Same as the body of ``advance_magic()``, but the new board is built in the other reserved buffer. Cells
+        around the board are always NO_COLOR in both buffers, so they serve as the padding."""
+        height = len(self.data)
+        new_buffer = 1 - self._current_buffer
+        advance_band(
+            centered(self._buffers[self._current_buffer], height + 2), centered(self._buffers[new_buffer], height + 2),
+            color_delta, self._buffer_heights[new_buffer], 0, height + 2, self._scratch
+        )
+        self.swap_buffers(height + 2)
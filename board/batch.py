@@ -0,0 +1,164 @@
+import random
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .array_board import ArrayBoard, centered, holes_from_gray_mask, advance_band
+from .board import Board, Engine, ARRAY_ENGINE, NO_COLOR, GRAY, RED, YELLOW, GREEN, BLUE, COLOR_PAIRS
+from .profiling import timed
+from .rng import batch_hole_orientations, sample_seed
+
+__all__ = ['BoardBatch', 'sample_tiling_batch']
+
+
+class BoardBatch:
+    """
+    A stack of independent seeded boards of the same order, which are advanced and filled together.
+
+    ``data`` is a K x height x height int8 array where ``data[k]`` is laid out like ``ArrayBoard.data``.
+    Each operation works on all K boards with the same few array operations, and the orientations of every hole of
+    every board are drawn in one call, so small boards don't pay Python overhead per board. Board k evolves exactly
+    like a single board with the seed ``seeds[k]``. Like ``ArrayBoard``, a batch can ``reserve()`` two buffers that
+    take turns holding it, so that ``advance_magic()`` doesn't allocate anything proportional to the size of the
+    batch.
+    """
+    def __init__(self, seeds: Sequence[int], height=2):
+        self.seeds = np.array(seeds, dtype=np.uint64).reshape(-1)
+        self.data = np.broadcast_to(ArrayBoard.generate_data(height), (len(self.seeds), height, height)).copy()
+        self.polarity = 1
+        self.step = 0
+        # Set by reserve(), as in ArrayBoard: the (2, K, height, height) buffers, boolean scratch space of the same
+        # shape, the height of the boards each buffer holds and the index of the buffer that data is a view of
+        self._buffers = None
+        self._scratch = None
+        self._buffer_heights = None
+        self._current_buffer = 0
+
+    @classmethod
+    def from_run(cls, seed, count, first_index=0, height=2) -> 'BoardBatch':
+        """Creates a batch of the samples ``first_index`` to ``first_index + count - 1`` of a run with the given seed
+        (see ``board.rng.sample_seed()``)."""
+        return cls([sample_seed(seed, i) for i in range(first_index, first_index + count)], height)
+
+    @classmethod
+    def random(cls, count, height=2) -> 'BoardBatch':
+        return cls([random.getrandbits(64) for _ in range(count)], height)
+
+    def __len__(self):
+        return len(self.seeds)
+
+    @property
+    def height(self) -> int:
+        return self.data.shape[-1]
+
+    def reserve(self, order):
+        """Same as ``ArrayBoard.reserve()`` for every board of the batch."""
+        height = order * 2
+        if height <= self.height or self._buffers is not None and height <= self._buffers.shape[-1]:
+            return
+        buffers = np.full((2, len(self), height, height), NO_COLOR, dtype=np.int8)
+        centered(buffers[0], self.height)[...] = self.data
+        self._buffers = buffers
+        self._scratch = np.empty((2, len(self), height, height), dtype=bool)
+        self._buffer_heights = [self.height, 0]
+        self._use_buffer(0, self.height)
+
+    def _use_buffer(self, index, height):
+        self._buffer_heights[index] = height
+        self._current_buffer = index
+        self.data = centered(self._buffers[index], height)
+
+    def _is_reserved(self, height) -> bool:
+        """Returns whether ``data`` is in the reserved buffers and a batch of the given height fits in them. If
+        ``data`` was replaced, the buffers are released."""
+        if self._buffers is None:
+            return False
+        if self.data.base is not self._buffers or height > self._buffers.shape[-1]:
+            self._buffers = self._scratch = self._buffer_heights = None
+            return False
+        return True
+
+    def _scratch_part(self, index, shape) -> np.ndarray:
+        """Returns a contiguous boolean array of the given shape in the reserved scratch space."""
+        return self._scratch[index].reshape(-1)[:int(np.prod(shape))].reshape(shape)
+
+    def get_holes(self) -> np.ndarray:
+        """Returns the holes of all boards as an N x 3 array of (board index, x, y), in the order in which each
+        board's ``get_holes()`` would return them."""
+        if not self._is_reserved(self.height):
+            return holes_from_gray_mask(self.data == GRAY)
+        is_gray = np.equal(self.data, GRAY, out=self._scratch_part(0, self.data.shape))
+        return holes_from_gray_mask(is_gray, self._scratch_part(1, (len(self), self.height - 1, self.height - 1)))
+
+    def fill_holes(self, holes: np.ndarray):
+        """Fills holes returned by ``get_holes()``, which must include all holes of every board that has any."""
+        holes = np.asarray(holes, dtype=np.intp).reshape(-1, 3)
+        if not len(holes):
+            return
+        radius = self.height // 2
+        k = holes[:, 0]
+        x = holes[:, 1] + radius
+        y = holes[:, 2] + radius
+        black = (x + y) % 2 == 0
+        horizontal = batch_hole_orientations(self.seeds, self.step, np.bincount(k, minlength=len(self)))
+        top = np.where(horizontal, BLUE, np.where(black, YELLOW, RED)).astype(np.int8)
+        bottom = np.where(horizontal, GREEN, np.where(black, RED, YELLOW)).astype(np.int8)
+        self.data[k, y, x + ~black] = top
+        self.data[k, y + 1, x + black] = bottom
+
+    def advance_magic(self):
+        old = self.data
+        height = self.height
+        color_delta = {
+            RED: (1, -self.polarity),
+            YELLOW: (-1, self.polarity),
+            BLUE: (self.polarity, -1),
+            GREEN: (-self.polarity, 1)
+        }
+        if self._is_reserved(height + 2):
+            # The other buffer holds the batch from two steps ago, and cells around the boards are always NO_COLOR in
+            # both buffers, so they serve as the padding
+            new_buffer = 1 - self._current_buffer
+            advance_band(
+                centered(self._buffers[self._current_buffer], height + 2),
+                centered(self._buffers[new_buffer], height + 2),
+                color_delta, self._buffer_heights[new_buffer], 0, height + 2, self._scratch
+            )
+            self._use_buffer(new_buffer, height + 2)
+        else:
+            new = np.broadcast_to(ArrayBoard.generate_data(height + 2), (len(self), height + 2, height + 2)).copy()
+            padded = np.full_like(new, NO_COLOR)
+            padded[:, 1:-1, 1:-1] = old
+            for color, (dx, dy) in color_delta.items():
+                # The square each domino moves onto, as seen from the domino's own position
+                target = padded[:, 1 + dy:1 + dy + height, 1 + dx:1 + dx + height]
+                moving = (old == color) & (target != COLOR_PAIRS[color])
+                new[:, 1 + dy:1 + dy + height, 1 + dx:1 + dx + height][moving] = color
+            self.data = new
+        self.polarity *= -1
+        self.step += 1
+
+    def board(self, index, engine: Engine = ARRAY_ENGINE) -> Board:
+        """Returns a copy of one board of the batch as a ``Board`` of the given engine."""
+        return Board.from_array(self.data[index], self.polarity, int(self.seeds[index]), self.step, engine)
+
+    def boards(self, engine: Engine = ARRAY_ENGINE) -> List[Board]:
+        return [self.board(i, engine) for i in range(len(self))]
+
+
+def sample_tiling_batch(order, seeds: Sequence[int], timings: Optional[Dict[str, float]] = None) -> BoardBatch:
+    """Same as ``sample_tiling()`` for every seed, but all tilings are generated together as a ``BoardBatch``."""
+    if order < 1:
+        raise ValueError('The order of an Aztec Diamond must be at least 1.')
+    with timed(timings, 'generate_data'):
+        batch = BoardBatch(seeds)
+        batch.reserve(order)
+    for i in range(order):
+        if i:
+            with timed(timings, 'advance_magic'):
+                batch.advance_magic()
+        with timed(timings, 'get_holes'):
+            holes = batch.get_holes()
+        with timed(timings, 'fill_holes'):
+            batch.fill_holes(holes)
+    return batch
@@ -1,11 +1,17 @@
 from collections import OrderedDict
-from typing import Dict, List, NewType, Optional, Tuple
+from typing import Dict, List, NamedTuple, NewType, Optional, Tuple, Union
 from random import getrandbits
 
+import numpy as np
+
+from .profiling import Profile
+from .rng import hole_orientations
+
 
 SquareParity = NewType('SquareParity', int)
 SquareColor = NewType('SquareColor', int)
 FillStrategy = NewType('FillStrategy', int)
+Engine = NewType('Engine', int)
 
 BLACK = SquareParity(0)
 WHITE = SquareParity(1)
@@ -21,6 +27,10 @@ ALL_GRAY = FillStrategy(0)
 HORIZONTAL = FillStrategy(1)
 VERTICAL = FillStrategy(2)
 
+DICT_ENGINE = Engine(0)
+ARRAY_ENGINE = Engine(1)
+PACKED_ENGINE = Engine(2)
+
 COLOR_PAIRS = {
     GREEN: BLUE,
     BLUE: GREEN,
@@ -29,6 +39,13 @@ COLOR_PAIRS = {
 }
 
 
+class DerivedSquares(NamedTuple):
+    """Colors of all squares (including white ones) and, for squares that are part of a domino, the (dx, dy) offset of
+    the other square of the domino; (0, 0) otherwise. Both are indexed like ``Board.to_array()``."""
+    colors: np.ndarray
+    partners: np.ndarray
+
+
 class Board:
     """
     Data representation of an Aztec Diamond board.
@@ -45,16 +62,65 @@ class Board:
     If a square is not part of a domino, its color is GRAY.
     If the domino is vertical and the top square is black, its color is YELLOW; otherwise, it's RED.
     If the domino is horizontal and the left square is black, its color is BLUE; otherwise, it's GREEN.
+
+    The storage backend is picked with the ``engine`` argument. ``Board(height, engine=ARRAY_ENGINE)`` returns an
+    instance of the matching subclass (see ``ArrayBoard``); all engines produce the same results.
+
+    If ``seed`` is given, holes are filled from a counter-based generator keyed on (seed, step, hole index), where
+    ``step`` counts calls to ``advance_magic()``. Otherwise, the global ``random`` module is used.
+
+    ``profile`` records the time spent in each phase of the shuffle and counts annihilated dominoes and filled holes
+    while it's enabled (see ``board.profiling``). A profile may be shared by several boards.
     """
-    def __init__(self, height, init_data=True):
+    engine = DICT_ENGINE
+    _engines: Dict[Engine, type]
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        Board._engines[cls.engine] = cls
+
+    def __new__(cls, *args, engine=None, **kwargs):
+        if cls is Board and engine is not None:
+            try:
+                cls = Board._engines[engine]
+            except KeyError:
+                raise ValueError(f'Unknown board engine: {engine}') from None
+        return super().__new__(cls)
+
+    def __init__(
+        self, height, init_data=True, engine=None, seed=None, fill_strategy=HORIZONTAL, profile: Optional[Profile] = None
+    ):
+        """``engine`` is consumed by ``__new__`` and only accepted here so that it can be passed to the constructor."""
         if height % 2 != 0 or height <= 1:
             raise ValueError('The height of an Aztec Diamond board must be an even number greater than 1.')
         self.data: Dict[int, Dict[int, SquareColor]]
+        self._derived: Optional[DerivedSquares] = None
         self.polarity = 1
-        if init_data:
-            self.data = self.generate_data(height, fill_strategy=HORIZONTAL)
-        else:
-            self.data = OrderedDict()
+        self.seed: Optional[int] = seed
+        self.step = 0
+        self.profile = Profile() if profile is None else profile
+        with self.profile.timed('generate_data'):
+            if init_data:
+                self.data = self.generate_data(height, fill_strategy=fill_strategy)
+            else:
+                self.data = self.empty_data(height)
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._derived = None
+
+    @property
+    def height(self) -> int:
+        return len(self.data)
+
+    @staticmethod
+    def empty_data(height):
+        return OrderedDict()
 
     @staticmethod
     def generate_data(height, fill_strategy=ALL_GRAY) -> Dict[int, Dict[int, SquareColor]]:
@@ -80,19 +146,23 @@ class Board:
     def get_square_parity(x, y) -> SquareParity:
         return (x + y) % 2  # 0 = BLACK, 1 = WHITE
 
+    def get_black_square_color(self, x, y) -> SquareColor:
+        """Same as ``get_square_color()``, but only valid for black squares."""
+        try:
+            return self.data[y][x]
+        except KeyError:
+            return NO_COLOR
+
     def get_square_color(self, x, y) -> SquareColor:
         if self.get_square_parity(x, y) == BLACK:
-            try:
-                return self.data[y][x]
-            except KeyError:
-                return NO_COLOR
-        elif len(self.data) == 2:
+            return self.get_black_square_color(x, y)
+        elif self.height == 2:
             neighbor = self.get_square_neighbor(x, y)
             if neighbor:
                 return self.get_square_color(*neighbor)
             return GRAY
         else:
-            orientation = 1 if len(self.data) % 4 == 0 else -1
+            orientation = 1 if self.height % 4 == 0 else -1
             neighbor = self.get_square_neighbor(x, y)
             if neighbor:
                 return self.get_square_color(*neighbor)
@@ -129,54 +199,71 @@ class Board:
                     return x2, y2
             return None
 
-    def get_holes(self) -> List[Tuple[int, int]]:
+    def get_holes(self, as_array=False) -> Union[List[Tuple[int, int]], np.ndarray]:
         """Returns all 2x2 areas of gray squares as coordinates of their top left corner. Assumes a valid board.
-        Return values for invalid boards are undefined."""
+        Return values for invalid boards are undefined.
+        If ``as_array`` is True, the coordinates are returned as an N x 2 NumPy array instead of a list of tuples."""
         # In self.data, a hole corresponds to two gray squares that are immediately diagonal of each other.
-        corners = []
-        current_row = 0
-        rows, unvisited = map(list, zip(*(
-            (i, list(filter(lambda k: self.data[i][k] == GRAY, r.keys()))) for i, r in self.data.items()
-        )))
-        while unvisited:
-            while unvisited[0]:
-                if unvisited[0][0] - 1 in unvisited[1]:
-                    corners.append((unvisited[0][0] - 1, rows[current_row]))
-                    unvisited[1].remove(unvisited[0][0] - 1)
-                else:
-                    corners.append((unvisited[0][0], rows[current_row]))
-                    unvisited[1].remove(unvisited[0][0] + 1)
-                unvisited[0].pop(0)
-            unvisited.pop(0)
-            current_row += 1
-        return corners
-
-    def fill_holes(self, holes: List[Tuple[int, int]]):
+        with self.profile.timed('get_holes'):
+            corners = []
+            rows = list(self.data.items())
+            unvisited = {x for x, color in rows[0][1].items() if color == GRAY} if rows else set()
+            for i, (y, row) in enumerate(rows):
+                unvisited_below = set()
+                if i + 1 < len(rows):
+                    unvisited_below = {x for x, color in rows[i + 1][1].items() if color == GRAY}
+                for x in row:
+                    if x not in unvisited:
+                        continue
+                    if x - 1 in unvisited_below:
+                        corners.append((x - 1, y))
+                        unvisited_below.remove(x - 1)
+                    else:
+                        corners.append((x, y))
+                        unvisited_below.discard(x + 1)
+                unvisited = unvisited_below
+            if as_array:
+                return np.array(corners, dtype=np.intp).reshape(-1, 2)
+            return corners
+
+    def draw_orientations(self, count, first_hole_index=0) -> np.ndarray:
+        """Returns whether each of ``count`` holes, starting at ``first_hole_index``, gets horizontal dominoes."""
+        if self.seed is not None:
+            return hole_orientations(self.seed, self.step, count, first_hole_index)
+        random_bytes = getrandbits(count).to_bytes((count + 7) // 8, 'little')
+        return np.unpackbits(np.frombuffer(random_bytes, np.uint8), count=count, bitorder='little').astype(bool)
+
+    def fill_holes(self, holes: List[Tuple[int, int]], first_hole_index=0):
         """Fills holes at coordinates returned by ``get_holes()`` with a random arrangement of dominoes.
-        If there are dominoes at given coordinates already, they're overwritten."""
-        for x, y in holes:
-            parity = self.get_square_parity(x, y)
-            squares = ((x, y), (x + 1, y + 1)) if parity == BLACK else ((x + 1, y), (x, y + 1))
-            arrangement = getrandbits(1)
-            if arrangement:
-                if squares[0][1] < squares[1][1]:
-                    self.data[squares[0][1]][squares[0][0]] = BLUE
-                    self.data[squares[1][1]][squares[1][0]] = GREEN
+        If there are dominoes at given coordinates already, they're overwritten.
+        ``first_hole_index`` is the index of ``holes[0]`` in the full list of holes, which allows filling a seeded
+        board in chunks with the same result."""
+        with self.profile.timed('fill_holes'):
+            for (x, y), arrangement in zip(holes, self.draw_orientations(len(holes), first_hole_index)):
+                parity = self.get_square_parity(x, y)
+                squares = ((x, y), (x + 1, y + 1)) if parity == BLACK else ((x + 1, y), (x, y + 1))
+                if arrangement:
+                    if squares[0][1] < squares[1][1]:
+                        self.data[squares[0][1]][squares[0][0]] = BLUE
+                        self.data[squares[1][1]][squares[1][0]] = GREEN
+                    else:
+                        self.data[squares[0][1]][squares[0][0]] = GREEN
+                        self.data[squares[1][1]][squares[1][0]] = BLUE
                 else:
-                    self.data[squares[0][1]][squares[0][0]] = GREEN
-                    self.data[squares[1][1]][squares[1][0]] = BLUE
-            else:
-                if squares[0][0] < squares[1][0]:
-                    self.data[squares[0][1]][squares[0][0]] = YELLOW
-                    self.data[squares[1][1]][squares[1][0]] = RED
-                else:
-                    self.data[squares[0][1]][squares[0][0]] = RED
-                    self.data[squares[1][1]][squares[1][0]] = YELLOW
+                    if squares[0][0] < squares[1][0]:
+                        self.data[squares[0][1]][squares[0][0]] = YELLOW
+                        self.data[squares[1][1]][squares[1][0]] = RED
+                    else:
+                        self.data[squares[0][1]][squares[0][0]] = RED
+                        self.data[squares[1][1]][squares[1][0]] = YELLOW
+            self.invalidate_derived()
+        self.profile.count('holes_filled', len(holes))
 
     def advance_magic(self):
         """Performs necessary movement and deletion of dominoes according to current data and changes the board size.
         ``fill_holes()`` will not be called by this method."""
-        new_data = self.generate_data(len(self.data) + 2)  # O(n2)
+        with self.profile.timed('generate_data'):
+            new_data = self.generate_data(len(self.data) + 2)  # O(n2)
         color_delta = {
             RED: (1, -self.polarity),
             YELLOW: (-1, self.polarity),
@@ -184,14 +271,115 @@ class Board:
             GREEN: (-self.polarity, 1),
             GRAY: (0, 0)
         }
-        for y, row in self.data.items():
-            for x, color in row.items():  # O(n2)
-                new_x = x + color_delta[color][0]
-                new_y = y + color_delta[color][1]
-                if color != GRAY and self.data.get(new_y, {}).get(new_x) == COLOR_PAIRS[color]:
-                    new_data[new_y][new_x] = GRAY
-                    self.data[new_y][new_x] = GRAY
-                else:
-                    new_data[new_y][new_x] = color
+        annihilated = 0
+        with self.profile.timed('advance_magic'):
+            for y, row in self.data.items():
+                for x, color in row.items():  # O(n2)
+                    new_x = x + color_delta[color][0]
+                    new_y = y + color_delta[color][1]
+                    if color != GRAY and self.data.get(new_y, {}).get(new_x) == COLOR_PAIRS[color]:
+                        new_data[new_y][new_x] = GRAY
+                        self.data[new_y][new_x] = GRAY
+                        annihilated += 1
+                    else:
+                        new_data[new_y][new_x] = color
         self.data = new_data
         self.polarity *= -1
+        self.step += 1
+        self.invalidate_derived()
+        self.profile.count('steps')
+        self.profile.count('annihilated_pairs', annihilated)
+
+    def reserve(self, order):
+        """Tells the board that it will be advanced up to the given order, so that engines which support it can
+        allocate storage once and grow the diamond in place. Engines that don't support it ignore this."""
+
+    def to_array(self) -> np.ndarray:
+        """Returns the colors of black squares as a ``height`` x ``height`` int8 array indexed by
+        ``[y + height // 2, x + height // 2]``. White squares and squares outside of the board are NO_COLOR."""
+        radius = len(self.data) // 2
+        array = np.full((radius * 2, radius * 2), NO_COLOR, dtype=np.int8)
+        for y, row in self.data.items():
+            for x, color in row.items():
+                array[y + radius, x + radius] = color
+        return array
+
+    def derived(self) -> 'DerivedSquares':
+        """Returns the color and domino partner of every square of the bounding square of the board. The result is
+        computed with whole-array operations on first use and cached until the board changes. Don't modify it."""
+        if self._derived is None:
+            self._derived = self.derive_squares()
+        return self._derived
+
+    def invalidate_derived(self):
+        """Drops the cache used by ``derived()``. Called by every method that modifies the board."""
+        self._derived = None
+
+    def derive_squares(self) -> 'DerivedSquares':
+        from .array_board import diamond_mask
+        colors = self.to_array()
+        height = len(colors)
+        partners = np.zeros((height, height, 2), dtype=np.int8)
+        padded = np.full((height + 2, height + 2), NO_COLOR, dtype=np.int8)
+        padded[1:-1, 1:-1] = colors
+        p = self.polarity
+        # Same as in get_square_neighbor()
+        for color, delta in ((RED, (0, -p)), (YELLOW, (0, p)), (GREEN, (-p, 0)), (BLUE, (p, 0))):
+            partners[colors == color] = delta
+        # Every black square inside the diamond has a color, so the squares without one inside it are white
+        unmatched = np.equal(colors, NO_COLOR)
+        unmatched &= diamond_mask(height)
+        for dx, dy, target_color in ((0, -p, YELLOW), (0, p, RED), (-p, 0, BLUE), (p, 0, GREEN)):
+            match = unmatched & (padded[1 + dy:1 + dy + height, 1 + dx:1 + dx + height] == target_color)
+            colors[match] = target_color
+            partners[match] = (dx, dy)
+            unmatched &= ~match
+        # A white square without a domino is gray
+        colors[unmatched] = GRAY
+        return DerivedSquares(colors, partners)
+
+    def square_colors(self) -> np.ndarray:
+        """Returns the result of ``get_square_color()`` for every square of the bounding square of the board, in the
+        format of ``to_array()``. This is the cached array from ``derived()``, so don't modify it."""
+        return self.derived().colors
+
+    @classmethod
+    def from_array(cls, array: np.ndarray, polarity=1, seed=None, step=0, engine: Optional[Engine] = None) -> 'Board':
+        """Inverse of ``to_array()``. The resulting board uses the given engine, or the engine of the class this is
+        called on if it's not given."""
+        if engine is not None:
+            cls = Board._engines[engine]
+        board = cls(len(array), init_data=False, seed=seed)
+        board.data = board.data_from_array(array)
+        board.polarity = polarity
+        board.step = step
+        return board
+
+    @staticmethod
+    def data_from_array(array: np.ndarray):
+        radius = len(array) // 2
+        data = OrderedDict()
+        for i, row in enumerate(array):
+            data[i - radius] = OrderedDict(
+                (j - radius, SquareColor(int(row[j]))) for j in np.flatnonzero(row != NO_COLOR)
+            )
+        return data
+
+    def convert(self, engine: Engine) -> 'Board':
+        """Returns a copy of this board that uses the given engine."""
+        return self.from_array(self.to_array(), self.polarity, self.seed, self.step, engine)
+
+    def save(self, path):
+        """Writes the board to a compact ``.msd`` file (see ``board.fileformat``)."""
+        from .fileformat import save_board
+        save_board(self, path)
+
+    @classmethod
+    def load(cls, path, engine: Optional[Engine] = None) -> 'Board':
+        """Reads a board written by ``save()``. The file is memory-mapped while it's decoded.
+        The board uses the given engine, or the engine of the class this is called on if it's not given."""
+        from .fileformat import load_board
+        return load_board(path, cls.engine if engine is None else engine)
+
+
+Board._engines = {DICT_ENGINE: Board}
@@ -0,0 +1,57 @@
+"""
+Compact encoding of the black squares of a board.
+
+Black squares inside the diamond are listed in row-major order and each one is stored as a small code. A board without
+gray squares needs 2 bits per square; otherwise 3 bits are used. Bits are packed in little-endian order.
+"""
+from typing import Tuple
+
+import numpy as np
+
+from .array_board import black_mask
+from .board import NO_COLOR, GRAY, RED, YELLOW, GREEN, BLUE
+
+__all__ = ['encode_squares', 'decode_squares', 'encoded_size']
+
+COLORS = np.array([GRAY, RED, YELLOW, GREEN, BLUE], dtype=np.int8)
+CODES = np.zeros(256, dtype=np.uint8)
+CODES[COLORS.view(np.uint8)] = np.arange(len(COLORS))
+
+
+def square_count(height) -> int:
+    """Returns the number of black squares in a board of the given height."""
+    order = height // 2
+    return order * (order + 1)
+
+
+def encoded_size(height, bits_per_square) -> int:
+    return (square_count(height) * bits_per_square + 7) // 8
+
+
+def encode_squares(array: np.ndarray) -> Tuple[int, bytes]:
+    """Encodes an array returned by ``Board.to_array()``. Returns the number of bits per square and the packed data."""
+    codes = CODES[array[black_mask(len(array))].view(np.uint8)]
+    bits_per_square = 3
+    if not (codes == 0).any():
+        codes -= 1
+        bits_per_square = 2
+    bits = (codes[:, None] >> np.arange(bits_per_square, dtype=np.uint8)) & 1
+    return bits_per_square, np.packbits(bits, bitorder='little').tobytes()
+
+
+def decode_codes(buffer, count, bits_per_square, first_square=0) -> np.ndarray:
+    """Returns ``count`` color codes starting at the given square from (part of) an encoded buffer that starts at the
+    byte containing ``first_square``. Codes of 2-bit encodings are shifted so that they match 3-bit encodings."""
+    first_bit = first_square * bits_per_square % 8
+    bits = np.unpackbits(
+        np.frombuffer(buffer, dtype=np.uint8), count=first_bit + count * bits_per_square, bitorder='little'
+    )[first_bit:].reshape(count, bits_per_square)
+    codes = bits @ (1 << np.arange(bits_per_square, dtype=np.uint8))
+    return codes + (bits_per_square == 2)
+
+
+def decode_squares(buffer, height, bits_per_square) -> np.ndarray:
+    """Inverse of ``encode_squares()``."""
+    array = np.full((height, height), NO_COLOR, dtype=np.int8)
+    array[black_mask(height)] = COLORS[decode_codes(buffer, square_count(height), bits_per_square)]
+    return array
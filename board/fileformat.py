@@ -0,0 +1,121 @@
+"""
+Compact on-disk format for boards (``.msd`` files).
+
+A file is a 32-byte little-endian header followed by the black squares encoded with ``board.codec``, 2 or 3 bits per
+square. The header holds the order, polarity, seed and step of the board. Files are memory-mapped when opened, so rows
+of large tilings can be read and analyzed without loading the whole file.
+"""
+import struct
+from typing import BinaryIO, Optional
+
+import numpy as np
+
+from .board import Board, Engine, NO_COLOR
+from .codec import COLORS, encode_squares, decode_codes, decode_squares, encoded_size
+
+__all__ = ['TilingFile', 'open_tiling', 'write_board', 'read_board', 'save_board', 'load_board']
+
+MAGIC = b'MSDB'
+VERSION = 1
+# magic, version, bits per square, polarity, order, whether a seed is set, seed, step
+HEADER = struct.Struct('<4sHBbI?3xQQ')
+
+
+def row_lengths(height) -> np.ndarray:
+    """Returns the number of black squares in each row of a board of the given height."""
+    rows = np.arange(height)
+    return np.minimum(rows + 1, height - rows)
+
+
+def write_board(board: Board, file: BinaryIO):
+    bits_per_square, data = encode_squares(board.to_array())
+    file.write(HEADER.pack(
+        MAGIC, VERSION, bits_per_square, board.polarity, board.height // 2, board.seed is not None, board.seed or 0,
+        board.step
+    ))
+    file.write(data)
+
+
+def unpack_header(header: bytes, name) -> tuple:
+    """Returns the bits per square, polarity, order, seed (or None) and step of a header. ``name`` identifies the
+    file in error messages."""
+    if len(header) < HEADER.size:
+        raise ValueError(f'{name} is too short to be a board file.')
+    magic, version, bits_per_square, polarity, order, has_seed, seed, step = HEADER.unpack(header)
+    if magic != MAGIC:
+        raise ValueError(f'{name} is not a board file.')
+    if version != VERSION:
+        raise ValueError(f'{name} has an unsupported version: {version}')
+    if bits_per_square not in (2, 3):
+        raise ValueError(f'{name} has an invalid number of bits per square: {bits_per_square}')
+    return bits_per_square, polarity, order, seed if has_seed else None, step
+
+
+def read_board(file: BinaryIO, engine: Optional[Engine] = None) -> Board:
+    """Reads a board written by ``write_board()`` from a stream that doesn't need to be a file on disk."""
+    bits_per_square, polarity, order, seed, step = unpack_header(file.read(HEADER.size), 'The stream')
+    data = file.read(encoded_size(order * 2, bits_per_square))
+    if len(data) < encoded_size(order * 2, bits_per_square):
+        raise ValueError('The stream ends before the board does.')
+    return Board.from_array(decode_squares(data, order * 2, bits_per_square), polarity, seed, step, engine)
+
+
+def save_board(board: Board, path):
+    with open(path, 'wb') as f:
+        write_board(board, f)
+
+
+class TilingFile:
+    """
+    A memory-mapped ``.msd`` file. Rows are decoded on demand, so opening a file is instant regardless of its size.
+    Row indices are Y coordinates, as in ``Board.data``.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        self.bits_per_square, self.polarity, self.order, self.seed, self.step = unpack_header(header, path)
+        self.height = self.order * 2
+        size = encoded_size(self.height, self.bits_per_square)
+        self.squares = np.memmap(path, dtype=np.uint8, mode='r', offset=HEADER.size, shape=(size,))
+        self.row_offsets = np.concatenate(([0], np.cumsum(row_lengths(self.height))))
+
+    def rows(self, start, stop) -> np.ndarray:
+        """Returns rows from Y = ``start`` to ``stop - 1`` in the format of ``Board.to_array()``."""
+        radius = self.order
+        first_row = max(start + radius, 0)
+        last_row = min(stop + radius, self.height)
+        result = np.full((max(stop - start, 0), self.height), NO_COLOR, dtype=np.int8)
+        if first_row >= last_row:
+            return result
+        first_square = int(self.row_offsets[first_row])
+        count = int(self.row_offsets[last_row]) - first_square
+        buffer = self.squares[
+            first_square * self.bits_per_square // 8:(first_square + count) * self.bits_per_square // 8 + 1
+        ]
+        colors = COLORS[decode_codes(buffer, count, self.bits_per_square, first_square)]
+        # Black squares of row i start at the left edge of the diamond, or one square to the right of it
+        rows = np.arange(first_row, last_row)
+        lengths = row_lengths(self.height)[first_row:last_row]
+        starts = radius - lengths + (radius - lengths + rows) % 2
+        row_of_square = np.repeat(np.arange(len(rows)), lengths)
+        index_in_row = np.arange(count) - np.repeat(self.row_offsets[first_row:last_row] - first_square, lengths)
+        column = np.repeat(starts, lengths) + 2 * index_in_row
+        result[row_of_square + first_row - radius - start, column] = colors
+        return result
+
+    def row(self, y) -> np.ndarray:
+        return self.rows(y, y + 1)[0]
+
+    def to_array(self) -> np.ndarray:
+        return self.rows(-self.order, self.order)
+
+    def to_board(self, engine: Optional[Engine] = None) -> Board:
+        return Board.from_array(self.to_array(), self.polarity, self.seed, self.step, engine)
+
+
+def open_tiling(path) -> TilingFile:
+    return TilingFile(path)
+
+
+def load_board(path, engine: Optional[Engine] = None) -> Board:
+    return TilingFile(path).to_board(engine)
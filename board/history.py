@@ -0,0 +1,190 @@
+"""
+History of the states a board went through, for undoing steps and jumping to any earlier step.
+
+Every recorded state is stored as the difference from the state before it: the cells that changed, after the previous
+state has been advanced by ``advance_magic()`` if the board grew in between. Moves and annihilations follow from the
+previous state, so the difference of an ``advance_magic()`` step is empty and a ``fill_holes()`` step only stores the
+filled squares. Callers that know which of the two a change was say so to ``record()``, so that it doesn't redo the
+step to find the difference. Every ``keyframe_interval``-th state is also stored in full, in the compact encoding of
+``board.codec``. Keyframes are kept in a cache with a memory budget which drops the least recently used ones; a state
+is rebuilt from the closest earlier keyframe, which re-caches the keyframes it passes on the way.
+"""
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .board import Board, Engine, ARRAY_ENGINE
+from .codec import encode_squares, decode_squares
+
+__all__ = ['StepHistory']
+
+
+class HistoryStep(NamedTuple):
+    height: int
+    polarity: int
+    step: int
+    # Whether the previous state has to be advanced before the changes are applied
+    advanced: bool
+    # Flat indices into ``Board.to_array()`` of the cells that changed, and their new colors
+    indices: np.ndarray
+    colors: np.ndarray
+    # Holes that were filled to reach this state, if they were given to ``record()``
+    holes: Optional[np.ndarray]
+
+    @property
+    def nbytes(self) -> int:
+        return self.indices.nbytes + self.colors.nbytes + (0 if self.holes is None else self.holes.nbytes)
+
+
+def advanced_array(array: np.ndarray, polarity) -> np.ndarray:
+    """Returns the result of ``advance_magic()`` on a board in the format of ``Board.to_array()``."""
+    board = Board.from_array(array, polarity, engine=ARRAY_ENGINE)
+    board.advance_magic()
+    return board.data
+
+
+def hole_squares(holes, height) -> np.ndarray:
+    """Returns the flat indices into ``Board.to_array()`` of the squares of the 2x2 areas whose top left corners are
+    given."""
+    holes = np.asarray(holes, dtype=np.intp).reshape(-1, 2) + height // 2
+    corners = holes[:, 1] * height + holes[:, 0]
+    return np.concatenate((corners, corners + 1, corners + height, corners + height + 1))
+
+
+class StepHistory:
+    """
+    States of one board, starting with the board given to the constructor. ``record()`` adds the current state of
+    the board after ``position`` and makes it the new position, discarding any states that came after ``position``
+    (like making a change after undoing does). ``board(index)`` rebuilds a recorded state, and ``seek(index)`` also
+    makes it the position that the next state is recorded after.
+
+    States that can't be reached from the previous one by ``advance_magic()`` and changes of squares (for example
+    when the board skipped ahead by several steps) are always stored as keyframes that are never dropped, and so is
+    the first state. The cache of other keyframes is limited to ``max_keyframe_bytes``.
+    """
+    def __init__(
+        self, board: Board, keyframe_interval=16, max_keyframe_bytes=64 * 2 ** 20, engine: Optional[Engine] = None
+    ):
+        if keyframe_interval < 1:
+            raise ValueError('The keyframe interval must be at least 1.')
+        self.keyframe_interval = keyframe_interval
+        self.max_keyframe_bytes = max_keyframe_bytes
+        self.engine = board.engine if engine is None else engine
+        self.seed = board.seed
+        self.steps: List[HistoryStep] = []
+        self.keyframes: 'OrderedDict[int, Tuple[int, bytes]]' = OrderedDict()
+        self.pinned = set()
+        self.keyframe_bytes = 0
+        self.position = -1
+        self._current: Optional[np.ndarray] = None
+        self.record(board)
+
+    def __len__(self):
+        return len(self.steps)
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by keyframes and differences."""
+        return self.keyframe_bytes + sum(step.nbytes for step in self.steps)
+
+    def record(self, board: Board, holes=None, advanced=False) -> int:
+        """Adds the current state of the board and returns its index. ``holes`` are the holes that were just filled,
+        which are given back by ``holes()`` for this state. If they're given and the board has the height and step of
+        the latest state, it must differ from that state only in the squares of those holes, and only those squares
+        are compared. If ``advanced`` is True and the board is one step and one order ahead of the latest state, it
+        must be the result of ``advance_magic()`` on that state, and it's stored without comparing anything.
+        Otherwise, the whole board is compared with the latest state, which is advanced first if the board grew."""
+        self.truncate(self.position + 1)
+        array = board.to_array()
+        index = len(self.steps)
+        previous = self.steps[-1] if self.steps else None
+        indices = None
+        is_advanced = False
+        if previous is None:
+            pass
+        elif len(array) == previous.height and board.step == previous.step:
+            if holes is None:
+                indices = np.flatnonzero(array != self._current)
+            else:
+                indices = hole_squares(holes, len(array))
+                indices = indices[array.ravel()[indices] != self._current.ravel()[indices]]
+        elif len(array) == previous.height + 2 and board.step == previous.step + 1:
+            is_advanced = True
+            if advanced:
+                indices = np.zeros(0, dtype=np.intp)
+            else:
+                indices = np.flatnonzero(array != advanced_array(self._current, previous.polarity))
+        if indices is None:
+            self.pinned.add(index)
+            indices = np.zeros(0, dtype=np.intp)
+        indices = indices.astype(np.uint32)
+        self.steps.append(HistoryStep(
+            len(array), board.polarity, board.step, is_advanced, indices, array.ravel()[indices],
+            None if holes is None else np.asarray(holes, dtype=np.int32).reshape(-1, 2)
+        ))
+        if index in self.pinned or index % self.keyframe_interval == 0:
+            self._store_keyframe(index, array)
+        self.position = index
+        self._current = array
+        return index
+
+    def truncate(self, length):
+        """Discards all states from index ``length`` on."""
+        if length >= len(self.steps):
+            return
+        del self.steps[length:]
+        for index in [index for index in self.keyframes if index >= length]:
+            self.keyframe_bytes -= len(self.keyframes.pop(index)[1])
+            self.pinned.discard(index)
+        if self.position >= length:
+            self.position = length - 1
+            self._current = self.array(self.position) if length else None
+
+    def array(self, index) -> np.ndarray:
+        """Returns a recorded state in the format of ``Board.to_array()``."""
+        if not 0 <= index < len(self.steps):
+            raise IndexError(f'No step {index} in a history of {len(self.steps)} steps')
+        if index == self.position and self._current is not None:
+            return self._current.copy()
+        start = max(keyframe for keyframe in self.keyframes if keyframe <= index)
+        self.keyframes.move_to_end(start)
+        bits_per_square, data = self.keyframes[start]
+        array = decode_squares(data, self.steps[start].height, bits_per_square)
+        for i in range(start + 1, index + 1):
+            step = self.steps[i]
+            if step.advanced:
+                array = advanced_array(array, self.steps[i - 1].polarity)
+            array.ravel()[step.indices] = step.colors
+            if i % self.keyframe_interval == 0 and i not in self.keyframes:
+                self._store_keyframe(i, array)
+        return array
+
+    def board(self, index, engine: Optional[Engine] = None) -> Board:
+        """Rebuilds a recorded state. The board uses the given engine, or the engine of the recorded board."""
+        return self._board(index, self.array(index), engine)
+
+    def holes(self, index) -> Optional[np.ndarray]:
+        """Returns the holes given to ``record()`` for a state, or None if there weren't any."""
+        return self.steps[index].holes
+
+    def seek(self, index, engine: Optional[Engine] = None) -> Board:
+        """Same as ``board()``, but also makes ``index`` the position that the next state is recorded after."""
+        self._current = self.array(index)
+        self.position = index
+        return self._board(index, self._current.copy(), engine)
+
+    def _board(self, index, array: np.ndarray, engine: Optional[Engine]) -> Board:
+        step = self.steps[index]
+        return Board.from_array(array, step.polarity, self.seed, step.step, self.engine if engine is None else engine)
+
+    def _store_keyframe(self, index, array: np.ndarray):
+        bits_per_square, data = encode_squares(array)
+        self.keyframes[index] = bits_per_square, data
+        self.keyframe_bytes += len(data)
+        evictable = (keyframe for keyframe in list(self.keyframes) if keyframe not in self.pinned and keyframe != index)
+        while self.keyframe_bytes > self.max_keyframe_bytes:
+            keyframe = next(evictable, None)
+            if keyframe is None:
+                break
+            self.keyframe_bytes -= len(self.keyframes.pop(keyframe)[1])
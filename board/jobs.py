@@ -0,0 +1,105 @@
+import os
+import threading
+from time import monotonic
+from typing import Callable, Optional
+
+from .board import Board, Engine, ARRAY_ENGINE
+
+__all__ = ['SkipAheadJob']
+
+
+class SkipAheadJob:
+    """
+    Advances a board to a target order, one step (``advance_magic()`` then ``fill_holes()``) at a time.
+
+    ``run()`` works on the board in place on the calling thread; ``pause()``, ``resume()`` and ``cancel()`` may be
+    called from any other thread and take effect between steps, so the board is always left as a valid tiling.
+    ``progress(steps_done, steps_total)`` is called at most once per ``progress_interval`` seconds, and once more when
+    the last step is done. If ``checkpoint_path`` is given, the board is saved there every ``checkpoint_interval``
+    seconds and whenever the job is paused, and the file is removed once the job finishes or is cancelled.
+    A job interrupted by a crash can then be continued with ``SkipAheadJob.from_checkpoint()``;
+    seeded boards continue exactly as if they had never been interrupted.
+    """
+    def __init__(
+        self, board: Board, target_order, progress: Optional[Callable[[int, int], None]] = None,
+        progress_interval=0.1, checkpoint_path=None, checkpoint_interval=60.0
+    ):
+        if target_order < board.height // 2:
+            raise ValueError(f'Target order {target_order} is below the current order {board.height // 2}')
+        self.board = board
+        self.target_order = target_order
+        self.total = target_order - board.height // 2
+        self.done = 0
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint_interval = checkpoint_interval
+        self._unpaused = threading.Event()
+        self._unpaused.set()
+        self._cancelled = False
+
+    @classmethod
+    def from_checkpoint(
+        cls, checkpoint_path, target_order, engine: Engine = ARRAY_ENGINE, **kwargs
+    ) -> 'SkipAheadJob':
+        """Creates a job that continues from the board saved at ``checkpoint_path`` and keeps checkpointing there.
+        The board is loaded with the given engine; the default one grows the board in place (see ``run()``)."""
+        return cls(Board.load(checkpoint_path, engine), target_order, checkpoint_path=checkpoint_path, **kwargs)
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    @property
+    def paused(self) -> bool:
+        return not self._unpaused.is_set()
+
+    @property
+    def finished(self) -> bool:
+        return self.done == self.total
+
+    def pause(self):
+        self._unpaused.clear()
+
+    def resume(self):
+        self._unpaused.set()
+
+    def cancel(self):
+        self._cancelled = True
+        self._unpaused.set()
+
+    def save_checkpoint(self):
+        """Saves the board to ``checkpoint_path``. The previous checkpoint is only replaced once the new one is
+        complete, so a crash while saving can't lose it."""
+        temporary_path = f'{self.checkpoint_path}.tmp'
+        self.board.save(temporary_path)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def remove_checkpoint(self):
+        if self.checkpoint_path is not None and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    def run(self) -> Board:
+        """Runs the job until it finishes or is cancelled and returns the board, which is the same object that the job
+        was created with. Storage for the target order is reserved first, so array boards grow in place."""
+        self.board.reserve(self.target_order)
+        last_progress = last_checkpoint = monotonic()
+        while self.done < self.total and not self._cancelled:
+            if not self._unpaused.is_set():
+                if self.checkpoint_path is not None:
+                    self.save_checkpoint()
+                    last_checkpoint = monotonic()
+                self._unpaused.wait()
+                continue
+            self.board.advance_magic()
+            self.board.fill_holes(self.board.get_holes(as_array=True))
+            self.done += 1
+            now = monotonic()
+            if self.progress is not None and (now - last_progress >= self.progress_interval or self.finished):
+                self.progress(self.done, self.total)
+                last_progress = now
+            if self.checkpoint_path is not None and now - last_checkpoint >= self.checkpoint_interval:
+                self.save_checkpoint()
+                last_checkpoint = now
+        self.remove_checkpoint()
+        return self.board
@@ -0,0 +1,218 @@
+from typing import List, Tuple, Union
+
+import numpy as np
+
+from .array_board import ArrayBoard, hole_tops
+from .board import (
+    Board, SquareColor, PACKED_ENGINE, ALL_GRAY, NO_COLOR, GRAY, RED, YELLOW, GREEN, BLUE, COLOR_PAIRS
+)
+
+__all__ = ['PackedBoard']
+
+# Index of each color's bit plane, such that color == 1 << plane
+PLANE_COLORS = (RED, YELLOW, GREEN, BLUE)
+PLANES = {color: plane for plane, color in enumerate(PLANE_COLORS)}
+PLANE_OF_COLOR = np.zeros(max(PLANE_COLORS) + 1, dtype=np.intp)
+PLANE_OF_COLOR[list(PLANE_COLORS)] = range(len(PLANE_COLORS))
+
+
+def lattice_origin(order) -> int:
+    """Returns the offset between lattice coordinates and indices into the planes of a board of the given order."""
+    return (order + 1) // 2
+
+
+def inside_plane(order) -> np.ndarray:
+    """Returns a packed plane where the bits of black squares inside the diamond are set.
+    In lattice coordinates, those squares form a rectangle: u in [-ceil(n / 2), floor((n - 1) / 2)] and
+    v in [-floor(n / 2), floor(n / 2)], where n is the order of the diamond."""
+    origin = lattice_origin(order)
+    columns = np.zeros(order + 1, dtype=bool)
+    columns[:(order - 1) // 2 + origin + 1] = True
+    plane = np.zeros((order + 1, (order + 8) // 8), dtype=np.uint8)
+    plane[origin - order // 2:origin + order // 2 + 1] = np.packbits(columns, bitorder='little')
+    return plane
+
+
+def shift_plane(plane: np.ndarray, shape, rows, bits) -> np.ndarray:
+    """Returns a packed plane of the given shape where bit (v, u) is bit (v - rows, u - bits) of ``plane``.
+    Bits that end up outside of the new plane are dropped."""
+    byte_shift, bit_shift = divmod(bits, 8)
+    shifted = np.zeros((plane.shape[0], plane.shape[1] + 1), dtype=np.uint8)
+    shifted[:, :-1] = plane << bit_shift
+    if bit_shift:
+        shifted[:, 1:] |= plane >> (8 - bit_shift)
+    result = np.zeros(shape, dtype=np.uint8)
+    source_rows = slice(max(0, -rows), min(plane.shape[0], shape[0] - rows))
+    source_bytes = slice(max(0, -byte_shift), min(shifted.shape[1], shape[1] - byte_shift))
+    if source_rows.start < source_rows.stop and source_bytes.start < source_bytes.stop:
+        target_rows = slice(source_rows.start + rows, source_rows.stop + rows)
+        target_bytes = slice(source_bytes.start + byte_shift, source_bytes.stop + byte_shift)
+        result[target_rows, target_bytes] = shifted[source_rows, source_bytes]
+    return result
+
+
+def set_bits(plane: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the rows and the bit indices along the rows of the set bits of a packed plane. Only the bytes that
+    contain set bits are unpacked, so sparse planes are cheap."""
+    vs, byte_indices = np.nonzero(plane)
+    square_indices, bit_indices = np.nonzero(
+        np.unpackbits(plane[vs, byte_indices][:, None], axis=1, bitorder='little')
+    )
+    return vs[square_indices], byte_indices[square_indices] * 8 + bit_indices
+
+
+class PackedBoard(Board):
+    """
+    Aztec Diamond board stored as bit planes, for orders where one byte per square is too much.
+
+    A black square (x, y) has the lattice coordinates u = (x + y) / 2 and v = (y - x) / 2. In those coordinates, the
+    black squares of the diamond form a rectangle and every domino moves by one step along either axis.
+    ``data`` is a uint8 array of shape (4, order + 1, ceil((order + 1) / 8)): for each of RED, YELLOW, GREEN and BLUE,
+    a plane where bit (v, u) is set if that square has the color. Bits are packed along u in little-endian order.
+    Squares inside the diamond without any bits set are GRAY, so an empty board is entirely gray.
+    ``advance_magic()`` and ``fill_holes()`` work on the packed planes directly, using about half a byte per square.
+    """
+    engine = PACKED_ENGINE
+
+    @property
+    def height(self) -> int:
+        return (self.data.shape[1] - 1) * 2
+
+    @staticmethod
+    def empty_data(height):
+        order = height // 2
+        return np.zeros((len(PLANE_COLORS), order + 1, (order + 8) // 8), dtype=np.uint8)
+
+    @staticmethod
+    def generate_data(height, fill_strategy=ALL_GRAY) -> np.ndarray:
+        return PackedBoard.data_from_array(ArrayBoard.generate_data(height, fill_strategy))
+
+    @staticmethod
+    def data_from_array(array: np.ndarray) -> np.ndarray:
+        height = len(array)
+        order = height // 2
+        origin = lattice_origin(order)
+        ys, xs = np.nonzero(array > GRAY)
+        colors = array[ys, xs]
+        xs = xs - order
+        ys = ys - order
+        bits = np.zeros((len(PLANE_COLORS), order + 1, order + 1), dtype=bool)
+        for plane, color in enumerate(PLANE_COLORS):
+            is_color = colors == color
+            bits[plane, (ys - xs)[is_color] // 2 + origin, (xs + ys)[is_color] // 2 + origin] = True
+        return np.packbits(bits, axis=2, bitorder='little')
+
+    def to_array(self) -> np.ndarray:
+        order = self.height // 2
+        origin = lattice_origin(order)
+        array = ArrayBoard.generate_data(self.height)
+        for plane, color in enumerate(PLANE_COLORS):
+            vs, us = np.nonzero(np.unpackbits(self.data[plane], axis=1, count=order + 1, bitorder='little'))
+            us -= origin
+            vs -= origin
+            array[us + vs + order, us - vs + order] = color
+        return array
+
+    def get_black_square_color(self, x, y) -> SquareColor:
+        order = self.height // 2
+        u = (x + y) // 2
+        v = (y - x) // 2
+        if not (-((order + 1) // 2) <= u <= (order - 1) // 2 and -(order // 2) <= v <= order // 2):
+            return NO_COLOR
+        u += lattice_origin(order)
+        v += lattice_origin(order)
+        for plane, color in enumerate(PLANE_COLORS):
+            if self.data[plane, v, u // 8] >> u % 8 & 1:
+                return color
+        return GRAY
+
+    def get_holes(self, as_array=False) -> Union[List[Tuple[int, int]], np.ndarray]:
+        order = self.height // 2
+        origin = lattice_origin(order)
+        with self.profile.timed('get_holes'):
+            gray = inside_plane(order) & ~np.bitwise_or.reduce(self.data, axis=0)
+            # In lattice coordinates, the square below a black square on the diagonal of holes (see
+            # holes_from_gray_mask()) is the next one along u if the order is odd and along v otherwise
+            rows, bits = (0, 1) if order % 2 else (1, 0)
+            pairs = gray & shift_plane(gray, gray.shape, -rows, -bits)
+            longer = pairs & shift_plane(gray, gray.shape, rows, bits)
+            # Pairs in runs of more than two gray squares are rare, so only those are followed upwards
+            vs, us = set_bits(longer)
+
+            def gray_above(indices, k):
+                above_us = us[indices] - k * bits
+                above_vs = vs[indices] - k * rows
+                inside = (above_us >= 0) & (above_vs >= 0)
+                is_gray_above = np.zeros(len(indices), dtype=bool)
+                above_us = above_us[inside]
+                is_gray_above[inside] = gray[above_vs[inside], above_us // 8] >> above_us % 8 & 1
+                return is_gray_above
+
+            is_top = hole_tops(gray_above, len(us))
+            top_vs, top_us = set_bits(pairs & ~longer)
+            us = np.concatenate((top_us, us[is_top])) - origin
+            vs = np.concatenate((top_vs, vs[is_top])) - origin
+            # The corner of a hole is its top square if the order is odd and the square to the left of it otherwise
+            xs = us - vs - (1 - order % 2)
+            ys = us + vs
+            order_of_holes = np.argsort(ys * self.height + xs)
+            corners = np.stack((xs[order_of_holes], ys[order_of_holes]), axis=1)
+        if as_array:
+            return corners
+        return list(map(tuple, corners.tolist()))
+
+    def fill_holes(self, holes: Union[List[Tuple[int, int]], np.ndarray], first_hole_index=0):
+        holes = np.asarray(holes, dtype=np.intp).reshape(-1, 2)
+        if not len(holes):
+            return
+        origin = lattice_origin(self.height // 2)
+        with self.profile.timed('fill_holes'):
+            black = (holes[:, 0] + holes[:, 1]) % 2 == 0
+            horizontal = self.draw_orientations(len(holes), first_hole_index)
+            # The top square of every hole is at (x + 1, y) or (x, y), and the bottom square is one step below along v
+            # or u
+            top_x = holes[:, 0] + ~black
+            top_u = (top_x + holes[:, 1]) // 2 + origin
+            top_v = (holes[:, 1] - top_x) // 2 + origin
+            squares = (
+                (top_u, top_v, np.where(horizontal, BLUE, np.where(black, YELLOW, RED))),
+                (top_u + black, top_v + ~black, np.where(horizontal, GREEN, np.where(black, RED, YELLOW)))
+            )
+            for us, vs, colors in squares:
+                bits = (1 << (us % 8)).astype(np.uint8)
+                for plane in range(len(PLANE_COLORS)):
+                    np.bitwise_and.at(self.data[plane], (vs, us // 8), ~bits)
+                np.bitwise_or.at(self.data, (PLANE_OF_COLOR[colors], vs, us // 8), bits)
+            self.invalidate_derived()
+        self.profile.count('holes_filled', len(holes))
+
+    def advance_magic(self):
+        order = self.height // 2
+        shift = lattice_origin(order + 1) - lattice_origin(order)
+        shape = (order + 2, (order + 9) // 8)
+        # (dv, du) of each color's move in lattice coordinates
+        p = self.polarity
+        lattice_delta = {
+            RED: (-1, 0) if p == 1 else (0, 1),
+            YELLOW: (1, 0) if p == 1 else (0, -1),
+            BLUE: (-1, 0) if p == 1 else (0, -1),
+            GREEN: (1, 0) if p == 1 else (0, 1)
+        }
+        with self.profile.timed('generate_data'):
+            new = np.zeros((len(PLANE_COLORS), *shape), dtype=np.uint8)
+        annihilated = 0
+        with self.profile.timed('advance_magic'):
+            for color, (dv, du) in lattice_delta.items():
+                plane = self.data[PLANES[color]]
+                # The square each domino moves onto, as seen from the domino's own position
+                target = shift_plane(self.data[PLANES[COLOR_PAIRS[color]]], plane.shape, -dv, -du)
+                new[PLANES[color]] = shift_plane(plane & ~target, shape, dv + shift, du + shift)
+                if self.profile.enabled and color in (RED, BLUE):
+                    # Every pair has one RED or BLUE domino
+                    annihilated += int(np.unpackbits(plane & target).sum())
+        self.data = new
+        self.polarity *= -1
+        self.step += 1
+        self.invalidate_derived()
+        self.profile.count('steps')
+        self.profile.count('annihilated_pairs', annihilated)
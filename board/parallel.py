@@ -0,0 +1,200 @@
+"""
+Parallel shuffling of a single large board, split into bands of rows.
+
+The board's two reserved buffers (see ``ArrayBoard.reserve()``) live in shared memory, which every worker process
+maps once. In each phase, every worker handles one band of rows: a domino moves by at most one row, so building a band
+of the next board only reads the rows of the old board next to the band, and filling writes only to the band and the
+row below it. Hole indices are global, so every band is filled with exactly the random bits the serial engine would
+use, and the result is identical to running the same seeded board in one process.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .array_board import ArrayBoard, centered, holes_from_gray_squares, fill_squares, advance_band
+from .board import Board, ARRAY_ENGINE, ALL_GRAY, GRAY, RED, YELLOW, GREEN, BLUE
+from .profiling import timed
+from .rng import hole_orientations
+
+__all__ = ['ParallelShuffle', 'sample_tiling_parallel']
+
+# Shared buffers of the board, mapped once in every worker process
+_worker_memory: Optional[SharedMemory] = None
+_worker_buffers: Optional[np.ndarray] = None
+
+
+def _attach(name, shape):
+    global _worker_memory, _worker_buffers
+    _worker_memory = SharedMemory(name)
+    _worker_buffers = np.ndarray(shape, dtype=np.int8, buffer=_worker_memory.buf)
+
+
+def _advance_task(current, height, previous_height, color_delta, start, stop):
+    advance_band(
+        centered(_worker_buffers[current], height + 2), centered(_worker_buffers[1 - current], height + 2),
+        color_delta, previous_height, start, stop
+    )
+
+
+def odd_runs_above(data: np.ndarray, row) -> np.ndarray:
+    """Returns the columns of the gray squares on ``row`` of ``data`` that end a run of an odd number of gray squares
+    on their diagonal, counted upwards from ``row``. Only the diagonals of those squares are followed."""
+    direction = 1 if len(data) // 2 % 2 else -1
+    ends = positions = np.flatnonzero(data[row] == GRAY)
+    odd = []
+    length = 1
+    while len(positions) and row > 0:
+        row -= 1
+        # The square above (x, y) on its diagonal is (x - direction, y - 1)
+        positions = positions - direction
+        continued = (positions >= 0) & (positions < len(data))
+        continued[continued] = data[row, positions[continued]] == GRAY
+        if length % 2:
+            odd.append(ends[~continued])
+        ends = ends[continued]
+        positions = positions[continued]
+        length += 1
+    if length % 2:
+        odd.append(ends)
+    return np.concatenate(odd) if odd else np.zeros(0, dtype=np.intp)
+
+
+def band_holes(data: np.ndarray, start, stop) -> np.ndarray:
+    """Returns the holes of a board whose top left corners are on rows ``start`` to ``stop - 1`` of ``data``, in the
+    order of ``get_holes()``. Gray squares are paired from the top of their diagonal, so of the rows above the band,
+    only the parity of the runs of gray squares that cross into the band matters."""
+    height = len(data)
+    radius = height // 2
+    ys, xs = np.nonzero(data[start:stop] == GRAY)
+    ys += start
+    if start > 0:
+        # A run that's odd above the band continues with the bottom square of a hole whose corner is above the band,
+        # which pairs up the same way as a single gray square on the row above
+        odd = odd_runs_above(data, start - 1)
+        xs = np.concatenate((odd, xs))
+        ys = np.concatenate((np.full(len(odd), start - 1), ys))
+    corners = holes_from_gray_squares(xs - radius, ys - radius, height)
+    return corners[corners[:, 1] >= start - radius]
+
+
+def _holes_task(current, height, start, stop) -> np.ndarray:
+    return band_holes(centered(_worker_buffers[current], height), start, stop)
+
+
+def _fill_task(current, height, seed, step, holes, first_hole_index):
+    fill_squares(
+        centered(_worker_buffers[current], height), holes, hole_orientations(seed, step, len(holes), first_hole_index)
+    )
+
+
+class ParallelShuffle:
+    """
+    Runs the shuffle on one seeded board with the rows split into bands, which are processed by a pool of worker
+    processes. ``board`` is an ``ArrayBoard`` whose buffers are moved into shared memory for boards up to
+    ``target_order``; it stays usable (and its data stays in shared memory) until ``close()`` is called.
+
+    Every phase involves a round trip to the workers, so this only pays off for boards with thousands of rows.
+    Use it as a context manager, or call ``close()`` when done.
+    """
+    def __init__(self, board: ArrayBoard, target_order, processes=None, bands=None):
+        if not isinstance(board, ArrayBoard):
+            raise ValueError('Parallel shuffling requires a board of the array engine')
+        if board.seed is None:
+            raise ValueError('Parallel shuffling requires a seeded board, so that every band draws the same bits')
+        height = max(target_order * 2, board.height)
+        self.board = board
+        self.processes = processes or os.cpu_count() or 1
+        self.bands = bands or self.processes
+        shape = (2, height, height)
+        self._memory = SharedMemory(create=True, size=int(np.prod(shape)))
+        self._buffers = np.ndarray(shape, dtype=np.int8, buffer=self._memory.buf)
+        board.reserve(target_order, buffers=self._buffers)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes, initializer=_attach, initargs=(self._memory.name, shape)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shuts the workers down and copies the board out of shared memory."""
+        if self._memory is None:
+            return
+        self._executor.shutdown()
+        self.board.release_buffers()
+        self._buffers = None
+        self._memory.close()
+        self._memory.unlink()
+        self._memory = None
+
+    def _band_bounds(self, rows) -> List[Tuple[int, int]]:
+        bounds = np.linspace(0, rows, min(self.bands, rows) + 1).astype(int)
+        return list(zip(bounds[:-1].tolist(), bounds[1:].tolist()))
+
+    def _run(self, task, arguments) -> list:
+        if not arguments:
+            return []
+        return list(self._executor.map(task, *zip(*arguments)))
+
+    def advance_magic(self):
+        board = self.board
+        height = board.height
+        if height + 2 > self._buffers.shape[-1]:
+            raise ValueError(f'The board can only grow up to order {self._buffers.shape[-1] // 2}')
+        p = board.polarity
+        color_delta = {RED: (1, -p), YELLOW: (-1, p), BLUE: (p, -1), GREEN: (-p, 1)}
+        current = board.buffer_index
+        previous_height = board.buffer_height(1 - current)
+        self._run(_advance_task, [
+            (current, height, previous_height, color_delta, start, stop) for start, stop in self._band_bounds(height + 2)
+        ])
+        board.swap_buffers(height + 2)
+        board.polarity *= -1
+        board.step += 1
+        board.invalidate_derived()
+
+    def get_holes(self) -> np.ndarray:
+        """Returns the same N x 2 array of holes as ``board.get_holes(as_array=True)``."""
+        board = self.board
+        return np.concatenate(self._run(_holes_task, [
+            (board.buffer_index, board.height, start, stop) for start, stop in self._band_bounds(board.height)
+        ]))
+
+    def fill_holes(self, holes: np.ndarray):
+        """Fills all holes returned by ``get_holes()``. Each band fills the holes whose corners are in it."""
+        board = self.board
+        holes = np.asarray(holes, dtype=np.intp).reshape(-1, 2)
+        bounds = self._band_bounds(board.height)
+        splits = np.searchsorted(holes[:, 1] + board.height // 2, [start for start, _ in bounds[1:]])
+        first_indices = [0, *splits.tolist()]
+        self._run(_fill_task, [
+            (board.buffer_index, board.height, board.seed, board.step, band, first)
+            for band, first in zip(np.split(holes, splits), first_indices) if len(band)
+        ])
+        board.invalidate_derived()
+
+
+def sample_tiling_parallel(
+    order, seed, processes=None, bands=None, timings: Optional[Dict[str, float]] = None
+) -> ArrayBoard:
+    """Same as ``sample_tiling(order, seed)``, with every phase split into bands of rows run by worker processes."""
+    if order < 1:
+        raise ValueError('The order of an Aztec Diamond must be at least 1.')
+    with timed(timings, 'generate_data'):
+        board = Board(2, engine=ARRAY_ENGINE, seed=seed, fill_strategy=ALL_GRAY)
+    with ParallelShuffle(board, order, processes, bands) as shuffle:
+        for i in range(order):
+            if i:
+                with timed(timings, 'advance_magic'):
+                    shuffle.advance_magic()
+            with timed(timings, 'get_holes'):
+                holes = shuffle.get_holes()
+            with timed(timings, 'fill_holes'):
+                shuffle.fill_holes(holes)
+    return board
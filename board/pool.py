@@ -0,0 +1,104 @@
+"""
+Generation of many independent tilings on a process pool.
+
+Sample ``i`` of a run with seed ``seed`` is always generated from ``sample_seed(seed, i)``, no matter which worker
+picks it up, so results are identical to running the samples one by one. Workers send tilings back as compact buffers
+(see ``board.codec``) rather than pickled boards.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .board import Board, Engine, ARRAY_ENGINE
+from .codec import encode_squares, decode_squares
+from .profiling import Profile
+from .rng import sample_seed
+from .sampling import sample_tiling
+from .stats import TilingStatistics
+
+__all__ = ['generate_tilings', 'accumulate_statistics']
+
+# index, seed, polarity, bits per square, data, profile snapshot (if profiling)
+EncodedTiling = Tuple[int, int, int, int, bytes, Optional[dict]]
+
+
+def _generate_chunk(order, seed, indices, engine, profile) -> Tuple[List[EncodedTiling], Dict[str, float]]:
+    results = []
+    timings = {}
+    for i in indices:
+        board_seed = sample_seed(seed, i)
+        board = sample_tiling(
+            order, seed=board_seed, engine=engine, timings=timings, profile=Profile(enabled=True) if profile else None
+        )
+        snapshot = board.profile.snapshot() if profile else None
+        results.append((i, board_seed, board.polarity, *encode_squares(board.to_array()), snapshot))
+    return results, timings
+
+
+def _accumulate_chunk(order, seed, indices, engine) -> Tuple[TilingStatistics, Dict[str, float]]:
+    statistics = TilingStatistics(order)
+    timings = {}
+    for i in indices:
+        statistics.add(sample_tiling(order, seed=sample_seed(seed, i), engine=engine, timings=timings))
+    return statistics, timings
+
+
+def generate_tilings(
+    order, count, seed, processes=None, engine: Engine = ARRAY_ENGINE, chunksize=1,
+    timings: Optional[Dict[str, float]] = None, profile=False
+) -> Iterator[Tuple[int, Board]]:
+    """Generates ``count`` random tilings of the given order on a pool of ``processes`` worker processes (by default,
+    one per CPU) and yields ``(index, board)`` pairs as soon as they're completed, in no particular order.
+    Each task generates ``chunksize`` consecutive samples. If ``timings`` is given, the wall time the workers spent
+    in each phase is added to it. If ``profile`` is True, every board's ``profile`` holds the measurements of its own
+    shuffle in the worker."""
+    if processes is None:
+        processes = os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(
+                _generate_chunk, order, seed, range(start, min(start + chunksize, count)), engine, profile
+            )
+            for start in range(0, count, chunksize)
+        ]
+        try:
+            for future in as_completed(futures):
+                results, chunk_timings = future.result()
+                if timings is not None:
+                    for phase, seconds in chunk_timings.items():
+                        timings[phase] = timings.get(phase, 0.0) + seconds
+                for index, board_seed, polarity, bits_per_square, data, snapshot in results:
+                    array = decode_squares(data, order * 2, bits_per_square)
+                    board = Board.from_array(array, polarity, board_seed, order - 1, engine)
+                    if snapshot is not None:
+                        board.profile = Profile.from_snapshot(snapshot)
+                    yield index, board
+        finally:
+            for future in futures:
+                future.cancel()
+
+
+def accumulate_statistics(
+    order, count, seed, processes=None, engine: Engine = ARRAY_ENGINE, chunksize=None,
+    timings: Optional[Dict[str, float]] = None
+) -> TilingStatistics:
+    """Returns the ``TilingStatistics`` of ``count`` random tilings of the given order, which are the same tilings
+    ``generate_tilings()`` would yield. Every worker accumulates the statistics of its own samples, so only one set
+    of counts per task is sent back. By default, the samples are split into one task per process."""
+    if processes is None:
+        processes = os.cpu_count() or 1
+    if chunksize is None:
+        chunksize = max(1, -(-count // processes))
+    statistics = TilingStatistics(order)
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = [
+            executor.submit(_accumulate_chunk, order, seed, range(start, min(start + chunksize, count)), engine)
+            for start in range(0, count, chunksize)
+        ]
+        for future in as_completed(futures):
+            chunk_statistics, chunk_timings = future.result()
+            statistics.merge(chunk_statistics)
+            if timings is not None:
+                for phase, seconds in chunk_timings.items():
+                    timings[phase] = timings.get(phase, 0.0) + seconds
+    return statistics
@@ -0,0 +1,143 @@
+"""
+Per-phase timers and event counters for boards and their renderer.
+
+Every ``Board`` has a ``profile``, which is disabled by default. While it's disabled, instrumented code only checks
+one attribute, so profiling can stay compiled into the hot paths. Phases and counters are identified by name:
+
+- ``generate_data``: building empty boards, including the bigger board that the dict and array engines build on every
+  call to ``advance_magic()``;
+- ``advance_magic``: moving and annihilating dominoes (without ``generate_data``);
+- ``get_holes`` and ``fill_holes``;
+- counters ``steps``, ``annihilated_pairs`` and ``holes_filled``.
+
+The renderer adds the phases and counters of painting (see ``AztecDiamondRenderer.paint_board()``).
+"""
+import json
+import threading
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Dict, Optional
+
+__all__ = ['Profile', 'timed']
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _PhaseTimer:
+    __slots__ = 'profile', 'phase', 'start'
+
+    def __init__(self, profile: 'Profile', phase):
+        self.profile = profile
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profile.add_time(self.phase, perf_counter() - self.start)
+        return False
+
+
+NULL_TIMER = _NullTimer()
+
+
+@contextmanager
+def timed(timings: Optional[Dict[str, float]], phase):
+    """Adds the wall time spent in the context to ``timings[phase]`` in seconds, unless ``timings`` is None. This is
+    the simpler counterpart of ``Profile.timed()`` for the ``timings`` arguments of the sampling functions."""
+    if timings is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        timings[phase] = timings.get(phase, 0.0) + perf_counter() - start
+
+
+class Profile:
+    """
+    Wall time and number of calls of each phase, plus event counters. ``seconds`` and ``calls`` accumulate until
+    ``reset()``, while ``last`` holds the duration of the most recent call of each phase. Profiles of separate runs
+    (for example in separate processes) can be combined with ``merge()``. Timers and counters may be used from several
+    threads: updates hold a lock, and ``snapshot()`` returns a consistent copy to read while other threads write.
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.seconds: Dict[str, float] = {}
+        self.last: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def timed(self, phase):
+        """Returns a context manager that adds the time spent in it to the given phase if the profile is enabled."""
+        if not self.enabled:
+            return NULL_TIMER
+        return _PhaseTimer(self, phase)
+
+    def add_time(self, phase, seconds):
+        with self._lock:
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+            self.last[phase] = seconds
+            self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def count(self, counter, n=1):
+        if self.enabled:
+            with self._lock:
+                self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def reset(self):
+        with self._lock:
+            self.seconds.clear()
+            self.last.clear()
+            self.calls.clear()
+            self.counters.clear()
+
+    def merge(self, other: 'Profile'):
+        # Copied first, so that only one lock is held at a time
+        other = other.snapshot()
+        with self._lock:
+            for phase, seconds in other['seconds'].items():
+                self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+                self.calls[phase] = self.calls.get(phase, 0) + other['calls'].get(phase, 0)
+            self.last.update(other['last'])
+            for counter, n in other['counters'].items():
+                self.counters[counter] = self.counters.get(counter, 0) + n
+
+    def snapshot(self) -> dict:
+        """Returns the measurements as a JSON-compatible dict."""
+        with self._lock:
+            return {
+                'seconds': dict(self.seconds), 'last': dict(self.last), 'calls': dict(self.calls),
+                'counters': dict(self.counters)
+            }
+
+    @classmethod
+    def from_snapshot(cls, snapshot: dict, enabled=False) -> 'Profile':
+        profile = cls(enabled)
+        profile.seconds.update(snapshot['seconds'])
+        profile.last.update(snapshot['last'])
+        profile.calls.update(snapshot['calls'])
+        profile.counters.update(snapshot['counters'])
+        return profile
+
+    def to_json(self, **extra) -> str:
+        """Returns the snapshot, with the given extra fields first, as one line of JSON."""
+        return json.dumps({**extra, **self.snapshot()})
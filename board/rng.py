@@ -0,0 +1,90 @@
+"""
+Counter-based random numbers for filling holes.
+
+Every random bit is a pure function of (seed, step, hole index), computed with the Philox4x32-10 generator from
+Salmon et al., "Parallel Random Numbers: As Easy as 1, 2, 3" (SC11). Any step of any run can be regenerated exactly,
+and the bits don't depend on how the holes are split between calls, threads or processes.
+"""
+import numpy as np
+
+__all__ = ['philox4x32', 'hole_orientations', 'batch_hole_orientations', 'sample_seed']
+
+PHILOX_M0 = np.uint64(0xD2511F53)
+PHILOX_M1 = np.uint64(0xCD9E8D57)
+PHILOX_W0 = np.uint64(0x9E3779B9)
+PHILOX_W1 = np.uint64(0xBB67AE85)
+MASK_32 = np.uint64(0xFFFFFFFF)
+SHIFT_32 = np.uint64(32)
+BITS_PER_BLOCK = 128
+# Distinguishes counters used for deriving seeds from the step counters used for holes
+SAMPLE_SEED_DOMAIN = 0x53454544
+
+
+def philox4x32(counter: np.ndarray, key: np.ndarray, rounds=10) -> np.ndarray:
+    """Applies the Philox4x32 bijection to arrays of counters (shape ``(..., 4)``) and keys (shape ``(..., 2)``).
+    Shapes are broadcast against each other. Returns uint32 words with the broadcast shape."""
+    counter = np.asarray(counter, dtype=np.uint64)
+    key = np.asarray(key, dtype=np.uint64)
+    c0, c1, c2, c3 = (counter[..., i] for i in range(4))
+    k0, k1 = key[..., 0], key[..., 1]
+    for i in range(rounds):
+        if i:
+            k0 = (k0 + PHILOX_W0) & MASK_32
+            k1 = (k1 + PHILOX_W1) & MASK_32
+        product_0 = c0 * PHILOX_M0
+        product_1 = c2 * PHILOX_M1
+        c0, c1, c2, c3 = (
+            (product_1 >> SHIFT_32) ^ c1 ^ k0, product_1 & MASK_32,
+            (product_0 >> SHIFT_32) ^ c3 ^ k1, product_0 & MASK_32
+        )
+    return np.stack(np.broadcast_arrays(c0, c1, c2, c3), axis=-1).astype(np.uint32)
+
+
+def split_64(value) -> np.ndarray:
+    """Splits non-negative integers below 2 ** 64 into (low, high) 32-bit words."""
+    value = np.asarray(value, dtype=np.uint64)
+    return np.stack((value & MASK_32, value >> SHIFT_32), axis=-1)
+
+
+def hole_orientations(seed, step, count, start=0) -> np.ndarray:
+    """Returns ``count`` random booleans for the holes with indices from ``start`` to ``start + count - 1`` of a step.
+    ``seed`` and ``step`` must be integers in [0, 2 ** 64). Each Philox block provides the bits for 128 holes."""
+    if not 0 <= seed < 2 ** 64 or not 0 <= step < 2 ** 64:
+        raise ValueError('Seeds and steps must be integers in [0, 2 ** 64).')
+    if count <= 0:
+        return np.zeros(0, dtype=bool)
+    first_block = start // BITS_PER_BLOCK
+    blocks = np.arange(first_block, (start + count - 1) // BITS_PER_BLOCK + 1, dtype=np.uint64)
+    counters = np.concatenate((split_64(blocks), np.broadcast_to(split_64(step), (len(blocks), 2))), axis=1)
+    words = philox4x32(counters, split_64(seed))
+    bits = np.unpackbits(words.astype('<u4').view(np.uint8), bitorder='little')
+    offset = start - first_block * BITS_PER_BLOCK
+    return bits[offset:offset + count].astype(bool)
+
+
+def batch_hole_orientations(seeds: np.ndarray, step, counts: np.ndarray) -> np.ndarray:
+    """Same as ``hole_orientations(seeds[k], step, counts[k])`` for every k, concatenated, from a single Philox call.
+    ``seeds`` must be a uint64 array."""
+    if not 0 <= step < 2 ** 64:
+        raise ValueError('Seeds and steps must be integers in [0, 2 ** 64).')
+    counts = np.asarray(counts, dtype=np.intp)
+    block_counts = -(-counts // BITS_PER_BLOCK)
+    first_blocks = np.cumsum(block_counts) - block_counts
+    block_owners = np.repeat(np.arange(len(counts)), block_counts)
+    blocks = (np.arange(block_counts.sum()) - first_blocks[block_owners]).astype(np.uint64)
+    counters = np.concatenate((split_64(blocks), np.broadcast_to(split_64(step), (len(blocks), 2))), axis=1)
+    words = philox4x32(counters, split_64(np.asarray(seeds, dtype=np.uint64)[block_owners]))
+    bits = np.unpackbits(words.astype('<u4').view(np.uint8), bitorder='little')
+    first_holes = np.cumsum(counts) - counts
+    hole_owners = np.repeat(np.arange(len(counts)), counts)
+    positions = first_blocks[hole_owners] * BITS_PER_BLOCK + np.arange(counts.sum()) - first_holes[hole_owners]
+    return bits[positions].astype(bool)
+
+
+def sample_seed(seed, index) -> int:
+    """Derives the seed of the ``index``-th sample of a run from the run's seed. Both must be in [0, 2 ** 64)."""
+    if not 0 <= seed < 2 ** 64 or not 0 <= index < 2 ** 64:
+        raise ValueError('Seeds and sample indices must be integers in [0, 2 ** 64).')
+    counter = np.concatenate((split_64(index), [0, SAMPLE_SEED_DOMAIN]))
+    low, high = philox4x32(counter, split_64(seed))[:2]
+    return int(low) | int(high) << 32
@@ -0,0 +1,43 @@
+from typing import Dict, Optional
+
+import numpy as np
+
+from .board import Board, Engine, ARRAY_ENGINE, ALL_GRAY, NO_COLOR, GRAY, RED, YELLOW, GREEN, BLUE
+from .profiling import Profile, timed
+
+__all__ = ['sample_tiling', 'format_tiling']
+
+TEXT_SYMBOLS = {NO_COLOR: '.', GRAY: '#', RED: 'R', YELLOW: 'Y', GREEN: 'G', BLUE: 'B'}
+
+
+def sample_tiling(
+    order, seed=None, engine: Engine = ARRAY_ENGINE, timings: Optional[Dict[str, float]] = None,
+    profile: Optional[Profile] = None
+) -> Board:
+    """Runs the shuffle from an empty board up to a random tiling of the Aztec Diamond of the given order (the board
+    height is ``2 * order``). If ``timings`` is given, the wall time of each phase is added to it in seconds.
+    ``profile`` becomes the profile of the board."""
+    if order < 1:
+        raise ValueError('The order of an Aztec Diamond must be at least 1.')
+    with timed(timings, 'generate_data'):
+        board = Board(2, engine=engine, seed=seed, fill_strategy=ALL_GRAY, profile=profile)
+        board.reserve(order)
+    for i in range(order):
+        if i:
+            with timed(timings, 'advance_magic'):
+                board.advance_magic()
+        with timed(timings, 'get_holes'):
+            holes = board.get_holes(as_array=True)
+        with timed(timings, 'fill_holes'):
+            board.fill_holes(holes)
+    return board
+
+
+def format_tiling(board: Board) -> str:
+    """Returns a text representation of the black squares of a board, one line per row. White squares and squares
+    outside of the board are shown as ``.``, gray squares as ``#`` and the others by the initial of their color."""
+    lookup = np.full(256, ord('?'), dtype=np.uint8)
+    for color, symbol in TEXT_SYMBOLS.items():
+        lookup[color & 0xFF] = ord(symbol)
+    symbols = lookup[board.to_array().view(np.uint8)]
+    return '\n'.join(row.tobytes().decode('ascii') for row in symbols) + '\n'
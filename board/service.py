@@ -0,0 +1,348 @@
+"""
+Local sampling service: ``python -m board.service [--port PORT | --unix PATH] [--cache-dir DIR]``.
+
+Serves random tilings over HTTP, on a TCP port of localhost or on a Unix socket. ``GET /tiling?order=N&seed=S``
+returns the tiling that ``sample_tiling(N, seed=S)`` generates, in the compact ``.msd`` format of ``board.fileformat``
+by default, or as text or a ``.npy`` file with ``&format=text`` or ``&format=npy``. ``GET /stats`` returns the
+cache statistics as JSON.
+
+Tilings are generated on a pool of worker processes and kept in a bounded in-memory cache, and optionally in a bounded
+directory on disk, keyed by order and seed. The seeded engine always generates the same tiling for the same key, so
+repeated requests are answered from the cache, and identical requests that arrive while a tiling is being generated
+wait for the same result.
+"""
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import random
+import sys
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from .board import Engine, ARRAY_ENGINE
+from .fileformat import write_board, read_board
+from .sampling import sample_tiling, format_tiling
+
+__all__ = ['TilingCache', 'SamplingService']
+
+TilingKey = Tuple[int, int]  # order, seed
+CONTENT_TYPES = {'msd': 'application/octet-stream', 'npy': 'application/octet-stream', 'text': 'text/plain'}
+# Large responses are written in chunks of this many bytes, waiting for the client to catch up after each one
+STREAM_CHUNK = 1 << 20
+MAX_REQUEST_LINE = 8192
+
+
+def _retrieve_exception(task: asyncio.Task):
+    """Marks the exception of a task as retrieved, since every request that waited for it may have been cancelled."""
+    if not task.cancelled():
+        task.exception()
+
+
+def query_int(query: Dict[str, list], name) -> int:
+    """Returns the integer value of a query parameter, or raises ValueError with a message for the client."""
+    values = query.get(name)
+    if not values:
+        raise ValueError(f'Missing parameter: {name}')
+    try:
+        return int(values[0])
+    except ValueError:
+        raise ValueError(f'Invalid parameter: {name} must be an integer') from None
+
+
+def _sample_file(order, seed, engine) -> bytes:
+    """Generates a tiling in a worker process and returns it as the contents of a ``.msd`` file."""
+    buffer = io.BytesIO()
+    write_board(sample_tiling(order, seed=seed, engine=engine), buffer)
+    return buffer.getvalue()
+
+
+class TilingCache:
+    """
+    Least recently used ``.msd`` contents of tilings, limited to ``max_memory_bytes`` in memory and, if ``directory``
+    is given, to ``max_disk_bytes`` of files in that directory. Memory methods must be called from one thread; disk
+    methods may be called from any thread.
+    """
+    def __init__(self, max_memory_bytes, directory=None, max_disk_bytes=None):
+        self.max_memory_bytes = max_memory_bytes
+        self.memory_bytes = 0
+        self.entries: 'OrderedDict[TilingKey, bytes]' = OrderedDict()
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: TilingKey) -> Optional[bytes]:
+        data = self.entries.get(key)
+        if data is not None:
+            self.entries.move_to_end(key)
+        return data
+
+    def put(self, key: TilingKey, data: bytes):
+        if len(data) > self.max_memory_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.memory_bytes -= len(old)
+        self.entries[key] = data
+        self.memory_bytes += len(data)
+        while self.memory_bytes > self.max_memory_bytes:
+            self.memory_bytes -= len(self.entries.popitem(last=False)[1])
+
+    def path(self, key: TilingKey) -> str:
+        order, seed = key
+        return os.path.join(self.directory, f'tiling-{order}-{seed}.msd')
+
+    def load(self, key: TilingKey) -> Optional[bytes]:
+        """Returns a tiling from the disk cache, or None if it isn't there."""
+        if self.directory is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            # The modification time serves as the time of last use
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return data
+
+    def store(self, key: TilingKey, data: bytes):
+        """Adds a tiling to the disk cache and removes the least recently used files beyond its size limit."""
+        if self.directory is None:
+            return
+        path = self.path(key)
+        temporary_path = f'{path}.{os.getpid()}.tmp'
+        with open(temporary_path, 'wb') as f:
+            f.write(data)
+        os.replace(temporary_path, path)
+        if self.max_disk_bytes is not None:
+            self.trim_disk()
+
+    def trim_disk(self):
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.name.startswith('tiling-') and entry.name.endswith('.msd'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+class SamplingService:
+    """
+    Generates tilings on a pool of ``processes`` worker processes (by default, one per CPU) and caches them.
+    ``tiling()`` can be used directly from asyncio code; ``serve()`` exposes it over HTTP.
+    """
+    def __init__(
+        self, processes=None, engine: Engine = ARRAY_ENGINE, max_memory_bytes=256 * 2 ** 20, cache_dir=None,
+        max_disk_bytes=None, max_order=4096
+    ):
+        self.engine = engine
+        self.max_order = max_order
+        self.cache = TilingCache(max_memory_bytes, cache_dir, max_disk_bytes)
+        # Forked workers would inherit the sockets of the clients connected at the time, which then don't see the
+        # connection close until the workers exit
+        self.executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        self.pending: Dict[TilingKey, asyncio.Task] = {}
+        self.counters = {'requests': 0, 'memory_hits': 0, 'disk_hits': 0, 'generated': 0, 'shared': 0}
+
+    async def tiling(self, order, seed) -> bytes:
+        """Returns the ``.msd`` contents of the tiling ``sample_tiling(order, seed=seed)``, from the cache if
+        possible."""
+        if not 1 <= order <= self.max_order:
+            raise ValueError(f'The order must be between 1 and {self.max_order}.')
+        if not 0 <= seed < 2 ** 64:
+            raise ValueError('The seed must be in [0, 2 ** 64).')
+        key = (order, seed)
+        self.counters['requests'] += 1
+        data = self.cache.get(key)
+        if data is not None:
+            self.counters['memory_hits'] += 1
+            return data
+        task = self.pending.get(key)
+        if task is None:
+            # The service owns the task, so a waiter that's cancelled (for example because its client disconnected)
+            # doesn't cancel it for the other waiters
+            task = asyncio.ensure_future(self._produce(key))
+            task.add_done_callback(_retrieve_exception)
+            self.pending[key] = task
+        else:
+            self.counters['shared'] += 1
+        return await asyncio.shield(task)
+
+    async def _produce(self, key: TilingKey) -> bytes:
+        try:
+            data = await self._load_or_generate(key)
+        finally:
+            del self.pending[key]
+        self.cache.put(key, data)
+        return data
+
+    async def _load_or_generate(self, key: TilingKey) -> bytes:
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self.cache.load, key)
+        if data is not None:
+            self.counters['disk_hits'] += 1
+            return data
+        order, seed = key
+        data = await loop.run_in_executor(self.executor, _sample_file, order, seed, self.engine)
+        self.counters['generated'] += 1
+        await loop.run_in_executor(None, self.cache.store, key, data)
+        return data
+
+    def statistics(self) -> dict:
+        return {
+            **self.counters, 'cached': len(self.cache.entries), 'memory_bytes': self.cache.memory_bytes,
+            'pending': len(self.pending)
+        }
+
+    async def respond(self, writer: asyncio.StreamWriter, status, body: bytes, content_type='text/plain', headers=()):
+        """Writes a complete response, in chunks so that large bodies don't pile up in the transport's buffer."""
+        head = [f'HTTP/1.1 {status}', f'Content-Type: {content_type}', f'Content-Length: {len(body)}',
+                'Connection: close', *headers]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('ascii'))
+        view = memoryview(body)
+        for start in range(0, len(view), STREAM_CHUNK):
+            writer.write(view[start:start + STREAM_CHUNK])
+            await writer.drain()
+        await writer.drain()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            # Headers aren't needed, but are read so that the client isn't cut off while sending them
+            while len(await reader.readline()) > 2:
+                pass
+            if len(request_line) > MAX_REQUEST_LINE:
+                await self.respond(writer, '414 URI Too Long', b'')
+                return
+            try:
+                method, target, _ = request_line.decode('ascii').split()
+            except (UnicodeDecodeError, ValueError):
+                await self.respond(writer, '400 Bad Request', b'Malformed request line\n')
+                return
+            if method != 'GET':
+                await self.respond(writer, '405 Method Not Allowed', b'Only GET is supported\n', headers=['Allow: GET'])
+                return
+            url = urlsplit(target)
+            if url.path == '/stats':
+                await self.respond(writer, '200 OK', json.dumps(self.statistics()).encode(), 'application/json')
+            elif url.path == '/tiling':
+                await self.respond_tiling(writer, parse_qs(url.query))
+            else:
+                await self.respond(writer, '404 Not Found', b'Try /tiling?order=N&seed=S or /stats\n')
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except ValueError:
+            # A request line or header beyond the stream's limit
+            await self.respond(writer, '400 Bad Request', b'Request too long\n')
+        except Exception as error:
+            await self.respond(writer, '500 Internal Server Error', f'{type(error).__name__}: {error}\n'.encode())
+        finally:
+            writer.close()
+
+    async def respond_tiling(self, writer: asyncio.StreamWriter, query: Dict[str, list]):
+        try:
+            order = query_int(query, 'order')
+            seed = query_int(query, 'seed') if 'seed' in query else random.getrandbits(64)
+            output_format = query.get('format', ['msd'])[0]
+            if output_format not in CONTENT_TYPES:
+                raise ValueError(f'Unknown format: {output_format}')
+            data = await self.tiling(order, seed)
+        except ValueError as error:
+            await self.respond(writer, '400 Bad Request', f'{error}\n'.encode())
+            return
+        if output_format != 'msd':
+            data = await asyncio.get_running_loop().run_in_executor(None, convert_tiling, data, output_format)
+        await self.respond(writer, '200 OK', data, CONTENT_TYPES[output_format], [f'X-Seed: {seed}'])
+
+    async def serve(self, host='127.0.0.1', port=8765, unix_path=None):
+        """Serves requests until the task is cancelled. Listens on ``unix_path`` if it's given, else on
+        ``host:port``."""
+        if unix_path is not None:
+            server = await asyncio.start_unix_server(self.handle, unix_path)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown()
+
+
+def convert_tiling(data: bytes, output_format) -> bytes:
+    """Converts the contents of a ``.msd`` file to text or to the contents of a ``.npy`` file."""
+    board = read_board(io.BytesIO(data))
+    if output_format == 'text':
+        return format_tiling(board).encode('ascii')
+    buffer = io.BytesIO()
+    np.save(buffer, board.to_array())
+    return buffer.getvalue()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m board.service', description='Serve random tilings of Aztec Diamonds with a cache.'
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8765, help='port to listen on (default: 8765)')
+    parser.add_argument('--unix', metavar='PATH', help='listen on this Unix socket instead of a TCP port')
+    parser.add_argument(
+        '--processes', type=int, default=0, help='number of worker processes; 0 means one per CPU (default: 0)'
+    )
+    parser.add_argument(
+        '--memory-cache', type=float, default=256, metavar='MIB',
+        help='size of the in-memory cache in MiB (default: 256)'
+    )
+    parser.add_argument('--cache-dir', help='also cache tilings as .msd files in this directory')
+    parser.add_argument(
+        '--disk-cache', type=float, metavar='MIB', help='size limit of the cache directory in MiB (default: none)'
+    )
+    parser.add_argument(
+        '--max-order', type=int, default=4096, help='largest order that may be requested (default: 4096)'
+    )
+    args = parser.parse_args(argv)
+    if args.processes < 0:
+        parser.error('the number of processes must not be negative')
+    if args.memory_cache < 0 or args.disk_cache is not None and args.disk_cache < 0:
+        parser.error('cache sizes must not be negative')
+    if args.disk_cache is not None and args.cache_dir is None:
+        parser.error('--disk-cache requires --cache-dir')
+    if args.max_order < 1:
+        parser.error('the largest order must be at least 1')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = SamplingService(
+        args.processes or None, max_memory_bytes=int(args.memory_cache * 2 ** 20), cache_dir=args.cache_dir,
+        max_disk_bytes=None if args.disk_cache is None else int(args.disk_cache * 2 ** 20), max_order=args.max_order
+    )
+    address = args.unix or f'http://{args.host}:{args.port}'
+    print(f'Serving tilings on {address}', file=sys.stderr)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+from typing import Dict, TYPE_CHECKING
+
+import numpy as np
+
+from .array_board import ArrayBoard, black_mask
+from .board import Board, RED, YELLOW, GREEN, BLUE
+
+if TYPE_CHECKING:
+    from .batch import BoardBatch
+
+__all__ = ['TilingStatistics']
+
+STATISTICS_COLORS = (RED, YELLOW, GREEN, BLUE)
+
+
+class TilingStatistics:
+    """
+    Per-square color counts over any number of tilings of one order, in memory that doesn't depend on that number.
+
+    ``counts[i, y + order, x + order]`` is the number of added tilings where the black square (x, y) has the color
+    ``STATISTICS_COLORS[i]``, with the same indexing as ``Board.to_array()``. Statistics of tilings added to separate
+    instances (for example in separate processes) can be combined with ``merge()``.
+    """
+    def __init__(self, order):
+        if order < 1:
+            raise ValueError('The order of an Aztec Diamond must be at least 1.')
+        self.order = order
+        self.samples = 0
+        self.counts = np.zeros((len(STATISTICS_COLORS), order * 2, order * 2), dtype=np.uint32)
+
+    def add(self, board: Board):
+        """Adds a complete tiling. Boards of the array engine are counted without copying their data."""
+        if board.height != self.order * 2:
+            raise ValueError(f'Expected a board of order {self.order}, got order {board.height // 2}')
+        self.add_array(board.data if isinstance(board, ArrayBoard) else board.to_array())
+
+    def add_array(self, array: np.ndarray):
+        """Adds a complete tiling given as an array in the format of ``Board.to_array()``."""
+        if array.shape != self.counts.shape[1:]:
+            raise ValueError(f'Expected an array of shape {self.counts.shape[1:]}, got {array.shape}')
+        for plane, color in enumerate(STATISTICS_COLORS):
+            self.counts[plane] += array == color
+        self.samples += 1
+
+    def add_batch(self, batch: 'BoardBatch'):
+        """Adds every tiling of a ``BoardBatch`` at once."""
+        if batch.data.shape[1:] != self.counts.shape[1:]:
+            raise ValueError(f'Expected boards of order {self.order}, got order {batch.height // 2}')
+        for plane, color in enumerate(STATISTICS_COLORS):
+            self.counts[plane] += np.count_nonzero(batch.data == color, axis=0).astype(np.uint32)
+        self.samples += len(batch)
+
+    def merge(self, other: 'TilingStatistics') -> 'TilingStatistics':
+        """Adds the counts of another instance of the same order to this one and returns this one."""
+        if other.order != self.order:
+            raise ValueError(f'Cannot merge statistics of order {other.order} into order {self.order}')
+        self.counts += other.counts
+        self.samples += other.samples
+        return self
+
+    def frequencies(self) -> np.ndarray:
+        """Returns the fraction of tilings in which each square has each color, in the layout of ``counts``."""
+        return self.counts / max(self.samples, 1)
+
+    def frozen_mask(self, tolerance=0.05) -> np.ndarray:
+        """Returns a boolean array that is True for black squares which had the same color in all but at most
+        ``tolerance`` of the tilings. In large random tilings, these form the four frozen regions in the corners."""
+        return black_mask(self.order * 2) & (self.counts.max(axis=0) >= (1 - tolerance) * max(self.samples, 1))
+
+    def arctic_boundary(self, tolerance=0.05) -> np.ndarray:
+        """Returns an estimate of the boundary between the frozen regions and the temperate region in the middle, as
+        the (x, y) coordinates of the leftmost and rightmost black square that isn't frozen on every row."""
+        temperate = black_mask(self.order * 2) & ~self.frozen_mask(tolerance)
+        rows = np.flatnonzero(temperate.any(axis=1))
+        lefts = temperate[rows].argmax(axis=1)
+        rights = temperate.shape[1] - 1 - temperate[rows, ::-1].argmax(axis=1)
+        xs = np.concatenate((lefts, rights)) - self.order
+        ys = np.concatenate((rows, rows)) - self.order
+        return np.stack((xs, ys), axis=1)
+
+    def arctic_radius(self, tolerance=0.05) -> float:
+        """Returns the mean distance between the center of the diamond and ``arctic_boundary()``, divided by the
+        order. For large orders, this approaches 1 / sqrt(2), the radius of the arctic circle."""
+        boundary = self.arctic_boundary(tolerance)
+        if not len(boundary):
+            return 0.0
+        return float(np.hypot(boundary[:, 0] + 0.5, boundary[:, 1] + 0.5).mean() / self.order)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            'order': np.array(self.order),
+            'samples': np.array(self.samples),
+            'colors': np.array(STATISTICS_COLORS, dtype=np.int8),
+            'counts': self.counts
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays) -> 'TilingStatistics':
+        statistics = cls(int(arrays['order']))
+        statistics.samples = int(arrays['samples'])
+        statistics.counts[...] = arrays['counts']
+        return statistics
+
+    def save(self, path):
+        """Writes the statistics to a NumPy ``.npz`` file with the arrays of ``to_arrays()``."""
+        np.savez_compressed(path, **self.to_arrays())
+
+    @classmethod
+    def load(cls, path) -> 'TilingStatistics':
+        with np.load(path) as arrays:
+            return cls.from_arrays(arrays)
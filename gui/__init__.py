@@ -1,2 +1,3 @@
 from .board_render import *
 from .main_window import *
+from .export import *
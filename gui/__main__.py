@@ -0,0 +1,97 @@
+"""
+Headless animation export: ``python -m gui ORDER OUTPUT [--seed SEED] [--size WIDTH HEIGHT] [--fps FPS]``.
+
+Runs the shuffle up to the given order and writes one frame per step, painted offscreen like the window paints the
+board, to OUTPUT: a ``.gif`` file, a ``.rgb`` file of raw RGB24 frames (``-`` for stdout) or a directory of PNG files.
+"""
+import argparse
+import os
+import random
+import sys
+from time import perf_counter
+
+from .export import ANIMATION_FORMATS, animation_format_of, export_animation
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m gui', description='Export the shuffle of an Aztec Diamond as an animation without a window.'
+    )
+    parser.add_argument('order', type=int, help='order of the diamond in the last frame (half of its height)')
+    parser.add_argument('output', help='GIF file, raw RGB24 file (- for stdout) or directory of PNG files')
+    parser.add_argument(
+        '--format', choices=ANIMATION_FORMATS, help='format of the output (default: guessed from its extension)'
+    )
+    parser.add_argument('--seed', type=int, help='seed of the shuffle (default: random)')
+    parser.add_argument(
+        '--size', type=int, nargs=2, default=(800, 800), metavar=('WIDTH', 'HEIGHT'),
+        help='size of the frames in pixels (default: 800 800)'
+    )
+    parser.add_argument('--fps', type=float, default=10, help='frames per second (default: 10)')
+    parser.add_argument(
+        '--show-moves', action='store_true', help='also show every step after moving the dominoes, before filling holes'
+    )
+    parser.add_argument('--no-hole-borders', action='store_true', help="don't draw borders around filled holes")
+    parser.add_argument('--domino-borders', action='store_true', help='draw borders around dominoes')
+    parser.add_argument('--no-arrows', action='store_true', help="don't draw the directions of dominoes")
+    parser.add_argument('--no-checkerboard', action='store_true', help="don't shade squares in a checkerboard pattern")
+    parser.add_argument(
+        '--queue-size', type=int, default=8, help='painted frames that may wait to be encoded (default: 8)'
+    )
+    parser.add_argument(
+        '--processes', type=int, default=0,
+        help='number of processes that compress GIF frames; 0 means one per CPU (default: 0)'
+    )
+    parser.add_argument('--quiet', action='store_true', help="don't report progress on stderr")
+    args = parser.parse_args(argv)
+    if args.order < 1:
+        parser.error('the order must be at least 1')
+    if min(args.size) < 1 or max(args.size) > 0xFFFF:
+        parser.error('the width and height must be between 1 and 65535')
+    if args.fps <= 0:
+        parser.error('the frame rate must be positive')
+    if args.queue_size < 1:
+        parser.error('the queue size must be at least 1')
+    if args.processes < 0:
+        parser.error('the number of processes must not be negative')
+    if args.seed is not None and not 0 <= args.seed < 2 ** 64:
+        parser.error('the seed must be in [0, 2 ** 64)')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.seed is None:
+        args.seed = random.getrandbits(64)
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PySide2.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+
+    def progress(done, total):
+        print(f'\rstep {done}/{total}', end='', file=sys.stderr, flush=True)
+
+    start = perf_counter()
+    width, height = args.size
+    frames = export_animation(
+        args.output, args.order, args.format, args.seed, width, height, args.fps, args.show_moves,
+        hole_borders=not args.no_hole_borders, domino_borders=args.domino_borders, arrows=not args.no_arrows,
+        checkerboard=not args.no_checkerboard, queue_size=args.queue_size, processes=args.processes or None,
+        progress=None if args.quiet else progress
+    )
+    if not args.quiet:
+        total = perf_counter() - start
+        print(
+            f'\norder {args.order}, seed {args.seed}: {frames} frames in {total:.3f} s ({frames / total:.1f} frames/s)',
+            file=sys.stderr
+        )
+        if (args.format or animation_format_of(args.output)) == 'raw':
+            print(
+                f'encode with: ffmpeg -f rawvideo -pix_fmt rgb24 -s {width}x{height} -r {args.fps:g} '
+                f'-i {args.output} animation.mp4',
+                file=sys.stderr
+            )
+    del app
+
+
+if __name__ == '__main__':
+    main()
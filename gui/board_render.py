@@ -1,9 +1,11 @@
-from copy import deepcopy
-from PySide2.QtWidgets import QWidget, QSizePolicy, QOpenGLWidget
+import math
+import numpy as np
+from PySide2.QtWidgets import QApplication, QWidget, QSizePolicy, QOpenGLWidget
 from PySide2.QtCore import Qt, QRectF, QTimer, Signal, QSize, Slot, QPointF, QThread, QObject
-from PySide2.QtGui import QPainter, QBrush, QPen, QColor
+from PySide2.QtGui import QPainter, QBrush, QPen, QColor, QImage
 
 import board
+from .tiles import TilePyramid, TileWorker, TILE_SIZE
 
 
 class AztecDiamondRenderer(QOpenGLWidget):
@@ -24,39 +26,72 @@ class AztecDiamondRenderer(QOpenGLWidget):
     }.items():
         square_colors[board.BLACK, color] = QColor(*map(lambda n: max(0, n - 10), value))
         square_colors[board.WHITE, color] = QColor(*map(lambda n: min(255, n + 10), value))
+    # Premultiplied ARGB values of square_colors indexed by [parity, color & 0xFF], used to build raster images.
+    # Squares outside of the board are transparent, like in vector mode, which doesn't paint them.
+    raster_colors = np.zeros((2, 256), dtype=np.uint32)
+    for key, qcolor in square_colors.items():
+        if key[1] != board.NO_COLOR:
+            raster_colors[key[0], key[1] & 0xFF] = qcolor.rgba()
+
+    # Below this size in pixels, borders and arrows are too small to see in raster mode and aren't drawn
+    MIN_DETAIL_SQUARE_SIZE = 4
+    # Boards at least this tall are drawn from a tiled image pyramid instead of a single raster image
+    TILED_MIN_HEIGHT = 2048
+    MAX_SQUARE_SIZE = 200
+    ZOOM_STEP = 1.25
 
     boardChanged = Signal(QSize)
+    skipaheadStarted = Signal(int)
     skipaheadProgress = Signal(int)
     skipaheadComplete = Signal()
+    historyChanged = Signal(int, int)
 
     class _SkipAheadWorker(QObject):
         progressed = Signal(int)
         completed = Signal(board.Board)
 
-        def __init__(self, board, n, parent=None):
+        def __init__(self, job, parent=None):
             super().__init__(parent=parent)
-            self.board = board
-            self.n = n
+            self.job = job
+            self.job.progress = lambda done, total: self.progressed.emit(done)
 
         @Slot()
         def run(self):
-            for i in range(self.n):
-                self.board.advance_magic()
-                self.board.fill_holes(self.board.get_holes())
-                self.progressed.emit(i)
-            self.completed.emit(self.board)
+            self.completed.emit(self.job.run())
 
     def __init__(self, parent=None):
         super().__init__(parent=parent)
         self._worker = None
         self._worker_thread = None
-        self.board = board.Board(2)
+        self.job = None
+        self._frozen_raster = None
+        # Shared with every board this shows, so that it holds the phases of the board and of painting
+        self.profile = board.Profile()
+        self.set_board(board.Board(2, engine=board.ARRAY_ENGINE))
+        self.history = board.StepHistory(self.board)
         self.holes = []
         self.base_square_size = 500
         self.hole_borders_enabled = True
         self.domino_borders_enabled = False
         self.domino_arrows_enabled = True
         self.checkerboard_enabled = True
+        self.raster_enabled = True
+        self.tiles_enabled = True
+        self._raster_image = None
+        self._raster_pixels = None
+        self._raster_source = None
+        self.zoom = 1.0
+        self.view_center = QPointF(0, 0)
+        self._drag_position = None
+        self.pyramid = None
+        self._pyramid_changes = None
+        self._tile_thread = QThread(self)
+        self._tile_worker = TileWorker()
+        self._tile_worker.moveToThread(self._tile_thread)
+        self._tile_thread.started.connect(self._tile_worker.run)
+        self._tile_worker.built.connect(self.update)
+        self._tile_thread.start(QThread.LowPriority)
+        QApplication.instance().aboutToQuit.connect(self.stop_tile_worker)
         self.setMinimumSize(self.base_square_size, self.base_square_size)
         policy = self.sizePolicy()
         policy.setHeightForWidth(True)
@@ -64,54 +99,232 @@ class AztecDiamondRenderer(QOpenGLWidget):
         self.boardChanged.connect(self.recalculate_holes)
         self.boardChanged.emit(self.minimumSize())
 
+    def set_board(self, value):
+        """Replaces the board. The new board records its phases in the renderer's profile."""
+        value.profile = self.profile
+        self.board = value
+
     def recalculate_holes(self):
         self.holes = self.board.get_holes()
 
+    def invalidate_raster(self):
+        self._raster_image = None
+        self._raster_pixels = None
+        self.pyramid = None
+
+    def stop_tile_worker(self):
+        self._tile_worker.stop()
+        self._tile_thread.quit()
+        self._tile_thread.wait()
+
+    def is_tiled(self) -> bool:
+        return self.tiles_enabled and self.board.height >= self.TILED_MIN_HEIGHT
+
+    def sync_pyramid(self) -> TilePyramid:
+        """Returns the tile pyramid of the current board, updating it if the board changed. If only holes were
+        refilled since the last update, only the tiles that contain them are rebuilt; otherwise, the whole pyramid is
+        rebuilt in the background."""
+        colors = self.board.square_colors()
+        if self.pyramid is not None and self.pyramid.colors is colors:
+            return self.pyramid
+        if self.pyramid is not None and self.pyramid.height == len(colors) and self._pyramid_changes is not None:
+            self.pyramid.update(colors, self._pyramid_changes)
+        else:
+            self.pyramid = TilePyramid(colors, self.raster_colors, self.checkerboard_enabled)
+            self._tile_worker.request(self.pyramid)
+        self._pyramid_changes = None
+        return self.pyramid
+
+    def raster_image(self) -> QImage:
+        """Returns an image of the board with one pixel per square, built from the board data in bulk.
+        The image is rebuilt whenever the board's derived squares change."""
+        colors = self.board.square_colors()
+        if self._raster_image is None or self._raster_source is not colors:
+            self._raster_source = colors
+            height = len(colors)
+            if self.checkerboard_enabled:
+                ys, xs = np.ogrid[:height, :height]
+                parities = (xs + ys) % 2
+            else:
+                parities = board.BLACK
+            self._raster_pixels = np.ascontiguousarray(self.raster_colors[parities, colors.view(np.uint8)])
+            # The image uses the buffer without copying it, so the buffer is kept alive with it
+            self._raster_image = QImage(
+                self._raster_pixels.data, height, height, height * 4, QImage.Format_ARGB32_Premultiplied
+            )
+        return self._raster_image
+
+    def load_board(self, path):
+        """Replaces the board with one saved by ``Board.save()``, on the array engine, and starts a new history with
+        it. Raises OSError or ValueError if the file can't be read."""
+        self.set_board(board.Board.load(path, board.ARRAY_ENGINE))
+        self.history = board.StepHistory(self.board)
+        self._pyramid_changes = None
+        self.boardChanged.emit(self.minimumSize())
+        self.historyChanged.emit(self.history.position, len(self.history))
+        self.resetView()
+        self.repaint()
+
+    def record_history(self, holes=None, advanced=False):
+        self.history.record(self.board, holes, advanced)
+        self.historyChanged.emit(self.history.position, len(self.history))
+
+    def show_step(self, index):
+        """Replaces the board with a state from the history. The next change to the board discards the states that
+        came after it."""
+        self.set_board(self.history.seek(index, self.board.engine))
+        self._pyramid_changes = None
+        self.boardChanged.emit(self.minimumSize())
+        holes = self.history.holes(index)
+        if holes is not None:
+            # Show the holes that were filled to reach this state, so that they can be re-filled
+            self.holes = list(map(tuple, holes.tolist()))
+        self.historyChanged.emit(self.history.position, len(self.history))
+        self.repaint()
+
     def advance_magic(self, repaint=True):
         self.board.advance_magic()
+        self.record_history(advanced=True)
         self.boardChanged.emit(self.minimumSize())
         if repaint:
             self.repaint()
 
-    def skip_ahead(self, n):
+    def skip_ahead(self, n, checkpoint_path=None):
+        """Advances the board by n steps. All but the last step are done by a ``board.SkipAheadJob`` on a worker thread,
+        which can be paused or cancelled and saves checkpoints to ``checkpoint_path`` if it's given."""
+        target_order = self.board.height // 2 + max(n - 1, 0)
+        self.start_skip_ahead(board.SkipAheadJob(self.board, target_order, checkpoint_path=checkpoint_path))
+
+    def resume_skip_ahead(self, checkpoint_path, target_order):
+        """Continues a skip-ahead that was interrupted, from the board saved at ``checkpoint_path``."""
+        self.start_skip_ahead(board.SkipAheadJob.from_checkpoint(checkpoint_path, target_order, self.board.engine))
+
+    def start_skip_ahead(self, job):
+        # The worker owns the board until it's done, so the last raster image (or tile pyramid, which is built from a
+        # copy of the board's colors) is painted in the meantime
+        if self.is_tiled():
+            self._frozen_raster = self.sync_pyramid(), None, self.board.height
+        else:
+            self.raster_image()
+            self._frozen_raster = self._raster_image, self._raster_pixels, self.board.height
+        self.job = job
         self._worker_thread = QThread(self)
-        self._worker = self._SkipAheadWorker(deepcopy(self.board), n - 1)
+        self._worker = self._SkipAheadWorker(job)
         self._worker_thread.started.connect(self._worker.run)
         self._worker.progressed.connect(self.skipaheadProgress.emit)
         self._worker.completed.connect(self._on_worker_complete)
         self._worker.moveToThread(self._worker_thread)
+        self.skipaheadStarted.emit(job.total)
         self._worker_thread.start(QThread.LowPriority)
 
+    def cancel_skip_ahead(self):
+        if self.job is not None:
+            self.job.cancel()
+
+    def set_skip_ahead_paused(self, paused):
+        if self.job is not None:
+            if paused:
+                self.job.pause()
+            else:
+                self.job.resume()
+
     @Slot(board.Board)
     def _on_worker_complete(self, board):
-        self.board = board
+        job = self.job
+        self.set_board(board)
+        self.job = None
+        self._frozen_raster = None
         self._worker = None
         self._worker_thread.quit()
-        self.advance_magic(repaint=False)
-        self.recalculate_holes()
-        self.fill_holes()
+        if job.finished:
+            self.advance_magic(repaint=False)
+            self.recalculate_holes()
+            self.fill_holes()
+        else:
+            self.record_history()
+            self.boardChanged.emit(self.minimumSize())
         self.skipaheadComplete.emit()
         self.repaint()
 
     def fill_holes(self):
+        if self.is_tiled():
+            # Make sure the pyramid matches the board before it changes, so that only the holes need to be redrawn
+            self.sync_pyramid()
+            self._pyramid_changes = self.holes
         self.board.fill_holes(self.holes)
+        self.record_history(self.holes)
         self.repaint()
 
     def paintEvent(self, event):
         if not self.board:
             return
-        self.base_square_size = min(self.size().width(), self.size().height())
         painter = QPainter(self)
+        self.paint_board(painter, self.size())
+
+    def render_pixels(self, width, height) -> np.ndarray:
+        """Paints the board into an offscreen image of the given size and returns its pixels as a ``height`` x
+        ``width`` uint32 ARGB array."""
+        pixels = np.empty((height, width), dtype=np.uint32)
+        image = QImage(pixels.data, width, height, width * 4, QImage.Format_RGB32)
+        painter = QPainter(image)
+        self.paint_board(painter, QSize(width, height))
+        painter.end()
+        return pixels
+
+    def view_transform(self, size: QSize, height):
+        """Returns the size of a square in pixels and the position of the point (0, 0) of the board in the widget."""
+        square_size = self.base_square_size / height * self.zoom
+        offset_x = size.width() // 2 - self.view_center.x() * square_size
+        offset_y = size.height() // 2 - self.view_center.y() * square_size
+        return square_size, offset_x, offset_y
+
+    def paint_board(self, painter: QPainter, size: QSize):
+        """Paints the board centered in an area of the given size, which may be the widget or an offscreen image."""
+        self.base_square_size = min(size.width(), size.height())
         painter.setPen(Qt.NoPen)
         painter.setBrush(self.palette().color(self.backgroundRole()))
-        painter.drawRect(self.rect())
-        board_radius = len(self.board.data) // 2
-        square_size = self.base_square_size / board_radius / 2
-        offset_x = self.size().width() // 2
-        offset_y = self.size().height() // 2
-        for y in range(-board_radius, board_radius):
-            for x in range(-board_radius, board_radius):
-                if (color := self.board.get_square_color(x, y)) != board.NO_COLOR:
+        painter.drawRect(QRectF(0, 0, size.width(), size.height()))
+        if self.job is not None:
+            image, _, height = self._frozen_raster
+            square_size, offset_x, offset_y = self.view_transform(size, height)
+            if isinstance(image, TilePyramid):
+                self.paint_tiles(painter, size, image, square_size, offset_x, offset_y)
+            else:
+                self.paint_image(painter, image, height, square_size, offset_x, offset_y)
+            return
+        board_radius = self.board.height // 2
+        square_size, offset_x, offset_y = self.view_transform(size, self.board.height)
+        derived = self.board.derived()
+        # Array indices of the rows and columns of squares that are at least partly visible, plus one more on each side
+        # so that dominos and holes that are cut off by the edge of the view are drawn too
+        visible_x = slice(
+            max(0, math.floor(-offset_x / square_size) + board_radius - 1),
+            max(0, math.ceil((size.width() - offset_x) / square_size) + board_radius + 1)
+        )
+        visible_y = slice(
+            max(0, math.floor(-offset_y / square_size) + board_radius - 1),
+            max(0, math.ceil((size.height() - offset_y) / square_size) + board_radius + 1)
+        )
+        with self.profile.timed('paint_squares'):
+            if self.raster_enabled:
+                painter.setRenderHint(QPainter.SmoothPixmapTransform, False)
+                if self.is_tiled():
+                    self.paint_tiles(painter, size, self.sync_pyramid(), square_size, offset_x, offset_y)
+                else:
+                    self.paint_image(painter, self.raster_image(), self.board.height, square_size, offset_x, offset_y)
+                if self.profile.enabled:
+                    visible_columns = min(visible_x.stop, self.board.height) - min(visible_x.start, self.board.height)
+                    visible_rows = min(visible_y.stop, self.board.height) - min(visible_y.start, self.board.height)
+                    self.profile.count('squares_drawn', visible_columns * visible_rows)
+                if square_size < self.MIN_DETAIL_SQUARE_SIZE:
+                    return
+            else:
+                ys, xs = np.nonzero(derived.colors[visible_y, visible_x] != board.NO_COLOR)
+                ys += visible_y.start
+                xs += visible_x.start
+                for x, y, color in zip(
+                    (xs - board_radius).tolist(), (ys - board_radius).tolist(), derived.colors[ys, xs].tolist()
+                ):
                     painter.setBrush(QBrush(self.square_colors[
                         self.board.get_square_parity(x, y) if self.checkerboard_enabled else board.BLACK, color
                     ]))
@@ -119,65 +332,170 @@ class AztecDiamondRenderer(QOpenGLWidget):
                         x * square_size + offset_x, y * square_size + offset_y,
                         square_size + 0.5, square_size + 0.5
                     ))
-        if self.domino_borders_enabled:
-            painter.setPen(QPen(QBrush(self.DOMINO_BORDER), max(1, square_size / 20)))
-            painter.setBrush(Qt.NoBrush)
-            for y in range(-board_radius, board_radius):
-                for x in range(-board_radius, board_radius):
-                    if self.board.get_square_parity(x, y) == board.BLACK and (other := self.board.get_square_neighbor(x, y)):
-                        painter.drawRect(QRectF(
-                            min(x, other[0]) * square_size + offset_x, min(y, other[1]) * square_size + offset_y,
-                            max(other[0] - x + 1, x - other[0] + 1) * square_size,
-                            max(other[1] - y + 1, y - other[1] + 1) * square_size
-                        ))
-        if self.hole_borders_enabled:
-            painter.setBrush(Qt.NoBrush)
-            painter.setPen(QPen(QBrush(self.HOLE_BORDER), max(1, square_size / 10)))
-            for x, y in self.holes:
-                painter.drawRect(QRectF(
-                    x * square_size + offset_x, y * square_size + offset_y,
-                    square_size * 2, square_size * 2
-                ))
-        if self.domino_arrows_enabled:
-            painter.setBrush(QBrush(self.ARROWS))
-            painter.setPen(Qt.NoPen)
-            for y in range(-board_radius, board_radius):
-                for x in range(-board_radius, board_radius):
-                    if self.board.get_square_parity(x, y) == board.BLACK:
-                        color = self.board.get_square_color(x, y)
-                        radius = square_size / 6
-                        if color == board.BLUE:
-                            center_x = (self.board.polarity + 1) * square_size / 2 + x * square_size + offset_x
-                            center_y = y * square_size + square_size / 2 + offset_y
-                            painter.drawConvexPolygon([
-                                QPointF(center_x - radius, center_y + radius),
-                                QPointF(center_x, center_y - radius),
-                                QPointF(center_x + radius, center_y + radius)
-                            ])
-                        elif color == board.GREEN:
-                            center_x = (self.board.polarity * -1 + 1) * square_size / 2 + x * square_size + offset_x
-                            center_y = y * square_size + square_size / 2 + offset_y
-                            painter.drawConvexPolygon([
-                                QPointF(center_x - radius, center_y - radius),
-                                QPointF(center_x, center_y + radius),
-                                QPointF(center_x + radius, center_y - radius)
-                            ])
-                        elif color == board.YELLOW:
-                            center_y = (self.board.polarity + 1) * square_size / 2 + y * square_size + offset_y
-                            center_x = x * square_size + square_size / 2 + offset_x
-                            painter.drawConvexPolygon([
-                                QPointF(center_x + radius, center_y + radius),
-                                QPointF(center_x - radius, center_y),
-                                QPointF(center_x + radius, center_y - radius)
-                            ])
-                        elif color == board.RED:
-                            center_y = (self.board.polarity * -1 + 1) * square_size / 2 + y * square_size + offset_y
-                            center_x = x * square_size + square_size / 2 + offset_x
-                            painter.drawConvexPolygon([
-                                QPointF(center_x - radius, center_y - radius),
-                                QPointF(center_x + radius, center_y),
-                                QPointF(center_x - radius, center_y + radius)
-                            ])
+                self.profile.count('squares_drawn', len(xs))
+        with self.profile.timed('paint_borders'):
+            # Black squares that are part of a domino
+            ys, xs = np.nonzero(derived.colors[visible_y, visible_x] > board.GRAY)
+            ys += visible_y.start
+            xs += visible_x.start
+            is_black = (xs + ys) % 2 == 0
+            ys, xs = ys[is_black], xs[is_black]
+            if self.domino_borders_enabled:
+                painter.setPen(QPen(QBrush(self.DOMINO_BORDER), max(1, square_size / 20)))
+                painter.setBrush(Qt.NoBrush)
+                partners = derived.partners[ys, xs]
+                painter.drawRects([
+                    QRectF(
+                        (x - board_radius + min(dx, 0)) * square_size + offset_x,
+                        (y - board_radius + min(dy, 0)) * square_size + offset_y,
+                        (abs(dx) + 1) * square_size, (abs(dy) + 1) * square_size
+                    )
+                    for x, y, (dx, dy) in zip(xs.tolist(), ys.tolist(), partners.tolist())
+                ])
+                self.profile.count('borders_drawn', len(xs))
+            if self.hole_borders_enabled:
+                painter.setBrush(Qt.NoBrush)
+                painter.setPen(QPen(QBrush(self.HOLE_BORDER), max(1, square_size / 10)))
+                for x, y in self.holes:
+                    if not (visible_x.start <= x + board_radius < visible_x.stop
+                            and visible_y.start <= y + board_radius < visible_y.stop):
+                        continue
+                    painter.drawRect(QRectF(
+                        x * square_size + offset_x, y * square_size + offset_y,
+                        square_size * 2, square_size * 2
+                    ))
+        with self.profile.timed('paint_arrows'):
+            if self.domino_arrows_enabled:
+                painter.setBrush(QBrush(self.ARROWS))
+                painter.setPen(Qt.NoPen)
+                radius = square_size / 6
+                self.profile.count('arrows_drawn', len(xs))
+                for x, y, color in zip(
+                    (xs - board_radius).tolist(), (ys - board_radius).tolist(), derived.colors[ys, xs].tolist()
+                ):
+                    if color == board.BLUE:
+                        center_x = (self.board.polarity + 1) * square_size / 2 + x * square_size + offset_x
+                        center_y = y * square_size + square_size / 2 + offset_y
+                        painter.drawConvexPolygon([
+                            QPointF(center_x - radius, center_y + radius),
+                            QPointF(center_x, center_y - radius),
+                            QPointF(center_x + radius, center_y + radius)
+                        ])
+                    elif color == board.GREEN:
+                        center_x = (self.board.polarity * -1 + 1) * square_size / 2 + x * square_size + offset_x
+                        center_y = y * square_size + square_size / 2 + offset_y
+                        painter.drawConvexPolygon([
+                            QPointF(center_x - radius, center_y - radius),
+                            QPointF(center_x, center_y + radius),
+                            QPointF(center_x + radius, center_y - radius)
+                        ])
+                    elif color == board.YELLOW:
+                        center_y = (self.board.polarity + 1) * square_size / 2 + y * square_size + offset_y
+                        center_x = x * square_size + square_size / 2 + offset_x
+                        painter.drawConvexPolygon([
+                            QPointF(center_x + radius, center_y + radius),
+                            QPointF(center_x - radius, center_y),
+                            QPointF(center_x + radius, center_y - radius)
+                        ])
+                    elif color == board.RED:
+                        center_y = (self.board.polarity * -1 + 1) * square_size / 2 + y * square_size + offset_y
+                        center_x = x * square_size + square_size / 2 + offset_x
+                        painter.drawConvexPolygon([
+                            QPointF(center_x - radius, center_y - radius),
+                            QPointF(center_x + radius, center_y),
+                            QPointF(center_x - radius, center_y + radius)
+                        ])
+
+    def paint_image(self, painter: QPainter, image: QImage, height, square_size, offset_x, offset_y):
+        radius = height / 2
+        painter.drawImage(QRectF(
+            -radius * square_size + offset_x, -radius * square_size + offset_y,
+            height * square_size, height * square_size
+        ), image)
+
+    def paint_tiles(self, painter: QPainter, size: QSize, pyramid: TilePyramid, square_size, offset_x, offset_y):
+        """Paints the visible tiles of the level of the pyramid that has about one pixel per square on screen. Tiles
+        that aren't built yet are requested from the tile worker, and the overview is painted in their place."""
+        level = min(pyramid.overview_level, max(0, math.floor(math.log2(1 / square_size))))
+        # Position of the top left corner of the board and the size of one pixel of the level on screen
+        left = -pyramid.height / 2 * square_size + offset_x
+        top = -pyramid.height / 2 * square_size + offset_y
+        pixel_size = square_size * (1 << level)
+        if pyramid.overview is None:
+            self._tile_worker.request(pyramid)
+            if level == pyramid.overview_level:
+                return
+        if level == pyramid.overview_level:
+            self.paint_image(painter, pyramid.overview[0], pyramid.height, square_size, offset_x, offset_y)
+            return
+        tile_span = TILE_SIZE * pixel_size
+        count = pyramid.tile_count(level)
+        columns = range(max(0, math.floor(-left / tile_span)), min(count, math.ceil((size.width() - left) / tile_span)))
+        rows = range(max(0, math.floor(-top / tile_span)), min(count, math.ceil((size.height() - top) / tile_span)))
+        level_size = pyramid.level_size(level)
+        overview = pyramid.overview
+        for row in rows:
+            for column in columns:
+                tile = pyramid.tile((level, row, column))
+                width = min(TILE_SIZE, level_size - column * TILE_SIZE)
+                height = min(TILE_SIZE, level_size - row * TILE_SIZE)
+                target = QRectF(
+                    left + column * tile_span, top + row * tile_span, width * pixel_size, height * pixel_size
+                )
+                if tile is not None:
+                    painter.drawImage(target, tile)
+                    continue
+                self._tile_worker.request(pyramid, (level, row, column))
+                if overview is not None:
+                    scale = 1 << (pyramid.overview_level - level)
+                    painter.drawImage(target, overview[0], QRectF(
+                        column * TILE_SIZE / scale, row * TILE_SIZE / scale, width / scale, height / scale
+                    ))
+
+    def set_view(self, zoom, center: QPointF):
+        max_zoom = max(1.0, self.MAX_SQUARE_SIZE * self.board.height / max(self.base_square_size, 1))
+        self.zoom = min(max(zoom, 1.0), max_zoom)
+        radius = self.board.height / 2
+        self.view_center = QPointF(min(max(center.x(), -radius), radius), min(max(center.y(), -radius), radius))
+        self.update()
+
+    @Slot()
+    def resetView(self):
+        self.set_view(1.0, QPointF(0, 0))
+
+    def wheelEvent(self, event):
+        square_size, offset_x, offset_y = self.view_transform(self.size(), self.board.height)
+        position = event.pos()
+        # The point of the board under the cursor stays under the cursor
+        board_x = (position.x() - offset_x) / square_size
+        board_y = (position.y() - offset_y) / square_size
+        zoom = self.zoom * self.ZOOM_STEP ** (event.angleDelta().y() / 120)
+        new_square_size = self.base_square_size / self.board.height * zoom
+        self.set_view(zoom, QPointF(
+            board_x - (position.x() - self.width() // 2) / new_square_size,
+            board_y - (position.y() - self.height() // 2) / new_square_size
+        ))
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag_position = event.pos()
+
+    def mouseMoveEvent(self, event):
+        if self._drag_position is None:
+            return
+        square_size = self.base_square_size / self.board.height * self.zoom
+        position = event.pos()
+        self.set_view(self.zoom, QPointF(
+            self.view_center.x() - (position.x() - self._drag_position.x()) / square_size,
+            self.view_center.y() - (position.y() - self._drag_position.y()) / square_size
+        ))
+        self._drag_position = position
+
+    def mouseReleaseEvent(self, event):
+        self._drag_position = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.resetView()
 
     @Slot(bool)
     def setHoleBordersEnabled(self, value):
@@ -192,6 +510,12 @@ class AztecDiamondRenderer(QOpenGLWidget):
     @Slot(bool)
     def setCheckeboardEnabled(self, value):
         self.checkerboard_enabled = value
+        self.invalidate_raster()
+        self.repaint()
+
+    @Slot(bool)
+    def setRasterEnabled(self, value):
+        self.raster_enabled = value
         self.repaint()
 
     @Slot(bool)
@@ -0,0 +1,259 @@
+"""
+Offscreen export of the shuffle as an animation: a PNG sequence, an animated GIF or raw RGB24 video frames.
+
+Frames are painted by an ``AztecDiamondRenderer`` that is never shown, so they use the same colors, borders and arrows
+as the window. The calling thread runs the shuffle and paints frames into a bounded queue, and a writer thread encodes
+and writes them in the meantime; GIF frames are compressed by a pool of worker processes. A ``QApplication`` must exist
+before exporting (``python -m gui`` creates one with the offscreen platform, so no display is needed).
+"""
+import os
+import queue
+import sys
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Optional
+
+import numpy as np
+
+import board
+from .board_render import AztecDiamondRenderer
+from .tiles import image_from_pixels
+
+__all__ = ['export_animation', 'ANIMATION_FORMATS']
+
+ANIMATION_FORMATS = ('png', 'gif', 'raw')
+# The largest code of GIF's LZW compression, after which its code table is reset
+GIF_MAX_CODE = 4095
+# Frames compressed by GIF worker processes at once, per process
+GIF_FRAMES_PER_PROCESS = 2
+
+
+def animation_format_of(path) -> str:
+    """Guesses the format of an animation from its path: GIF and raw files by their extension, or a directory of PNG
+    files otherwise."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.gif':
+        return 'gif'
+    if extension in ('.rgb', '.raw') or path == '-':
+        return 'raw'
+    return 'png'
+
+
+class PngSequenceEncoder:
+    """Writes every frame as ``frame-NNNNN.png`` into a directory."""
+    def __init__(self, path, width, height, fps):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.count = 0
+
+    def write(self, pixels: np.ndarray):
+        image, _ = image_from_pixels(pixels)
+        frame_path = os.path.join(self.path, f'frame-{self.count:05}.png')
+        if not image.save(frame_path, 'PNG'):
+            raise OSError(f'Could not write {frame_path}')
+        self.count += 1
+
+    def close(self):
+        pass
+
+
+class RawVideoEncoder:
+    """Writes frames as consecutive raw RGB24 images to a file, or to stdout if the path is ``-``, which is the input
+    expected by ``ffmpeg -f rawvideo -pix_fmt rgb24 -s WIDTHxHEIGHT -r FPS -i PATH``."""
+    def __init__(self, path, width, height, fps):
+        self.file: BinaryIO = sys.stdout.buffer if path == '-' else open(path, 'wb')
+
+    def write(self, pixels: np.ndarray):
+        # Pixels are stored as B, G, R, A bytes on little-endian machines
+        channels = pixels.astype('<u4').view(np.uint8).reshape(*pixels.shape, 4)
+        self.file.write(np.ascontiguousarray(channels[..., 2::-1]).data)
+
+    def close(self):
+        self.file.flush()
+        if self.file is not sys.stdout.buffer:
+            self.file.close()
+
+
+def lzw_compress(indices: bytes, min_code_size) -> bytes:
+    """Compresses color indices with the variable-length LZW code of the GIF format."""
+    clear_code = 1 << min_code_size
+    output = bytearray()
+    buffer = buffer_bits = 0
+
+    def emit(code):
+        nonlocal buffer, buffer_bits
+        buffer |= code << buffer_bits
+        buffer_bits += code_size
+        while buffer_bits >= 8:
+            output.append(buffer & 0xFF)
+            buffer >>= 8
+            buffer_bits -= 8
+
+    code_size = min_code_size + 1
+    emit(clear_code)
+    codes = {}
+    next_code = clear_code + 2
+    prefix = indices[0]
+    for index in indices[1:]:
+        key = prefix << 8 | index
+        code = codes.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix)
+        codes[key] = next_code
+        next_code += 1
+        # The decoder adds every code one step later than this, so it reads codes that are one bit wider only after
+        # the first code that needs that bit has been added
+        if next_code > 1 << code_size and code_size < 12:
+            code_size += 1
+        if next_code > GIF_MAX_CODE:
+            emit(clear_code)
+            codes.clear()
+            next_code = clear_code + 2
+            code_size = min_code_size + 1
+        prefix = index
+    emit(prefix)
+    emit(clear_code + 1)
+    if buffer_bits:
+        output.append(buffer)
+    return bytes(output)
+
+
+def gif_frame(indices: bytes, palette: bytes, width, height, delay) -> bytes:
+    """Returns a complete GIF frame (graphic control extension, image descriptor, local color table and compressed
+    image data) for color indices into ``palette``, a string of up to 256 RGB triples. ``delay`` is in 1/100 s."""
+    table_bits = max(1, (len(palette) // 3 - 1).bit_length())
+    min_code_size = max(2, table_bits)
+    data = lzw_compress(indices, min_code_size)
+    frame = bytearray(b'\x21\xf9\x04\x00' + delay.to_bytes(2, 'little') + b'\x00\x00')
+    frame += b'\x2c' + bytes(4) + width.to_bytes(2, 'little') + height.to_bytes(2, 'little')
+    frame.append(0x80 | (table_bits - 1))
+    frame += palette.ljust(3 << table_bits, b'\x00')
+    frame.append(min_code_size)
+    for start in range(0, len(data), 255):
+        block = data[start:start + 255]
+        frame.append(len(block))
+        frame += block
+    frame.append(0)
+    return bytes(frame)
+
+
+class GifEncoder:
+    """Writes frames to a looping animated GIF. Every frame has its own color table, so frames with up to 256 colors
+    (which includes everything the renderer paints) are exact; others are reduced to 3-3-2 bit RGB. Frames are
+    compressed by ``processes`` worker processes and written in order."""
+    def __init__(self, path, width, height, fps, processes=None):
+        self.file = open(path, 'wb')
+        self.width = width
+        self.height = height
+        self.delay = max(1, round(100 / fps))
+        self.file.write(b'GIF89a' + width.to_bytes(2, 'little') + height.to_bytes(2, 'little') + b'\x00\x00\x00')
+        # Loop forever
+        self.file.write(b'\x21\xff\x0bNETSCAPE2.0\x03\x01\x00\x00\x00')
+        self.executor = ProcessPoolExecutor(max_workers=processes)
+        self.pending = deque()
+        self.max_pending = (processes or os.cpu_count() or 1) * GIF_FRAMES_PER_PROCESS
+
+    def write(self, pixels: np.ndarray):
+        colors, indices = np.unique(pixels & 0xFFFFFF, return_inverse=True)
+        if len(colors) > 256:
+            colors, indices = np.unique(pixels & 0xE0E0C0, return_inverse=True)
+        palette = np.ascontiguousarray(colors.astype('<u4').view(np.uint8).reshape(-1, 4)[:, 2::-1]).tobytes()
+        self.pending.append(self.executor.submit(
+            gif_frame, indices.astype(np.uint8).tobytes(), palette, self.width, self.height, self.delay
+        ))
+        while len(self.pending) > self.max_pending:
+            self.file.write(self.pending.popleft().result())
+
+    def close(self):
+        try:
+            while self.pending:
+                self.file.write(self.pending.popleft().result())
+            self.file.write(b'\x3b')
+        finally:
+            self.executor.shutdown()
+            self.file.close()
+
+
+def _write_frames(frames: queue.Queue, encoder, errors: list):
+    """Writes frames from the queue until it yields None. After an error, the remaining frames are discarded so that
+    the producer never blocks on a full queue."""
+    while True:
+        pixels = frames.get()
+        if pixels is None:
+            break
+        if not errors:
+            try:
+                encoder.write(pixels)
+            except Exception as error:
+                errors.append(error)
+    try:
+        encoder.close()
+    except Exception as error:
+        errors.append(error)
+
+
+def export_animation(
+    path, order, animation_format: Optional[str] = None, seed=None, width=800, height=800, fps=10, show_moves=False,
+    hole_borders=True, domino_borders=False, arrows=True, checkerboard=True, engine: board.Engine = board.ARRAY_ENGINE,
+    queue_size=8, processes=None, progress: Optional[Callable[[int, int], None]] = None
+) -> int:
+    """
+    Runs the shuffle from an empty board up to the given order and writes one frame per step to ``path``: a directory
+    of PNG files, a GIF file or a file of raw RGB24 frames (``-`` for stdout). The format is guessed from the path if
+    ``animation_format`` isn't given. If ``show_moves`` is True, every step also gets a frame after its dominoes have
+    moved and before its holes are filled. The board is fitted into frames of ``width`` x ``height`` pixels.
+
+    At most ``queue_size`` painted frames wait for the writer thread; ``processes`` is the number of processes that
+    compress GIF frames (by default, one per CPU). ``progress(steps_done, steps_total)`` is called after every step.
+    Returns the number of frames written.
+    """
+    if order < 1:
+        raise ValueError('The order of an Aztec Diamond must be at least 1.')
+    animation_format = animation_format or animation_format_of(path)
+    if animation_format == 'png':
+        encoder = PngSequenceEncoder(path, width, height, fps)
+    elif animation_format == 'gif':
+        encoder = GifEncoder(path, width, height, fps, processes)
+    elif animation_format == 'raw':
+        encoder = RawVideoEncoder(path, width, height, fps)
+    else:
+        raise ValueError(f'Unknown animation format: {animation_format}')
+    renderer = AztecDiamondRenderer()
+    renderer.hole_borders_enabled = hole_borders
+    renderer.domino_borders_enabled = domino_borders
+    renderer.domino_arrows_enabled = arrows
+    renderer.checkerboard_enabled = checkerboard
+    # Tiles are built in the background and may be missing when a frame is painted
+    renderer.tiles_enabled = False
+    renderer.board = board.Board(2, engine=engine, seed=seed, fill_strategy=board.ALL_GRAY)
+    renderer.board.reserve(order)
+    frames = queue.Queue(maxsize=queue_size)
+    errors = []
+    writer = threading.Thread(target=_write_frames, args=(frames, encoder, errors), name='animation writer')
+    writer.start()
+    count = 0
+    try:
+        for i in range(order):
+            if errors:
+                break
+            if i:
+                renderer.board.advance_magic()
+            renderer.holes = renderer.board.get_holes(as_array=True).tolist()
+            if show_moves and i:
+                frames.put(renderer.render_pixels(width, height))
+                count += 1
+            renderer.board.fill_holes(renderer.holes)
+            frames.put(renderer.render_pixels(width, height))
+            count += 1
+            if progress is not None:
+                progress(i + 1, order)
+    finally:
+        frames.put(None)
+        writer.join()
+        renderer.stop_tile_worker()
+    if errors:
+        raise errors[0]
+    return count
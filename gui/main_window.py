@@ -1,38 +1,74 @@
+import os
 from PySide2.QtWidgets import (
-    QWidget, QPushButton, QHBoxLayout, QVBoxLayout, QSizePolicy, QCheckBox, QLabel, QSpinBox, QProgressBar
+    QWidget, QPushButton, QHBoxLayout, QVBoxLayout, QSizePolicy, QCheckBox, QLabel, QSpinBox, QProgressBar, QSlider,
+    QFileDialog, QMessageBox
 )
-from PySide2.QtCore import Qt, Slot
+from PySide2.QtCore import Qt, Slot, QSettings, QStandardPaths, QTimer
 from .board_render import AztecDiamondRenderer
 
 
 class MainWindow(QWidget):
+    SKIP_AHEAD_TARGET_KEY = 'skip_ahead/target_order'
+    PROFILE_UPDATE_INTERVAL = 250  # ms
+    PROFILE_PHASES = (
+        ('generate_data', 'generate'), ('advance_magic', 'move'), ('get_holes', 'holes'), ('fill_holes', 'fill'),
+        ('paint_squares', 'squares'), ('paint_borders', 'borders'), ('paint_arrows', 'arrows')
+    )
+    PROFILE_COUNTERS = (
+        ('annihilated_pairs', 'pairs annihilated'), ('holes_filled', 'holes filled'),
+        ('squares_drawn', 'squares drawn')
+    )
+
     def __init__(self, parent=None):
         super().__init__(parent=parent)
         self.setWindowTitle('Magic Square Dance')
+        self.settings = QSettings('selplacei', 'magic-square-dance')
+        data_directory = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+        os.makedirs(data_directory, exist_ok=True)
+        self.checkpoint_path = os.path.join(data_directory, 'skip-ahead.msd')
 
         self.board_width_label = QLabel()
         self.hole_borders_toggle = QCheckBox('Show 2x2 hole borders')
         self.domino_borders_toggle = QCheckBox('Show domino borders')
         self.arrows_toggle = QCheckBox('Show domino direction')
         self.checkerboard_toggle = QCheckBox('Show checkerboard pattern')
+        self.raster_toggle = QCheckBox('Fast rendering\n(borders and arrows only\non large squares)')
+        self.profile_toggle = QCheckBox('Show time per phase')
+        self.profile_label = QLabel()
+        self.profile_timer = QTimer(self)
         self.skip_ahead_label = QLabel('Skip ahead by:')
         self.skip_ahead_spinbox = QSpinBox()
         self.skip_ahead_button = QPushButton('Go')
         self.skip_ahead_progressbar = QProgressBar()
+        self.skip_ahead_pause_button = QPushButton('Pause')
+        self.skip_ahead_cancel_button = QPushButton('Cancel')
+        self.skip_ahead_resume_button = QPushButton('Resume interrupted skip-ahead')
         self.next_step_button = QPushButton('Next step\n(move then fill)')
         self.advance_magic_button = QPushButton('Move dominoes\n(and expand the board)')
         self.fill_holes_button = QPushButton('Re-fill holes\n(press as many\ntimes as you like)')
+        self.history_label = QLabel()
+        self.history_slider = QSlider(Qt.Horizontal)
+        self.open_button = QPushButton('Open tiling...')
         self.renderer = AztecDiamondRenderer()
 
         self.set_displayed_board_width(2)
         for checkbox in (
-            self.hole_borders_toggle, self.arrows_toggle, self.checkerboard_toggle
+            self.hole_borders_toggle, self.arrows_toggle, self.checkerboard_toggle, self.raster_toggle
         ):
             checkbox.setChecked(True)
         self.skip_ahead_label.setBuddy(self.skip_ahead_spinbox)
+        self.skip_ahead_pause_button.setCheckable(True)
+        self.skip_ahead_pause_button.setEnabled(False)
+        self.skip_ahead_cancel_button.setEnabled(False)
+        self.skip_ahead_resume_button.setVisible(self.interrupted_skip_ahead_target() is not None)
         self.next_step_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.advance_magic_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.fill_holes_button.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.history_label.setBuddy(self.history_slider)
+        self.profile_label.setVisible(False)
+        self.profile_label.setTextInteractionFlags(Qt.TextSelectableByMouse)
+        self.profile_timer.setInterval(self.PROFILE_UPDATE_INTERVAL)
+        self.set_history_range(0, 1)
 
         layout = QHBoxLayout()
         right_widget = QWidget()
@@ -45,6 +81,8 @@ class MainWindow(QWidget):
         right_layout.addWidget(self.domino_borders_toggle)
         right_layout.addWidget(self.arrows_toggle)
         right_layout.addWidget(self.checkerboard_toggle)
+        right_layout.addWidget(self.raster_toggle)
+        right_layout.addWidget(self.profile_toggle)
         skipahead_layout.setContentsMargins(0, 0, 0, 0)
         skipahead_layout.addWidget(self.skip_ahead_label)
         skipahead_layout.addWidget(self.skip_ahead_spinbox)
@@ -55,18 +93,34 @@ class MainWindow(QWidget):
         skipahead_wrapper.layout().setContentsMargins(0, 0, 0, 0)
         skipahead_wrapper.layout().addWidget(skipahead_widget)
         skipahead_wrapper.layout().addWidget(self.skip_ahead_progressbar)
+        skipahead_controls_widget = QWidget()
+        skipahead_controls_widget.setLayout(QHBoxLayout())
+        skipahead_controls_widget.layout().setContentsMargins(0, 0, 0, 0)
+        skipahead_controls_widget.layout().addWidget(self.skip_ahead_pause_button)
+        skipahead_controls_widget.layout().addWidget(self.skip_ahead_cancel_button)
+        skipahead_wrapper.layout().addWidget(skipahead_controls_widget)
+        skipahead_wrapper.layout().addWidget(self.skip_ahead_resume_button)
         right_layout.addWidget(skipahead_wrapper)
         right_layout.addWidget(self.next_step_button)
         right_layout.addWidget(self.advance_magic_button)
         right_layout.addWidget(self.fill_holes_button)
+        right_layout.addWidget(self.history_label)
+        right_layout.addWidget(self.history_slider)
+        right_layout.addWidget(self.open_button)
         right_widget.setLayout(right_layout)
         layout.addWidget(right_widget)
-        self.setLayout(layout)
+        main_layout = QVBoxLayout()
+        main_layout.addLayout(layout)
+        main_layout.addWidget(self.profile_label)
+        self.setLayout(main_layout)
 
         self.hole_borders_toggle.stateChanged.connect(self.renderer.setHoleBordersEnabled)
         self.domino_borders_toggle.stateChanged.connect(self.renderer.setDominoBordersEnabled)
         self.checkerboard_toggle.stateChanged.connect(self.renderer.setCheckeboardEnabled)
         self.arrows_toggle.stateChanged.connect(self.renderer.setDominoArrowsEnabled)
+        self.raster_toggle.stateChanged.connect(self.renderer.setRasterEnabled)
+        self.profile_toggle.toggled.connect(self.set_profiling_enabled)
+        self.profile_timer.timeout.connect(self.update_profile_label)
         self.next_step_button.clicked.connect(
             lambda: (self.renderer.advance_magic(repaint=False), self.renderer.fill_holes())
         )
@@ -75,13 +129,23 @@ class MainWindow(QWidget):
         self.fill_holes_button.clicked.connect(self.renderer.fill_holes)
         self.skip_ahead_button.clicked.connect(self.disable_buttons)
         self.skip_ahead_button.clicked.connect(
-            lambda: self.renderer.skip_ahead(self.skip_ahead_spinbox.value())
+            lambda: self.renderer.skip_ahead(self.skip_ahead_spinbox.value(), self.checkpoint_path)
         )
-        self.skip_ahead_button.clicked.connect(
-            lambda: self.skip_ahead_progressbar.setMaximum(max(self.skip_ahead_spinbox.value(), 2) - 1)
+        self.skip_ahead_resume_button.clicked.connect(self.disable_buttons)
+        self.skip_ahead_resume_button.clicked.connect(
+            lambda: self.renderer.resume_skip_ahead(self.checkpoint_path, self.interrupted_skip_ahead_target())
+        )
+        self.skip_ahead_pause_button.toggled.connect(self.renderer.set_skip_ahead_paused)
+        self.skip_ahead_pause_button.toggled.connect(
+            lambda paused: self.skip_ahead_pause_button.setText('Resume' if paused else 'Pause')
         )
+        self.skip_ahead_cancel_button.clicked.connect(lambda: self.skip_ahead_pause_button.setChecked(False))
+        self.skip_ahead_cancel_button.clicked.connect(self.renderer.cancel_skip_ahead)
+        self.renderer.skipaheadStarted.connect(lambda total: self.skip_ahead_progressbar.setMaximum(max(total, 1)))
+        self.renderer.skipaheadStarted.connect(self.on_skip_ahead_started)
         self.renderer.skipaheadProgress.connect(self.skip_ahead_progressbar.setValue)
         self.renderer.skipaheadComplete.connect(self.skip_ahead_progressbar.reset)
+        self.renderer.skipaheadComplete.connect(self.on_skip_ahead_complete)
         self.renderer.skipaheadComplete.connect(self.enable_buttons)
         self.advance_magic_button.clicked.connect(lambda: self.next_step_button.setEnabled(False))
         self.advance_magic_button.clicked.connect(lambda: self.advance_magic_button.setEnabled(False))
@@ -89,18 +153,101 @@ class MainWindow(QWidget):
         self.fill_holes_button.clicked.connect(lambda: self.next_step_button.setEnabled(True))
         self.fill_holes_button.clicked.connect(lambda: self.advance_magic_button.setEnabled(True))
         self.fill_holes_button.clicked.connect(lambda: self.skip_ahead_button.setEnabled(True))
+        self.history_slider.valueChanged.connect(self.show_history_step)
+        self.open_button.clicked.connect(lambda: self.open_board())
+        self.renderer.historyChanged.connect(self.set_history_range)
         self.renderer.boardChanged.connect(self.adjustSize())
-        self.renderer.boardChanged.connect(lambda _: self.set_displayed_board_width(len(self.renderer.board.data)))
+        self.renderer.boardChanged.connect(lambda _: self.set_displayed_board_width(self.renderer.board.height))
 
     @Slot()
     def disable_buttons(self):
         for button in self.skip_ahead_button, self.next_step_button, self.advance_magic_button, self.fill_holes_button:
             button.setEnabled(False)
+        self.history_slider.setEnabled(False)
+        self.open_button.setEnabled(False)
 
     @Slot()
     def enable_buttons(self):
         for button in self.skip_ahead_button, self.next_step_button, self.advance_magic_button, self.fill_holes_button:
             button.setEnabled(True)
+        self.history_slider.setEnabled(True)
+        self.open_button.setEnabled(True)
+
+    @Slot(bool)
+    def set_profiling_enabled(self, enabled):
+        profile = self.renderer.profile
+        profile.reset()
+        profile.enabled = enabled
+        self.profile_label.setVisible(enabled)
+        if enabled:
+            self.update_profile_label()
+            self.profile_timer.start()
+        else:
+            self.profile_timer.stop()
+
+    @Slot()
+    def update_profile_label(self):
+        """Shows the duration of the latest call of each phase, and the counters since profiling was enabled."""
+        # A skip-ahead updates the profile from its worker thread in the meantime
+        snapshot = self.renderer.profile.snapshot()
+        last, counters = snapshot['last'], snapshot['counters']
+        phases = ', '.join(f'{name} {last[phase] * 1000:.1f}' for phase, name in self.PROFILE_PHASES if phase in last)
+        counters = ', '.join(f'{counters.get(counter, 0)} {name}' for counter, name in self.PROFILE_COUNTERS)
+        self.profile_label.setText(f'ms per phase: {phases or "-"}  |  {counters}')
+
+    @Slot(int)
+    def show_history_step(self, index):
+        self.renderer.show_step(index)
+        self.update_step_buttons()
+
+    @Slot()
+    def open_board(self):
+        """Asks for a tiling saved in the ``.msd`` format (for example by ``python -m board``) and shows it."""
+        path, _ = QFileDialog.getOpenFileName(self, 'Open tiling', '', 'Tilings (*.msd);;All files (*)')
+        if not path:
+            return
+        try:
+            self.renderer.load_board(path)
+        except (OSError, ValueError) as error:
+            QMessageBox.warning(self, 'Open tiling', f'Could not open {path}: {error}')
+            return
+        self.update_step_buttons()
+
+    def update_step_buttons(self):
+        # A board whose dominoes were moved must have its holes filled before the next step
+        holes_left = bool(self.renderer.board.get_holes())
+        for button in self.skip_ahead_button, self.next_step_button, self.advance_magic_button:
+            button.setEnabled(not holes_left)
+        self.fill_holes_button.setEnabled(True)
+
+    @Slot(int, int)
+    def set_history_range(self, position, length):
+        # Only moving the slider by hand shows a step from the history
+        self.history_slider.blockSignals(True)
+        self.history_slider.setMaximum(length - 1)
+        self.history_slider.setValue(position)
+        self.history_slider.blockSignals(False)
+        self.history_label.setText(f'History: step {position + 1} of {length}')
+
+    def interrupted_skip_ahead_target(self):
+        """Returns the target order of a skip-ahead that left a checkpoint behind, or None if there isn't one."""
+        target_order = self.settings.value(self.SKIP_AHEAD_TARGET_KEY)
+        if target_order is None or not os.path.exists(self.checkpoint_path):
+            return None
+        return int(target_order)
+
+    @Slot(int)
+    def on_skip_ahead_started(self, _):
+        self.settings.setValue(self.SKIP_AHEAD_TARGET_KEY, self.renderer.job.target_order)
+        self.skip_ahead_resume_button.setVisible(False)
+        self.skip_ahead_pause_button.setEnabled(True)
+        self.skip_ahead_cancel_button.setEnabled(True)
+
+    @Slot()
+    def on_skip_ahead_complete(self):
+        self.settings.remove(self.SKIP_AHEAD_TARGET_KEY)
+        self.skip_ahead_pause_button.setEnabled(False)
+        self.skip_ahead_cancel_button.setEnabled(False)
 
     @Slot(int)
     def set_displayed_board_width(self, n):
@@ -0,0 +1,211 @@
+"""
+Tiled image pyramid of a board's square colors, for viewing boards that are far larger than the screen.
+
+Level L of the pyramid is the raster image of the board (one pixel per square) downsampled by 2 ** L, where every
+pixel is the average color of its squares. The coarsest level used, the overview, is at most ``MAX_OVERVIEW_SIZE``
+pixels across and is always kept whole. Finer levels are split into ``TILE_SIZE`` x ``TILE_SIZE`` tiles, which are
+built on demand and kept in a bounded cache. All images are built from the board's cached color array, never from the
+board itself, so they can be built on a worker thread while the board changes.
+"""
+import math
+import queue
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from PySide2.QtCore import QObject, Signal, Slot
+from PySide2.QtGui import QImage
+
+import board
+
+__all__ = ['TilePyramid', 'TileWorker', 'TILE_SIZE']
+
+TILE_SIZE = 256
+MAX_OVERVIEW_SIZE = 2048
+# Memory for cached tiles is bounded by this many tiles (256 KiB each)
+MAX_CACHED_TILES = 512
+# Rows of squares processed at once when downsampling, which bounds temporary memory
+STRIP_SQUARES = 1 << 22
+
+
+def raster_pixels(colors: np.ndarray, color_table: np.ndarray, checkerboard, y0, x0) -> np.ndarray:
+    """Returns the pixels (as uint32 premultiplied ARGB) of the given squares with one pixel per square. ``y0`` and
+    ``x0`` are the array indices of ``colors[0, 0]``, which determine the checkerboard pattern."""
+    if checkerboard:
+        ys, xs = np.ogrid[y0:y0 + colors.shape[0], x0:x0 + colors.shape[1]]
+        parities = (xs + ys) % 2
+    else:
+        parities = board.BLACK
+    return np.ascontiguousarray(color_table[parities, colors.view(np.uint8)])
+
+
+# Index of every square color in the tables built by block_colors()
+COLOR_CODES = np.zeros(256, dtype=np.uint16)
+COLOR_CODES[np.array([board.NO_COLOR, board.GRAY, board.RED, board.YELLOW, board.GREEN, board.BLUE], dtype=np.int8)
+            .view(np.uint8)] = np.arange(6)
+
+
+def block_colors(color_table: np.ndarray, checkerboard) -> np.ndarray:
+    """Returns the average color (as uint32 premultiplied ARGB) of every possible 2x2 block of squares whose top left
+    square is at even array indices, indexed by the ``COLOR_CODES`` of its squares in base 6 (top left, top right,
+    bottom left, bottom right). Averaging premultiplied values blends the transparent squares outside of the board
+    correctly."""
+    values = np.array([board.NO_COLOR, board.GRAY, board.RED, board.YELLOW, board.GREEN, board.BLUE], dtype=np.int8)
+    blocks = np.stack(np.meshgrid(*[values.view(np.uint8)] * 4, indexing='ij'), axis=-1).reshape(-1, 4)
+    parities = np.array([0, 1, 1, 0]) if checkerboard else board.BLACK
+    channels = color_table[parities, blocks].view(np.uint8).reshape(-1, 4, 4).astype(np.uint16)
+    return np.ascontiguousarray(((channels.sum(axis=1) + 2) // 4).astype(np.uint8)).view(np.uint32)[:, 0]
+
+
+def downsample(colors: np.ndarray, block_table: np.ndarray, factor, pixel_y0, pixel_x0, rows, columns):
+    """Returns pixels (as uint32 premultiplied ARGB) ``pixel_y0`` to ``pixel_y0 + rows - 1`` and ``pixel_x0`` to
+    ``pixel_x0 + columns - 1`` of the raster image of ``colors`` downsampled by ``factor``, a power of two of at least
+    2. ``block_table`` is the result of ``block_colors()``. Squares beyond the edge of the board count as NO_COLOR."""
+    pixels = np.empty((rows, columns), dtype=np.uint32)
+    rows_per_strip = max(1, STRIP_SQUARES // (columns * factor * factor))
+    for strip in range(0, rows, rows_per_strip):
+        strip_rows = min(rows_per_strip, rows - strip)
+        y0 = (pixel_y0 + strip) * factor
+        x0 = pixel_x0 * factor
+        region = np.full((strip_rows * factor, columns * factor), board.NO_COLOR, dtype=np.int8)
+        source = colors[y0:y0 + len(region), x0:x0 + region.shape[1]]
+        region[:source.shape[0], :source.shape[1]] = source
+        codes = COLOR_CODES[region.view(np.uint8)]
+        # The first halving looks up whole 2x2 blocks at once
+        blocks = block_table[((codes[::2, ::2] * 6 + codes[::2, 1::2]) * 6 + codes[1::2, ::2]) * 6 + codes[1::2, 1::2]]
+        channels = blocks.view(np.uint8).reshape(*blocks.shape, 4).astype(np.uint16)
+        size = factor // 2
+        while size > 1:
+            # Halving repeatedly keeps the sums of 4 bytes within 16 bits
+            channels = channels.reshape(channels.shape[0] // 2, 2, channels.shape[1] // 2, 2, 4).sum(axis=(1, 3))
+            channels = (channels + 2) // 4
+            size //= 2
+        pixels[strip:strip + strip_rows] = np.ascontiguousarray(channels.astype(np.uint8)).view(np.uint32)[..., 0]
+    return pixels
+
+
+def image_from_pixels(pixels: np.ndarray) -> Tuple[QImage, np.ndarray]:
+    """Returns a QImage that uses the given pixels without copying them, and the pixels, which must be kept alive
+    together with the image."""
+    pixels = np.ascontiguousarray(pixels)
+    image = QImage(
+        pixels.data, pixels.shape[1], pixels.shape[0], pixels.shape[1] * 4, QImage.Format_ARGB32_Premultiplied
+    )
+    return image, pixels
+
+
+class TilePyramid:
+    """
+    Images of one color array (``Board.square_colors()``) at every level of detail. Building is thread-safe: results
+    are only stored if the pyramid hasn't been updated to a newer color array in the meantime.
+    """
+    def __init__(self, colors: np.ndarray, color_table: np.ndarray, checkerboard):
+        self.colors = colors
+        self.color_table = color_table
+        self.checkerboard = checkerboard
+        self.block_table = block_colors(color_table, checkerboard)
+        self.height = len(colors)
+        self.overview_level = max(0, math.ceil(math.log2(max(1, self.height / MAX_OVERVIEW_SIZE))))
+        self.generation = 0
+        self.overview: Optional[Tuple[QImage, np.ndarray]] = None
+        self.tiles: Dict[Tuple[int, int, int], Tuple[QImage, np.ndarray]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def level_size(self, level) -> int:
+        """Returns the width and height in pixels of the image at the given level."""
+        return -(-self.height // (1 << level))
+
+    def tile_count(self, level) -> int:
+        return -(-self.level_size(level) // TILE_SIZE)
+
+    def pixels(self, level, pixel_y0, pixel_x0, rows, columns) -> np.ndarray:
+        """Returns a part of the image at the given level as uint32 premultiplied ARGB pixels."""
+        if level == 0:
+            colors = self.colors[pixel_y0:pixel_y0 + rows, pixel_x0:pixel_x0 + columns]
+            return raster_pixels(colors, self.color_table, self.checkerboard, pixel_y0, pixel_x0)
+        return downsample(self.colors, self.block_table, 1 << level, pixel_y0, pixel_x0, rows, columns)
+
+    def build_overview(self, generation):
+        size = self.level_size(self.overview_level)
+        pixels = self.pixels(self.overview_level, 0, 0, size, size)
+        with self._lock:
+            if generation == self.generation:
+                self.overview = image_from_pixels(pixels)
+
+    def build_tile(self, key, generation):
+        level, row, column = key
+        size = self.level_size(level)
+        pixels = self.pixels(
+            level, row * TILE_SIZE, column * TILE_SIZE,
+            min(TILE_SIZE, size - row * TILE_SIZE), min(TILE_SIZE, size - column * TILE_SIZE)
+        )
+        with self._lock:
+            if generation == self.generation:
+                self.tiles[key] = image_from_pixels(pixels)
+                while len(self.tiles) > MAX_CACHED_TILES:
+                    self.tiles.popitem(last=False)
+
+    def tile(self, key) -> Optional[QImage]:
+        """Returns a cached tile, or None if it hasn't been built."""
+        with self._lock:
+            tile = self.tiles.get(key)
+            if tile is None:
+                return None
+            self.tiles.move_to_end(key)
+            return tile[0]
+
+    def update(self, colors: np.ndarray, squares: Iterable[Tuple[int, int]]):
+        """Switches to a new color array that only differs from the current one inside the 2x2 areas whose top left
+        corners are given (as returned by ``Board.get_holes()``). The overview is updated right away, and tiles that
+        contain changed squares are dropped so that they're rebuilt when they're needed."""
+        corners = np.asarray(squares, dtype=np.intp).reshape(-1, 2) + self.height // 2
+        changed = np.concatenate([corners + offset for offset in ((0, 0), (1, 0), (0, 1), (1, 1))])
+        with self._lock:
+            self.colors = colors
+            self.generation += 1
+            for level in range(self.overview_level):
+                for row, column in set(map(tuple, (changed[:, ::-1] >> level) // TILE_SIZE)):
+                    self.tiles.pop((level, row, column), None)
+            if self.overview is None or not len(changed):
+                return
+            pixels = self.overview[1]
+            for pixel_y, pixel_x in set(map(tuple, changed[:, ::-1] >> self.overview_level)):
+                pixels[pixel_y, pixel_x] = self.pixels(self.overview_level, pixel_y, pixel_x, 1, 1)[0, 0]
+
+
+class TileWorker(QObject):
+    """Builds overviews and tiles requested with ``request()`` on the thread this object lives on."""
+    built = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent=parent)
+        self._requests = queue.Queue()
+        self._pending = set()
+
+    def request(self, pyramid: TilePyramid, key=None):
+        """Queues the overview of the pyramid (if ``key`` is None) or one of its tiles. Duplicate requests for the same
+        pyramid generation are ignored."""
+        request = (id(pyramid), pyramid.generation, key)
+        if request in self._pending:
+            return
+        self._pending.add(request)
+        self._requests.put((pyramid, pyramid.generation, key))
+
+    def stop(self):
+        self._requests.put(None)
+
+    @Slot()
+    def run(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                return
+            pyramid, generation, key = request
+            if generation == pyramid.generation:
+                if key is None:
+                    pyramid.build_overview(generation)
+                else:
+                    pyramid.build_tile(key, generation)
+                self.built.emit()
+            self._pending.discard((id(pyramid), generation, key))
@@ -0,0 +1,44 @@
+import json
+
+from benchmarks.__main__ import main
+from benchmarks.suite import compare_results
+
+OPTIONS = ['--orders', '2', '4', '--engines', 'array', 'packed', '--repeat', '1', '--no-paint']
+OPERATIONS = {'generate_data', 'skip_ahead', 'advance_magic', 'get_holes', 'fill_holes'}
+
+
+def test_update_baseline_then_compare(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    options = OPTIONS + ['--baseline', str(baseline)]
+    assert main(options + ['--update-baseline']) == 0
+    stored = json.loads(baseline.read_text())
+    assert {(r['engine'], r['order'], r['operation']) for r in stored['results']} == {
+        (engine, order, operation) for engine in ('array', 'packed') for order in (2, 4) for operation in OPERATIONS
+    }
+    # Tiny boards take microseconds, so only a generous threshold is stable
+    assert main(options + ['--threshold', '1000']) == 0
+    for result in stored['results']:
+        result['seconds'] = 1e-12
+    baseline.write_text(json.dumps(stored))
+    assert main(options) == 1
+
+
+def test_run_without_baseline(tmp_path):
+    output = tmp_path / 'results.json'
+    assert main(OPTIONS + ['--baseline', str(tmp_path / 'missing.json'), '--output', str(output)]) == 0
+    assert len(json.loads(output.read_text())['results']) == 2 * 2 * len(OPERATIONS)
+
+
+def test_compare_results_ignores_missing_measurements():
+    def results(*measurements):
+        return {'results': [
+            {'engine': 'array', 'order': order, 'operation': 'get_holes', 'seconds': seconds, 'peak_bytes': peak}
+            for order, seconds, peak in measurements
+        ]}
+
+    baseline = results((16, 1.0, 100), (32, 2.0, 200))
+    assert compare_results(results((16, 1.2, 100), (64, 9.0, 900)), baseline, 0.25) == []
+    regressions = compare_results(results((16, 1.3, 100), (32, 2.0, 300)), baseline, 0.25)
+    assert len(regressions) == 2
+    assert 'seconds' in regressions[0] and 'order 16' in regressions[0]
+    assert 'peak_bytes' in regressions[1] and 'order 32' in regressions[1]
@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+import board
+from board.__main__ import main
+from board.rng import sample_seed
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def expected_tiling(order, seed, index, engine=board.ARRAY_ENGINE):
+    return board.sample_tiling(order, seed=sample_seed(seed, index), engine=engine)
+
+
+def test_runs_without_qt():
+    # Importing PySide2 (or the gui package, which needs it) fails in this interpreter
+    script = (
+        "import sys; sys.modules['PySide2'] = None; from board.__main__ import main; "
+        "main(['4', '--seed', '1', '--quiet']); "
+        "assert 'gui' not in sys.modules"
+    )
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.endswith(board.format_tiling(expected_tiling(4, 1, 0)))
+
+
+def test_text_output_matches_sample_tiling(capsys):
+    main(['5', '--seed', '7', '--count', '2', '--quiet'])
+    output = capsys.readouterr().out
+    expected = ''
+    for i in range(2):
+        tiling = expected_tiling(5, 7, i)
+        expected += f'# order=5 index={i} seed={tiling.seed} polarity={tiling.polarity} step={tiling.step}\n'
+        expected += board.format_tiling(tiling)
+    assert output == expected
+
+
+@pytest.mark.parametrize('options', [[], ['--batch-size', '2'], ['--processes', '2'], ['--engine', 'packed']])
+def test_msd_files_match_sample_tiling(tmp_path, options):
+    main(['6', '--seed', '3', '--count', '3', '--format', 'msd', '--output-dir', str(tmp_path), '--quiet'] + options)
+    for i in range(3):
+        loaded = board.load_board(str(tmp_path / f'tiling-6-3-{i}.msd'))
+        expected = expected_tiling(6, 3, i)
+        assert np.array_equal(loaded.to_array(), expected.to_array())
+        assert (loaded.seed, loaded.polarity, loaded.step) == (expected.seed, expected.polarity, expected.step)
+
+
+def test_npy_output_and_statistics(tmp_path):
+    stats_path = str(tmp_path / 'stats.npz')
+    main(['4', '--seed', '2', '--count', '3', '--format', 'npy', '--output-dir', str(tmp_path), '--stats',
+          stats_path, '--quiet'])
+    statistics = board.TilingStatistics.load(stats_path)
+    assert statistics.samples == 3
+    expected = board.TilingStatistics(4)
+    for i in range(3):
+        array = np.load(str(tmp_path / f'tiling-4-2-{i}.npy'))
+        assert np.array_equal(array, expected_tiling(4, 2, i).to_array())
+        expected.add_array(array)
+    assert np.array_equal(statistics.counts, expected.counts)
+
+
+@pytest.mark.parametrize('arguments', [
+    ['0'], ['4', '--count', '-1'], ['4', '--format', 'npy'], ['4', '--batch-size', '0'], ['4', '--seed', '-1'],
+    ['4', '--bands', '2', '--profile', '-']
+])
+def test_invalid_arguments(arguments, capsys):
+    with pytest.raises(SystemExit) as error:
+        main(arguments)
+    assert error.value.code == 2
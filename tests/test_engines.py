@@ -0,0 +1,160 @@
+import numpy as np
+import pytest
+
+import board
+
+ENGINES = [board.DICT_ENGINE, board.ARRAY_ENGINE, board.PACKED_ENGINE]
+SEEDS = [0, 1, 2 ** 64 - 1]
+
+
+def shuffle_steps(engine, seed, order, reserve):
+    """Yields (holes, board) after every step of the shuffle up to the given order."""
+    b = board.Board(2, engine=engine, seed=seed, fill_strategy=board.ALL_GRAY)
+    if reserve:
+        b.reserve(order)
+    for i in range(order):
+        if i:
+            b.advance_magic()
+        holes = b.get_holes(as_array=True)
+        b.fill_holes(holes)
+        yield holes, b
+
+
+@pytest.mark.parametrize('seed', SEEDS)
+@pytest.mark.parametrize('order', [1, 2, 7, 24])
+@pytest.mark.parametrize('reserve', [False, True])
+def test_engines_match_step_by_step(seed, order, reserve):
+    runs = [shuffle_steps(engine, seed, order, reserve) for engine in ENGINES]
+    for step, results in enumerate(zip(*runs)):
+        (expected_holes, expected), *others = results
+        for holes, other in others:
+            assert np.array_equal(holes, expected_holes), f'holes differ at step {step} on engine {other.engine}'
+            assert np.array_equal(other.to_array(), expected.to_array()), f'board differs at step {step}'
+            assert (other.polarity, other.step, other.height) == (expected.polarity, expected.step, expected.height)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_advance_magic_matches_dict_engine(engine):
+    # A filled board that wasn't produced by the engine under test
+    start = next(b for i, (_, b) in enumerate(shuffle_steps(board.DICT_ENGINE, 5, 12, False)) if i == 11)
+    expected = start.convert(board.DICT_ENGINE)
+    other = start.convert(engine)
+    for _ in range(3):
+        expected.advance_magic()
+        other.advance_magic()
+        assert np.array_equal(other.to_array(), expected.to_array())
+        holes = expected.get_holes()
+        assert other.get_holes() == holes
+        expected.fill_holes(holes)
+        other.fill_holes(holes)
+        assert np.array_equal(other.to_array(), expected.to_array())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('height', [2, 4, 6, 8])
+def test_generate_data_matches_dict_engine(engine, height):
+    for fill_strategy in (board.ALL_GRAY, board.HORIZONTAL):
+        expected = board.Board(height, fill_strategy=fill_strategy)
+        other = board.Board(height, engine=engine, fill_strategy=fill_strategy)
+        assert np.array_equal(other.to_array(), expected.to_array())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_reserve_grows_in_place(engine):
+    b = board.Board(2, engine=engine, seed=3, fill_strategy=board.ALL_GRAY)
+    b.reserve(10)
+    b.fill_holes(b.get_holes(as_array=True))
+    for _ in range(9):
+        b.advance_magic()
+        b.fill_holes(b.get_holes(as_array=True))
+    assert b.height == 20
+    # Growing beyond the reserved order falls back to allocating a new board
+    b.advance_magic()
+    b.fill_holes(b.get_holes(as_array=True))
+    expected = board.sample_tiling(11, seed=3, engine=board.DICT_ENGINE)
+    assert np.array_equal(b.to_array(), expected.to_array())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_filled_board_has_no_holes(engine):
+    b = board.sample_tiling(16, seed=9, engine=engine)
+    assert len(b.get_holes()) == 0
+    colors = b.square_colors()
+    assert np.count_nonzero(colors == board.GRAY) == 0
+    assert np.count_nonzero(colors != board.NO_COLOR) == np.count_nonzero(board.diamond_mask(b.height))
+
+
+def reference_square_colors(b):
+    radius = b.height // 2
+    return np.array([[b.get_square_color(x, y) for x in range(-radius, radius)] for y in range(-radius, radius)])
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_square_colors_match_get_square_color(engine):
+    for _, b in shuffle_steps(engine, 4, 8, False):
+        assert np.array_equal(b.square_colors(), reference_square_colors(b))
+        # Before the holes are filled
+        advanced = b.convert(engine)
+        advanced.advance_magic()
+        assert np.array_equal(advanced.square_colors(), reference_square_colors(advanced))
+
+
+@pytest.mark.parametrize('order', [59, 60])
+def test_hole_mask_matches_sorted_gray_squares(order):
+    # Boards large enough to have runs of more than two gray squares on a diagonal
+    advanced = []
+    for seed in SEEDS:
+        b = board.sample_tiling(order, seed=seed)
+        b.advance_magic()
+        advanced.append(b.to_array())
+    is_gray = np.stack(advanced) == board.GRAY
+    radius = order + 1
+    expected = []
+    for k, gray in enumerate(is_gray):
+        ys, xs = np.nonzero(gray)
+        holes = board.holes_from_gray_squares(xs - radius, ys - radius, len(gray))
+        assert np.array_equal(board.holes_from_gray_mask(gray), holes)
+        expected.append(np.column_stack((np.full(len(holes), k), holes)))
+    assert np.array_equal(board.holes_from_gray_mask(is_gray), np.concatenate(expected))
+
+
+BATCH_SEEDS = [0, 7, 12345, 2 ** 64 - 1]
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+@pytest.mark.parametrize('order', [1, 6, 13])
+def test_batch_boards_match_sample_tiling(engine, order):
+    batch = board.sample_tiling_batch(order, BATCH_SEEDS)
+    for k, seed in enumerate(BATCH_SEEDS):
+        expected = board.sample_tiling(order, seed=seed, engine=engine)
+        b = batch.board(k, engine)
+        assert b.engine == engine
+        assert np.array_equal(b.to_array(), expected.to_array())
+        assert (b.polarity, b.step, b.seed) == (expected.polarity, expected.step, seed)
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_batch_boards_continue_like_the_batch(engine):
+    batch = board.sample_tiling_batch(8, BATCH_SEEDS)
+    boards = batch.boards(engine)
+    for k, b in enumerate(boards):
+        assert (b.engine, b.polarity, b.step, b.seed) == (engine, batch.polarity, batch.step, BATCH_SEEDS[k])
+    # The split boards only stay in step with the batch if polarity, step and seed carried over
+    for _ in range(3):
+        batch.advance_magic()
+        batch.fill_holes(batch.get_holes())
+        for k, b in enumerate(boards):
+            b.advance_magic()
+            b.fill_holes(b.get_holes(as_array=True))
+            assert np.array_equal(b.to_array(), batch.data[k])
+
+
+def test_batch_grows_beyond_reserved_order():
+    batch = board.BoardBatch(BATCH_SEEDS)
+    batch.reserve(4)
+    for i in range(9):
+        if i:
+            batch.advance_magic()
+        batch.fill_holes(batch.get_holes())
+    for k, seed in enumerate(BATCH_SEEDS):
+        assert np.array_equal(batch.data[k], board.sample_tiling(9, seed=seed).to_array())
@@ -0,0 +1,105 @@
+import io
+
+import numpy as np
+import pytest
+
+import board
+from board.fileformat import HEADER
+
+
+def advanced_board(order, seed):
+    """A board that was advanced without filling its holes, so it still has gray squares."""
+    b = board.sample_tiling(order - 1, seed=seed)
+    b.advance_magic()
+    assert np.count_nonzero(b.to_array() == board.GRAY) > 0
+    return b
+
+
+def saved(tmp_path, b):
+    path = str(tmp_path / 'board.msd')
+    board.save_board(b, path)
+    return board.open_tiling(path)
+
+
+def assert_same_board(loaded, expected):
+    assert loaded.height == expected.height
+    assert np.array_equal(loaded.to_array(), expected.to_array())
+    assert (loaded.polarity, loaded.seed, loaded.step) == (expected.polarity, expected.seed, expected.step)
+
+
+@pytest.mark.parametrize('order', [2, 5, 8])
+@pytest.mark.parametrize('filled', [True, False])
+def test_rows_match_to_array(tmp_path, order, filled):
+    b = board.sample_tiling(order, seed=order) if filled else advanced_board(order, seed=order)
+    tiling = saved(tmp_path, b)
+    assert tiling.bits_per_square == (2 if filled else 3)
+    assert (tiling.order, tiling.polarity, tiling.seed, tiling.step) == (order, b.polarity, b.seed, b.step)
+    expected = b.to_array()
+    assert np.array_equal(tiling.to_array(), expected)
+    for start in range(-order, order):
+        assert np.array_equal(tiling.row(start), expected[start + order])
+        for stop in range(start, order + 1):
+            assert np.array_equal(tiling.rows(start, stop), expected[start + order:stop + order])
+
+
+@pytest.mark.parametrize('order', [3, 4])
+def test_rows_outside_the_board(tmp_path, order):
+    b = board.sample_tiling(order, seed=2)
+    tiling = saved(tmp_path, b)
+    height = 2 * order
+    expected = b.to_array()
+    # Partly outside
+    rows = tiling.rows(-order - 2, -order + 1)
+    assert rows.shape == (3, height)
+    assert np.all(rows[:2] == board.NO_COLOR) and np.array_equal(rows[2], expected[0])
+    rows = tiling.rows(order - 1, order + 3)
+    assert rows.shape == (4, height)
+    assert np.array_equal(rows[0], expected[-1]) and np.all(rows[1:] == board.NO_COLOR)
+    # Fully outside
+    assert np.all(tiling.rows(order, order + 2) == board.NO_COLOR)
+    assert np.all(tiling.rows(-order - 5, -order) == board.NO_COLOR)
+    assert np.all(tiling.row(-order - 1) == board.NO_COLOR)
+    # Empty
+    assert tiling.rows(0, 0).shape == (0, height)
+    assert tiling.rows(2, 1).shape == (0, height)
+
+
+@pytest.mark.parametrize('engine', [board.DICT_ENGINE, board.ARRAY_ENGINE, board.PACKED_ENGINE])
+@pytest.mark.parametrize('filled', [True, False])
+def test_round_trip(tmp_path, engine, filled):
+    b = board.sample_tiling(7, seed=6, engine=engine) if filled else advanced_board(7, seed=6).convert(engine)
+    tiling = saved(tmp_path, b)
+    loaded = tiling.to_board(engine)
+    assert loaded.engine == engine
+    assert_same_board(loaded, b)
+    assert_same_board(board.load_board(str(tmp_path / 'board.msd')), b)
+    stream = io.BytesIO()
+    board.write_board(b, stream)
+    assert stream.getvalue() == open(str(tmp_path / 'board.msd'), 'rb').read()
+    stream.seek(0)
+    assert_same_board(board.read_board(stream, engine), b)
+
+
+def test_board_without_seed(tmp_path):
+    b = board.Board(4, fill_strategy=board.HORIZONTAL)
+    assert b.seed is None
+    assert_same_board(saved(tmp_path, b).to_board(), b)
+
+
+def test_invalid_streams():
+    stream = io.BytesIO()
+    board.write_board(board.sample_tiling(6, seed=1), stream)
+    data = stream.getvalue()
+    with pytest.raises(ValueError):
+        board.read_board(io.BytesIO(data[:-1]))
+    with pytest.raises(ValueError):
+        board.read_board(io.BytesIO(data[:HEADER.size - 1]))
+    with pytest.raises(ValueError):
+        board.read_board(io.BytesIO(b'XXXX' + data[4:]))
+
+
+def test_invalid_file(tmp_path):
+    path = tmp_path / 'board.msd'
+    path.write_bytes(b'not a board')
+    with pytest.raises(ValueError):
+        board.open_tiling(str(path))
@@ -0,0 +1,125 @@
+import numpy as np
+import pytest
+
+import board
+
+# Small enough that every keyframe which isn't pinned is dropped as soon as another one is stored
+TINY_KEYFRAME_BYTES = 1
+
+
+class RecordedShuffle:
+    """Runs a shuffle and records it in a history, keeping the expected ``to_array()`` of every state."""
+    def __init__(self, hints=True, **history_options):
+        # Without hints, record() isn't told what changed
+        self.hints = hints
+        self.board = board.Board(2, engine=board.ARRAY_ENGINE, seed=8, fill_strategy=board.ALL_GRAY)
+        self.history = board.StepHistory(self.board, keyframe_interval=4, **history_options)
+        self.expected = [self.board.to_array()]
+        self.expected_holes = [None]
+
+    def record(self, holes=None, advanced=False):
+        if self.hints:
+            self.history.record(self.board, holes, advanced)
+        else:
+            # The whole board is compared
+            self.history.record(self.board)
+            holes = None
+        self.expected.append(self.board.to_array())
+        self.expected_holes.append(holes)
+
+    def fill(self, first_hole_index=0):
+        holes = self.board.get_holes(as_array=True)
+        self.board.fill_holes(holes, first_hole_index)
+        self.record(holes)
+        return holes
+
+    def advance(self):
+        self.board.advance_magic()
+        self.record(advanced=True)
+
+    def run(self):
+        self.fill()
+        for _ in range(6):
+            self.advance()
+            holes = self.fill()
+        # Re-filling the same holes at the same size, with other orientations
+        self.board.fill_holes(holes, first_hole_index=len(holes))
+        self.record(holes)
+        # Skipping ahead by several steps can't be stored as a difference
+        for _ in range(3):
+            self.board.advance_magic()
+            self.board.fill_holes(self.board.get_holes(as_array=True))
+        self.record()
+        self.skip_index = len(self.expected) - 1
+        for _ in range(4):
+            self.advance()
+            self.fill()
+        return self
+
+
+def assert_states_match(shuffle: RecordedShuffle):
+    history = shuffle.history
+    assert len(history) == len(shuffle.expected)
+    for i, expected in enumerate(shuffle.expected):
+        rebuilt = history.board(i)
+        assert np.array_equal(rebuilt.to_array(), expected), f'state {i} differs'
+        assert rebuilt.seed == shuffle.board.seed
+        if shuffle.expected_holes[i] is None:
+            assert history.holes(i) is None
+        else:
+            assert np.array_equal(history.holes(i), shuffle.expected_holes[i])
+
+
+@pytest.mark.parametrize('max_keyframe_bytes', [64 * 2 ** 20, TINY_KEYFRAME_BYTES])
+def test_every_state_is_rebuilt(max_keyframe_bytes):
+    shuffle = RecordedShuffle(max_keyframe_bytes=max_keyframe_bytes).run()
+    history = shuffle.history
+    assert history.pinned == {0, shuffle.skip_index}
+    assert_states_match(shuffle)
+    # Rebuilding in reverse order goes through evicted keyframes again
+    for i in reversed(range(len(history))):
+        assert np.array_equal(history.array(i), shuffle.expected[i])
+    assert history.pinned <= set(history.keyframes)
+    if max_keyframe_bytes == TINY_KEYFRAME_BYTES:
+        assert len(set(history.keyframes) - history.pinned) <= 1
+
+
+@pytest.mark.parametrize('max_keyframe_bytes', [64 * 2 ** 20, TINY_KEYFRAME_BYTES])
+def test_record_after_truncate(max_keyframe_bytes):
+    shuffle = RecordedShuffle(max_keyframe_bytes=max_keyframe_bytes).run()
+    history = shuffle.history
+    # Past the pinned keyframe of the skip-ahead, which has to go with the states after it
+    length = shuffle.skip_index - 3
+    history.truncate(length)
+    assert len(history) == length and history.position == length - 1
+    assert shuffle.skip_index not in history.pinned and shuffle.skip_index not in history.keyframes
+    del shuffle.expected[length:], shuffle.expected_holes[length:]
+    shuffle.board = history.board(length - 1)
+    shuffle.advance()
+    shuffle.fill()
+    assert_states_match(shuffle)
+
+
+def test_seek_discards_later_states_on_record():
+    shuffle = RecordedShuffle(max_keyframe_bytes=TINY_KEYFRAME_BYTES).run()
+    history = shuffle.history
+    index = 9
+    shuffle.board = history.seek(index)
+    assert history.position == index
+    # Seeking alone keeps every state
+    assert len(history) == len(shuffle.expected)
+    del shuffle.expected[index + 1:], shuffle.expected_holes[index + 1:]
+    shuffle.fill(first_hole_index=1)
+    assert len(history) == index + 2
+    assert_states_match(shuffle)
+
+
+def test_hints_store_the_same_differences():
+    with_hints = RecordedShuffle().run().history
+    without_hints = RecordedShuffle(hints=False).run().history
+    assert len(with_hints) == len(without_hints)
+    for hinted, compared in zip(with_hints.steps, without_hints.steps):
+        assert (hinted.height, hinted.polarity, hinted.step, hinted.advanced) == \
+            (compared.height, compared.polarity, compared.step, compared.advanced)
+        assert np.array_equal(np.sort(hinted.indices), compared.indices)
+        assert np.array_equal(hinted.colors[np.argsort(hinted.indices)], compared.colors)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+import board
+
+ENGINES = [board.DICT_ENGINE, board.ARRAY_ENGINE, board.PACKED_ENGINE]
+
+
+def started_board(engine, seed):
+    b = board.Board(2, engine=engine, seed=seed, fill_strategy=board.ALL_GRAY)
+    b.fill_holes(b.get_holes(as_array=True))
+    return b
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_skip_ahead_keeps_the_board(engine):
+    b = started_board(engine, 6)
+    job = board.SkipAheadJob(b, 25)
+    result = job.run()
+    assert result is b and result.engine == engine
+    assert job.finished
+    assert np.array_equal(result.to_array(), board.sample_tiling(25, seed=6, engine=board.DICT_ENGINE).to_array())
+
+
+def test_array_board_grows_beyond_skip_ahead_target():
+    b = started_board(board.ARRAY_ENGINE, 6)
+    board.SkipAheadJob(b, 25).run()
+    b.advance_magic()
+    b.fill_holes(b.get_holes(as_array=True))
+    assert np.array_equal(b.to_array(), board.sample_tiling(26, seed=6).to_array())
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_skip_ahead_continues_from_checkpoint(engine, tmp_path):
+    path = str(tmp_path / 'checkpoint.msd')
+    b = started_board(engine, 8)
+    board.SkipAheadJob(b, 10).run()
+    b.save(path)
+    job = board.SkipAheadJob.from_checkpoint(path, 20, engine)
+    result = job.run()
+    assert result.engine == engine
+    assert np.array_equal(result.to_array(), board.sample_tiling(20, seed=8).to_array())
+    assert not (tmp_path / 'checkpoint.msd').exists()
+
+
+def test_checkpoints_load_as_array_boards_by_default(tmp_path):
+    path = str(tmp_path / 'checkpoint.msd')
+    started_board(board.DICT_ENGINE, 1).save(path)
+    assert board.SkipAheadJob.from_checkpoint(path, 4).board.engine == board.ARRAY_ENGINE
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import board
+from board.parallel import band_holes
+
+
+def advanced_boards(order, seed):
+    """Yields every board of a seeded shuffle up to the given order, after its dominoes moved and before its holes are
+    filled."""
+    b = board.Board(2, engine=board.ARRAY_ENGINE, seed=seed, fill_strategy=board.ALL_GRAY)
+    for i in range(order):
+        if i:
+            b.advance_magic()
+        yield b
+        b.fill_holes(b.get_holes(as_array=True))
+
+
+@pytest.mark.parametrize('seed', [0, 5])
+def test_band_holes_match_get_holes(seed):
+    for b in advanced_boards(40, seed):
+        expected = b.get_holes(as_array=True)
+        for bands in (1, 2, 3, 7, b.height, b.height + 5):
+            bounds = np.linspace(0, b.height, min(bands, b.height) + 1).astype(int)
+            holes = np.concatenate([band_holes(b.data, start, stop) for start, stop in zip(bounds[:-1], bounds[1:])])
+            assert np.array_equal(holes, expected), f'{bands} bands at height {b.height}'
+
+
+@pytest.mark.parametrize('bands', [1, 2, 3, 16, 1000])
+def test_parallel_shuffle_matches_serial_engine(bands):
+    order = 30
+    expected = board.sample_tiling(order, seed=12, engine=board.ARRAY_ENGINE)
+    result = board.sample_tiling_parallel(order, 12, processes=2, bands=bands)
+    assert np.array_equal(result.to_array(), expected.to_array())
+    assert (result.polarity, result.step) == (expected.polarity, expected.step)
+    assert result.buffer_index is None
+
+
+def test_parallel_shuffle_continues_a_board():
+    b = board.sample_tiling(10, seed=3)
+    with board.ParallelShuffle(b, 20, processes=2, bands=3) as shuffle:
+        for _ in range(10):
+            shuffle.advance_magic()
+            shuffle.fill_holes(shuffle.get_holes())
+    # The board stays usable after its buffers are released
+    b.advance_magic()
+    b.fill_holes(b.get_holes(as_array=True))
+    assert np.array_equal(b.to_array(), board.sample_tiling(21, seed=3).to_array())
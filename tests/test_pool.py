@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+
+import board
+from board.pool import generate_tilings
+from board.rng import sample_seed
+
+
+@pytest.mark.parametrize('engine', [board.ARRAY_ENGINE, board.PACKED_ENGINE])
+@pytest.mark.parametrize('processes, chunksize', [(1, 1), (2, 1), (2, 3)])
+def test_tilings_match_sample_tiling(engine, processes, chunksize):
+    tilings = dict(generate_tilings(7, 5, 11, processes=processes, engine=engine, chunksize=chunksize))
+    assert sorted(tilings) == list(range(5))
+    for i, tiling in tilings.items():
+        expected = board.sample_tiling(7, seed=sample_seed(11, i), engine=engine)
+        assert tiling.engine == engine
+        assert np.array_equal(tiling.to_array(), expected.to_array())
+        assert (tiling.seed, tiling.polarity, tiling.step) == (expected.seed, expected.polarity, expected.step)
+
+
+def test_same_seed_gives_same_tilings():
+    first = dict(generate_tilings(5, 4, 2 ** 64 - 1, processes=2))
+    second = dict(generate_tilings(5, 4, 2 ** 64 - 1, processes=2))
+    other = dict(generate_tilings(5, 4, 0, processes=2))
+    for i in range(4):
+        assert np.array_equal(first[i].to_array(), second[i].to_array())
+    assert any(not np.array_equal(first[i].to_array(), other[i].to_array()) for i in range(4))
+
+
+def test_timings_and_profiles_come_back_from_workers():
+    timings = {}
+    tilings = dict(generate_tilings(6, 3, 4, processes=2, timings=timings, profile=True))
+    assert {'get_holes', 'fill_holes', 'advance_magic'} <= set(timings)
+    for tiling in tilings.values():
+        assert tiling.profile.calls['advance_magic'] == 5
+        assert tiling.profile.counters['holes_filled'] > 0
@@ -0,0 +1,36 @@
+import pickle
+import threading
+
+from board.profiling import Profile
+
+
+def test_threads_share_profile():
+    profile = Profile(enabled=True)
+    barrier = threading.Barrier(8)
+
+    def work():
+        barrier.wait()
+        for _ in range(2000):
+            profile.add_time('step', 0.5)
+            profile.count('holes')
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert profile.calls['step'] == 16000
+    assert profile.seconds['step'] == 8000.0
+    assert profile.counters['holes'] == 16000
+
+
+def test_merge_and_pickle():
+    profile = Profile(enabled=True)
+    profile.add_time('step', 1.0)
+    profile.count('holes', 3)
+    copy = pickle.loads(pickle.dumps(profile))
+    copy.merge(profile)
+    copy.count('holes')
+    assert copy.snapshot() == {
+        'seconds': {'step': 2.0}, 'last': {'step': 1.0}, 'calls': {'step': 2}, 'counters': {'holes': 7}
+    }
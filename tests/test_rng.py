@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+import board
+from board.rng import philox4x32, hole_orientations, batch_hole_orientations, sample_seed
+
+# Known-answer vectors of Philox4x32-10 from the Random123 distribution
+PHILOX_VECTORS = [
+    ([0, 0, 0, 0], [0, 0], [0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8]),
+    ([0xffffffff] * 4, [0xffffffff] * 2, [0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd]),
+    (
+        [0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344], [0xa4093822, 0x299f31d0],
+        [0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1]
+    ),
+]
+ENGINES = [board.DICT_ENGINE, board.ARRAY_ENGINE, board.PACKED_ENGINE]
+
+
+@pytest.mark.parametrize('counter, key, expected', PHILOX_VECTORS)
+def test_philox_known_answers(counter, key, expected):
+    assert philox4x32(np.array(counter), np.array(key)).tolist() == expected
+
+
+def test_philox_broadcasts():
+    counters = np.array([counter for counter, _, _ in PHILOX_VECTORS])
+    keys = np.array([key for _, key, _ in PHILOX_VECTORS])
+    assert philox4x32(counters, keys).tolist() == [expected for _, _, expected in PHILOX_VECTORS]
+
+
+@pytest.mark.parametrize('start, count', [(0, 1), (0, 300), (5, 123), (127, 2), (250, 600)])
+def test_hole_orientations_are_independent_of_splits(start, count):
+    whole = hole_orientations(7, 3, start + count)
+    assert np.array_equal(hole_orientations(7, 3, count, start), whole[start:])
+
+
+def test_batch_hole_orientations_match_single_boards():
+    seeds = np.array([0, 1, 2 ** 64 - 1, sample_seed(5, 2)], dtype=np.uint64)
+    counts = np.array([3, 0, 200, 129])
+    expected = np.concatenate([hole_orientations(int(seed), 4, int(count)) for seed, count in zip(seeds, counts)])
+    assert np.array_equal(batch_hole_orientations(seeds, 4, counts), expected)
+
+
+@pytest.mark.parametrize('seed', [0, 42, 2 ** 64 - 1])
+@pytest.mark.parametrize('order', [1, 9, 30])
+def test_same_tiling_on_every_engine(seed, order):
+    expected = board.sample_tiling(order, seed=seed, engine=board.DICT_ENGINE).to_array()
+    for engine in ENGINES[1:]:
+        assert np.array_equal(board.sample_tiling(order, seed=seed, engine=engine).to_array(), expected)
+    batch = board.sample_tiling_batch(order, [seed, sample_seed(seed, 0)])
+    assert np.array_equal(batch.board(0).to_array(), expected)
+    assert np.array_equal(
+        batch.board(1).to_array(), board.sample_tiling(order, seed=sample_seed(seed, 0)).to_array()
+    )
+
+
+def test_filling_in_chunks_matches_filling_at_once():
+    expected = board.sample_tiling(20, seed=11)
+    b = board.Board(2, engine=board.ARRAY_ENGINE, seed=11, fill_strategy=board.ALL_GRAY)
+    for i in range(20):
+        if i:
+            b.advance_magic()
+        holes = b.get_holes(as_array=True)
+        for start in range(0, len(holes), 7):
+            b.fill_holes(holes[start:start + 7], first_hole_index=start)
+    assert np.array_equal(b.to_array(), expected.to_array())
+
+
+def test_seeds_change_the_tiling():
+    assert not np.array_equal(board.sample_tiling(20, seed=1).data, board.sample_tiling(20, seed=2).data)
@@ -0,0 +1,73 @@
+import asyncio
+import io
+
+import numpy as np
+import pytest
+
+import board
+from board.service import SamplingService
+
+
+@pytest.fixture
+def service():
+    service = SamplingService(processes=1)
+    yield service
+    service.executor.shutdown()
+
+
+async def request(service, target):
+    server = await asyncio.start_server(service.handle, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f'GET {target} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode('ascii'))
+        response = await reader.read()
+        writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    return head.split(b'\r\n')[0].decode('ascii'), body
+
+
+def test_tiling_matches_sample_tiling(service):
+    data = asyncio.run(service.tiling(12, 7))
+    assert np.array_equal(board.read_board(io.BytesIO(data)).to_array(), board.sample_tiling(12, seed=7).to_array())
+    assert service.counters['generated'] == 1
+
+
+def test_cancelled_request_doesnt_cancel_shared_generation(service):
+    started = []
+
+    async def slow_generation(key):
+        started.append(key)
+        await asyncio.sleep(0.05)
+        return b'tiling'
+
+    service._load_or_generate = slow_generation
+
+    async def run():
+        first = asyncio.ensure_future(service.tiling(5, 1))
+        second = asyncio.ensure_future(service.tiling(5, 1))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == (b'tiling', True)
+    assert len(started) == 1
+    assert service.counters['shared'] == 1
+    assert not service.pending
+    assert service.cache.get((5, 1)) == b'tiling'
+
+
+@pytest.mark.parametrize('target, message', [
+    ('/tiling?seed=1', b'Missing parameter: order\n'),
+    ('/tiling?order=x', b'Invalid parameter: order must be an integer\n'),
+    ('/tiling?order=3&seed=-1', b'The seed must be in [0, 2 ** 64).\n'),
+    ('/tiling?order=3&format=png', b'Unknown format: png\n'),
+])
+def test_invalid_parameters(service, target, message):
+    assert asyncio.run(request(service, target)) == ('HTTP/1.1 400 Bad Request', message)
+
+
+def test_text_format(service):
+    status, body = asyncio.run(request(service, '/tiling?order=4&seed=2&format=text'))
+    assert status == 'HTTP/1.1 200 OK'
+    assert body.decode('ascii') == board.format_tiling(board.sample_tiling(4, seed=2))
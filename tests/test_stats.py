@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+
+import board
+from board.pool import accumulate_statistics
+from board.rng import sample_seed
+from board.stats import STATISTICS_COLORS
+
+ORDER = 9
+COUNT = 6
+SEED = 21
+
+
+def sampled_tilings(engine=board.ARRAY_ENGINE):
+    return [board.sample_tiling(ORDER, seed=sample_seed(SEED, i), engine=engine) for i in range(COUNT)]
+
+
+def reference_counts(tilings):
+    arrays = np.stack([tiling.to_array() for tiling in tilings])
+    return np.stack([np.count_nonzero(arrays == color, axis=0) for color in STATISTICS_COLORS])
+
+
+def assert_same_statistics(statistics, expected):
+    assert (statistics.order, statistics.samples) == (expected.order, expected.samples)
+    assert statistics.counts.dtype == np.uint32
+    assert np.array_equal(statistics.counts, expected.counts)
+
+
+@pytest.mark.parametrize('engine', [board.DICT_ENGINE, board.ARRAY_ENGINE, board.PACKED_ENGINE])
+def test_add_counts_every_color(engine):
+    tilings = sampled_tilings(engine)
+    statistics = board.TilingStatistics(ORDER)
+    for tiling in tilings:
+        statistics.add(tiling)
+    assert statistics.samples == COUNT
+    assert np.array_equal(statistics.counts, reference_counts(tilings))
+    # Every black square has one of the four colors in every tiling
+    assert np.array_equal(statistics.counts.sum(axis=0), board.black_mask(ORDER * 2) * COUNT)
+
+
+def test_add_batch_and_pool_match_add():
+    expected = board.TilingStatistics(ORDER)
+    for tiling in sampled_tilings():
+        expected.add(tiling)
+    batched = board.TilingStatistics(ORDER)
+    batched.add_batch(board.sample_tiling_batch(ORDER, [sample_seed(SEED, i) for i in range(COUNT)]))
+    assert_same_statistics(batched, expected)
+    for processes, chunksize in [(1, None), (2, None), (2, 1)]:
+        pooled = accumulate_statistics(ORDER, COUNT, SEED, processes=processes, chunksize=chunksize)
+        assert_same_statistics(pooled, expected)
+
+
+def test_merge_and_save(tmp_path):
+    tilings = sampled_tilings()
+    expected = board.TilingStatistics(ORDER)
+    first, second = board.TilingStatistics(ORDER), board.TilingStatistics(ORDER)
+    for i, tiling in enumerate(tilings):
+        expected.add(tiling)
+        (first if i % 2 else second).add_array(tiling.to_array())
+    assert first.merge(second) is first
+    assert_same_statistics(first, expected)
+    path = str(tmp_path / 'stats.npz')
+    first.save(path)
+    assert_same_statistics(board.TilingStatistics.load(path), expected)
+
+
+def test_wrong_order():
+    statistics = board.TilingStatistics(ORDER)
+    with pytest.raises(ValueError):
+        statistics.add(board.sample_tiling(ORDER - 1, seed=1))
+    with pytest.raises(ValueError):
+        statistics.add_array(np.zeros((ORDER * 2 + 2, ORDER * 2 + 2), dtype=np.int8))
+    with pytest.raises(ValueError):
+        statistics.add_batch(board.sample_tiling_batch(ORDER + 1, [1, 2]))
+    with pytest.raises(ValueError):
+        statistics.merge(board.TilingStatistics(ORDER + 1))
+    with pytest.raises(ValueError):
+        board.TilingStatistics(0)
+    assert statistics.samples == 0 and not statistics.counts.any()